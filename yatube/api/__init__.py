@@ -0,0 +1 @@
+"""Api app serves feeds, posts, comments and follows as JSON."""
@@ -0,0 +1,8 @@
+"""Api app configuration."""
+from django.apps import AppConfig
+
+
+class ApiConfig(AppConfig):
+    """Api app config class."""
+
+    name = "api"
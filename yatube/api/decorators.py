@@ -0,0 +1,77 @@
+"""View decorators of api app."""
+import hashlib
+from functools import wraps
+
+from django.http import Http404
+from django.views.decorators.http import condition
+
+from api.errors import ApiError, error_response
+from posts import feed_cache
+
+API_VERSION = "v1"
+
+
+def api_view(*methods):
+    """Limit view to the given methods and answer errors with JSON."""
+    allowed = set(methods) | ({"HEAD"} if "GET" in methods else set())
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in allowed:
+                response = error_response(
+                    405, f"Method {request.method} is not allowed.",
+                )
+                response["Allow"] = ", ".join(sorted(allowed))
+                return response
+            try:
+                return view(request, *args, **kwargs)
+            except Http404:
+                return error_response(404, "Not found.")
+            except ApiError as error:
+                return error_response(error.status, error.detail)
+        return wrapper
+    return decorator
+
+
+def require_login(request):
+    """Refuse anonymous request."""
+    if not request.user.is_authenticated:
+        raise ApiError(401, "Authentication credentials were not provided.")
+
+
+def conditional(*scopes):
+    """Answer unchanged GET requests with 304 before the view runs.
+
+    ETag and Last-Modified come from cache generations of the scopes, so
+    checking them does not query the database. Scopes are formatted with
+    view arguments and "user", the id of the requesting user.
+    """
+    personal = any("{user}" in scope for scope in scopes)
+
+    def generations(request, kwargs):
+        if personal:
+            kwargs = dict(kwargs, user=request.user.pk)
+        return [
+            feed_cache.get_generation(scope.format(**kwargs))
+            for scope in scopes
+        ]
+
+    def etag(request, *args, **kwargs):
+        raw = "|".join(
+            [API_VERSION, request.get_full_path()]
+            + ([str(request.user.pk)] if personal else [])
+            + generations(request, kwargs),
+        )
+        return hashlib.md5(raw.encode()).hexdigest()
+
+    def last_modified(request, *args, **kwargs):
+        moments = [
+            feed_cache.generation_time(generation)
+            for generation in generations(request, kwargs)
+        ]
+        if None in moments:
+            return None
+        return max(moments)
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
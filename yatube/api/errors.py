@@ -0,0 +1,17 @@
+"""Errors of api app and their JSON responses."""
+from django.http import JsonResponse
+
+
+class ApiError(Exception):
+    """Raised to answer the request with an error status and message."""
+
+    def __init__(self, status, detail):
+        """Store status code and message."""
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+
+
+def error_response(status, detail):
+    """Return JSON response describing the error."""
+    return JsonResponse({"detail": detail}, status=status)
@@ -0,0 +1,55 @@
+"""Conversion of posts app models into JSON-ready dictionaries."""
+from api.errors import ApiError
+
+POST_FIELDS = (
+    "id",
+    "text",
+    "pub_date",
+    "author",
+    "group",
+    "image",
+    "image_width",
+    "image_height",
+    "comment_count",
+)
+COMMENT_FIELDS = ("id", "post", "author", "text", "created")
+
+
+def requested_fields(request, allowed):
+    """Return fields listed in ?fields=, every allowed field by default."""
+    raw = request.GET.get("fields")
+    if not raw:
+        return allowed
+    fields = tuple(field.strip() for field in raw.split(",") if field.strip())
+    unknown = sorted(set(fields) - set(allowed))
+    if unknown:
+        raise ApiError(400, f"Unknown fields: {', '.join(unknown)}.")
+    return fields
+
+
+def serialize_post(post, fields=POST_FIELDS):
+    """Return chosen fields of the post."""
+    getters = {
+        "id": lambda: post.pk,
+        "text": lambda: post.text,
+        "pub_date": lambda: post.pub_date,
+        "author": lambda: post.author.username,
+        "group": lambda: post.group.slug if post.group_id else None,
+        "image": lambda: post.image.url if post.image else None,
+        "image_width": lambda: post.image_width,
+        "image_height": lambda: post.image_height,
+        "comment_count": lambda: post.comment_count,
+    }
+    return {field: getters[field]() for field in fields}
+
+
+def serialize_comment(comment, fields=COMMENT_FIELDS):
+    """Return chosen fields of the comment."""
+    getters = {
+        "id": lambda: comment.pk,
+        "post": lambda: comment.post_id,
+        "author": lambda: comment.author.username,
+        "text": lambda: comment.text,
+        "created": lambda: comment.created,
+    }
+    return {field: getters[field]() for field in fields}
@@ -0,0 +1,212 @@
+"""Contain tests for api app in yatube project."""
+import io
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse_lazy
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ApiTests(TestCase):
+    """Tests JSON endpoints of api app."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Create author, reader, group and posts."""
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="auth_author")
+        cls.reader = User.objects.create_user(username="auth_reader")
+        cls.group = Group.objects.create(
+            title="Group", slug="test-slug", description="Description",
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=f"Post {number}",
+            )
+            for number in range(3)
+        ]
+
+    def setUp(self):
+        """Define guest and reader clients with an empty cache."""
+        cache.clear()
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def post_json(self, client, url, data, method="post"):
+        """Send data as JSON body."""
+        return getattr(client, method)(
+            url, json.dumps(data), content_type="application/json",
+        )
+
+    def test_api_post_lists_are_paged_by_cursor(self):
+        """Check if feeds page by cursor with sparse fields."""
+        url = reverse_lazy("api:post_list")
+        first = self.guest_client.get(url, {"limit": 2}).json()
+        self.assertEqual(
+            [post["text"] for post in first["results"]], ["Post 2", "Post 1"],
+        )
+        second = self.guest_client.get(
+            url, {"limit": 2, "cursor": first["next"], "fields": "id,author"},
+        ).json()
+        self.assertEqual(
+            second["results"],
+            [{"id": self.posts[0].pk, "author": "auth_author"}],
+        )
+        self.assertIsNone(second["next"])
+
+        group = self.guest_client.get(
+            reverse_lazy("api:group_post_list", kwargs={"slug": "test-slug"}),
+        ).json()
+        self.assertEqual(len(group["results"]), 3)
+        self.assertEqual(group["results"][0]["group"], "test-slug")
+        response = self.guest_client.get(url, {"fields": "password"})
+        self.assertEqual(response.status_code, 400)
+        response = self.guest_client.get(
+            reverse_lazy("api:post_detail", kwargs={"post_id": 0}),
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_api_unchanged_pages_are_not_modified(self):
+        """Check if repeated GET gets 304 without SQL until posts change."""
+        url = reverse_lazy(
+            "api:post_detail", kwargs={"post_id": self.posts[0].pk},
+        )
+        response = self.guest_client.get(url)
+        etag = response["ETag"]
+        self.assertTrue(response.has_header("Last-Modified"))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(queries), 0)
+
+        Comment.objects.create(
+            post=self.posts[0], author=self.reader, text="Comment",
+        )
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["comment_count"], 1)
+
+    def test_api_comments_change_with_author_name(self):
+        """Check if renamed comment author gives another validator."""
+        url = reverse_lazy(
+            "api:comment_list", kwargs={"post_id": self.posts[0].pk},
+        )
+        commenter = User.objects.create_user(username="auth_commenter")
+        Comment.objects.create(
+            post=self.posts[0], author=commenter, text="Comment",
+        )
+        etag = self.guest_client.get(url)["ETag"]
+
+        commenter.username = "auth_renamed"
+        commenter.save()
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json()["results"][0]["author"], "auth_renamed",
+        )
+
+    @override_settings(TASKS_ALWAYS_EAGER=False)
+    def test_api_follow_feed_changes_when_tasks_finish(self):
+        """Check if deferred backfill and fan-out give another validator."""
+        url = reverse_lazy("api:follow_post_list")
+        self.reader_client.post(
+            reverse_lazy("api:follow", kwargs={"username": "auth_author"}),
+        )
+        steps = (
+            lambda: None,
+            lambda: Post.objects.create(author=self.author, text="Late"),
+        )
+        for expected, step in zip((3, 4), steps):
+            step()
+            etag = self.reader_client.get(url)["ETag"]
+            call_command(
+                "run_tasks", once=True, workers=0, stdout=io.StringIO(),
+            )
+            response = self.reader_client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.json()["results"]), expected)
+
+    def test_api_comments_and_follows_need_login(self):
+        """Check if writes work for users and are refused for guests."""
+        comments_url = reverse_lazy(
+            "api:comment_list", kwargs={"post_id": self.posts[0].pk},
+        )
+        response = self.post_json(
+            self.guest_client, comments_url, {"text": "Guest"},
+        )
+        self.assertEqual(response.status_code, 401)
+        response = self.post_json(
+            self.reader_client, comments_url, {"text": "Reader"},
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["author"], "auth_reader")
+        self.assertEqual(
+            self.guest_client.get(comments_url).json()["results"][0]["text"],
+            "Reader",
+        )
+
+        follow_url = reverse_lazy(
+            "api:follow", kwargs={"username": "auth_author"},
+        )
+        response = self.reader_client.post(follow_url)
+        self.assertEqual(response.status_code, 201)
+        feed = self.reader_client.get(reverse_lazy("api:follow_post_list"))
+        self.assertEqual(len(feed.json()["results"]), 3)
+
+        Follow.objects.create(user=self.author, author=self.reader)
+        response = self.reader_client.delete(follow_url)
+        self.assertFalse(response.json()["following"])
+        self.assertFalse(
+            Follow.objects.filter(user=self.reader).exists(),
+        )
+        self.assertTrue(
+            Follow.objects.filter(user=self.author).exists(),
+        )
+        response = self.reader_client.put(follow_url)
+        self.assertEqual(response.status_code, 405)
+
+    def test_api_batch_runs_requests_in_order(self):
+        """Check if batch returns responses of every request."""
+        detail = reverse_lazy(
+            "api:post_detail", kwargs={"post_id": self.posts[1].pk},
+        )
+        etag = self.reader_client.get(detail)["ETag"]
+        response = self.post_json(
+            self.reader_client,
+            reverse_lazy("api:batch"),
+            {
+                "requests": [
+                    {"path": f"{reverse_lazy('api:post_list')}?fields=id"},
+                    {"path": str(detail), "headers": {"If-None-Match": etag}},
+                    {
+                        "method": "POST",
+                        "path": str(reverse_lazy(
+                            "api:comment_list",
+                            kwargs={"post_id": self.posts[1].pk},
+                        )),
+                        "body": {"text": "Batched"},
+                    },
+                    {"path": "/about/author/"},
+                ],
+            },
+        )
+        statuses = [item["status"] for item in response.json()["responses"]]
+        self.assertEqual(statuses, [200, 304, 201, 400])
+        first = response.json()["responses"][0]
+        self.assertEqual(len(first["body"]["results"]), 3)
+        self.assertIn("ETag", first["headers"])
+        self.assertTrue(
+            Comment.objects.filter(
+                text="Batched", author=self.reader,
+            ).exists(),
+        )
@@ -0,0 +1,33 @@
+"""Contain urls in namespace api."""
+from django.urls import path
+
+from api import views
+
+app_name = "api"
+
+urlpatterns = [
+    path("posts/", views.post_list, name="post_list"),
+    path("posts/<int:post_id>/", views.post_detail, name="post_detail"),
+    path(
+        "posts/<int:post_id>/comments/",
+        views.comment_list,
+        name="comment_list",
+    ),
+    path(
+        "groups/<slug:slug>/posts/",
+        views.group_post_list,
+        name="group_post_list",
+    ),
+    path(
+        "profiles/<str:username>/posts/",
+        views.profile_post_list,
+        name="profile_post_list",
+    ),
+    path(
+        "profiles/<str:username>/follow/",
+        views.follow,
+        name="follow",
+    ),
+    path("follow/posts/", views.follow_post_list, name="follow_post_list"),
+    path("batch/", views.batch, name="batch"),
+]
@@ -0,0 +1,242 @@
+"""Contain JSON endpoints of api app."""
+import json
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.http import HttpRequest, JsonResponse, QueryDict
+from django.shortcuts import get_object_or_404
+from django.urls import Resolver404, resolve
+
+from api.decorators import api_view, conditional, require_login
+from api.errors import ApiError
+from api.serializers import (
+    COMMENT_FIELDS,
+    POST_FIELDS,
+    requested_fields,
+    serialize_comment,
+    serialize_post,
+)
+from posts import follow_graph
+from posts.feed import follow_feed
+from posts.forms import CommentForm
+from posts.models import Comment, Group, Post
+from posts.pagination import KeysetPaginator
+
+User = get_user_model()
+
+BATCH_HEADERS = ("ETag", "Last-Modified", "Location")
+
+
+def read_body(request):
+    """Return data of JSON or form-encoded request body."""
+    if request.content_type != "application/json":
+        return request.POST
+    try:
+        data = json.loads(request.body or b"{}")
+    except ValueError:
+        raise ApiError(400, "Request body is not valid JSON.")
+    if not isinstance(data, dict):
+        raise ApiError(400, "Request body must be a JSON object.")
+    return data
+
+
+def page_size(request, default):
+    """Return ?limit= clamped to API_MAX_PAGE_SIZE."""
+    try:
+        limit = int(request.GET.get("limit", default))
+    except ValueError:
+        raise ApiError(400, "Limit must be a number.")
+    return min(max(limit, 1), settings.API_MAX_PAGE_SIZE)
+
+
+def paginated(request, queryset, serialize, fields, keys, default_size):
+    """Return a cursor page of the queryset as JSON response."""
+    fields = requested_fields(request, fields)
+    paginator = KeysetPaginator(
+        queryset, page_size(request, default_size), keys=keys,
+    )
+    page = paginator.get_page(request.GET.get(paginator.cursor_param))
+    return JsonResponse({
+        "results": [serialize(obj, fields) for obj in page],
+        "next": page.next_cursor,
+        "previous": page.previous_cursor,
+    })
+
+
+def post_page(request, queryset):
+    """Return a page of posts, newest first."""
+    return paginated(
+        request,
+        queryset,
+        serialize_post,
+        POST_FIELDS,
+        ("pub_date", "pk"),
+        settings.MAX_POSTS_PER_PAGE,
+    )
+
+
+@api_view("GET")
+@conditional("posts", "comments")
+def post_list(request):
+    """Return page of all posts."""
+    return post_page(request, Post.objects.for_feed())
+
+
+@api_view("GET")
+@conditional("posts", "comments")
+def group_post_list(request, slug):
+    """Return page of posts of the group."""
+    group = get_object_or_404(Group, slug=slug)
+    return post_page(request, group.posts.for_feed())
+
+
+@api_view("GET")
+@conditional("posts", "comments")
+def profile_post_list(request, username):
+    """Return page of posts of the author."""
+    author = get_object_or_404(User, username=username)
+    return post_page(request, author.posts.for_feed())
+
+
+@api_view("GET")
+@conditional("posts", "comments", "follow:{user}")
+def follow_post_list(request):
+    """Return page of posts of authors followed by the user."""
+    require_login(request)
+    return post_page(request, follow_feed(request.user).for_feed())
+
+
+@api_view("GET")
+@conditional("posts", "comments")
+def post_detail(request, post_id):
+    """Return the post."""
+    post = get_object_or_404(Post.objects.for_feed(), pk=post_id)
+    return JsonResponse(
+        serialize_post(post, requested_fields(request, POST_FIELDS)),
+    )
+
+
+@api_view("GET", "POST")
+@conditional("posts", "comments")
+def comment_list(request, post_id):
+    """Return page of comments of the post or add a comment."""
+    if request.method == "POST":
+        return create_comment(request, post_id)
+    comments = (
+        Comment.objects.filter(post_id=post_id)
+        .select_related("author")
+        .only("text", "created", "post", "author__username")
+    )
+    return paginated(
+        request,
+        comments,
+        serialize_comment,
+        COMMENT_FIELDS,
+        ("created", "pk"),
+        settings.MAX_COMMENTS_PER_PAGE,
+    )
+
+
+def create_comment(request, post_id):
+    """Add comment of the user to the post."""
+    require_login(request)
+    post = get_object_or_404(Post.objects.only("pk"), pk=post_id)
+    form = CommentForm(read_body(request))
+    if not form.is_valid():
+        return JsonResponse({"errors": form.errors}, status=400)
+    comment = form.save(commit=False)
+    comment.author = request.user
+    comment.post = post
+    comment.save()
+    return JsonResponse(serialize_comment(comment), status=201)
+
+
+@api_view("GET", "POST", "DELETE")
+def follow(request, username):
+    """Tell whether the user follows the author, follow or unfollow."""
+    require_login(request)
+    author = get_object_or_404(User, username=username)
+    if request.method == "GET":
+        return JsonResponse({
+            "following": follow_graph.follows(request.user.pk, author.pk),
+        })
+    if request.method == "DELETE":
+        follow_graph.unfollow_many(request.user.pk, [author.pk])
+        return JsonResponse({"following": False})
+    if author == request.user:
+        raise ApiError(400, "You can not follow yourself.")
+    created = follow_graph.follow_many(request.user.pk, [author.pk])
+    return JsonResponse({"following": True}, status=201 if created else 200)
+
+
+def subrequest(request, item):
+    """Build request of one batch item sharing user and session."""
+    if not isinstance(item, dict) or not isinstance(item.get("path"), str):
+        raise ApiError(400, "Every request needs a path.")
+    url = urlsplit(item["path"])
+    try:
+        match = resolve(url.path)
+    except Resolver404:
+        raise ApiError(404, "Not found.")
+    if match.namespace != "api" or match.url_name == "batch":
+        raise ApiError(400, "Only api endpoints can be batched.")
+
+    sub = HttpRequest()
+    sub.method = str(item.get("method", "GET")).upper()
+    sub.path = sub.path_info = url.path
+    sub.META = {
+        key: value for key, value in request.META.items()
+        if not key.startswith("HTTP_IF_")
+    }
+    sub.META["QUERY_STRING"] = url.query
+    for name, value in (item.get("headers") or {}).items():
+        sub.META["HTTP_" + name.upper().replace("-", "_")] = str(value)
+    sub.GET = QueryDict(url.query)
+    sub.COOKIES = request.COOKIES
+    sub.content_type = "application/json"
+    sub.content_params = {}
+    sub._body = json.dumps(item.get("body") or {}).encode()
+    sub.user = request.user
+    sub.session = request.session
+    sub.resolver_match = match
+    return sub
+
+
+def run_subrequest(request, item):
+    """Run one batch item and describe its response."""
+    try:
+        sub = subrequest(request, item)
+    except ApiError as error:
+        return {"status": error.status, "body": {"detail": error.detail}}
+    match = sub.resolver_match
+    response = match.func(sub, *match.args, **match.kwargs)
+    return {
+        "status": response.status_code,
+        "headers": {
+            header: response[header]
+            for header in BATCH_HEADERS if response.has_header(header)
+        },
+        "body": json.loads(response.content) if response.content else None,
+    }
+
+
+@api_view("POST")
+def batch(request):
+    """Run several api requests in one round trip.
+
+    Body is {"requests": [{"method", "path", "headers", "body"}, ...]},
+    responses come back in the same order.
+    """
+    items = read_body(request).get("requests")
+    if not isinstance(items, list) or not items:
+        raise ApiError(400, "Requests must be a non-empty list.")
+    if len(items) > settings.API_BATCH_MAX_REQUESTS:
+        raise ApiError(
+            400,
+            f"At most {settings.API_BATCH_MAX_REQUESTS} requests "
+            "can be batched.",
+        )
+    return JsonResponse({
+        "responses": [run_subrequest(request, item) for item in items],
+    })
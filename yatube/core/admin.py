@@ -0,0 +1,23 @@
+"""Administrator panel settings for core app."""
+from django.contrib import admin
+
+from core.models import Task
+
+
+class TaskAdmin(admin.ModelAdmin):
+    """Custom settings for background tasks admin panel."""
+
+    list_display = (
+        "pk",
+        "name",
+        "status",
+        "attempts",
+        "run_at",
+        "finished",
+    )
+    list_filter = ("status", "name")
+    search_fields = ("key",)
+    readonly_fields = ("started", "finished", "error")
+
+
+admin.site.register(Task, TaskAdmin)
@@ -6,3 +6,13 @@ class CoreConfig(AppConfig):
     """Core app configuration."""
 
     name = 'core'
+
+    def ready(self):
+        """Check database connections when requests start."""
+        from django.core.signals import request_started
+        from django.db.backends.signals import connection_created
+
+        from core.db import check_connections, tune_sqlite
+
+        request_started.connect(check_connections)
+        connection_created.connect(tune_sqlite)
@@ -0,0 +1,180 @@
+"""ASGI handler running the project on django without native ASGI.
+
+Django 2.2 handles requests synchronously, so ASGIHandler reads the
+request body on the event loop, spooling large ones to disk, and runs
+the regular WSGI handler on a pool of ASGI_THREADS threads, which send
+the response back through the loop. The loop stays free to accept
+connections and read slow uploads while threads wait on the database,
+and requests in work are bounded by threads instead of by processes.
+"""
+import asyncio
+import io
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+
+# Headers WSGI keeps without the HTTP_ prefix.
+UNPREFIXED_HEADERS = ("CONTENT_LENGTH", "CONTENT_TYPE")
+
+
+def wsgi_string(value):
+    """Return path as WSGI carries it, utf-8 bytes decoded as latin-1."""
+    return value.encode("utf-8").decode("latin-1")
+
+
+def make_environ(scope, body):
+    """Build WSGI environ of the request of the ASGI scope."""
+    server_name, server_port = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": wsgi_string(scope.get("root_path", "")),
+        "PATH_INFO": wsgi_string(scope["path"]),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server_name,
+        "SERVER_PORT": str(server_port or 80),
+        "REMOTE_ADDR": client[0],
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": body,
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope.get("headers", ()):
+        key = name.decode("latin-1").upper().replace("-", "_")
+        if key not in UNPREFIXED_HEADERS:
+            key = f"HTTP_{key}"
+        value = value.decode("latin-1")
+        if key in environ:
+            separator = "; " if key == "HTTP_COOKIE" else ","
+            value = environ[key] + separator + value
+        environ[key] = value
+    if "CONTENT_LENGTH" not in environ:
+        # Chunked bodies come without the length django reads them by.
+        environ["CONTENT_LENGTH"] = str(body.seek(0, io.SEEK_END))
+        body.seek(0)
+    return environ
+
+
+class ASGIHandler:
+    """ASGI application serving requests with the WSGI handler."""
+
+    def __init__(self, threads=None):
+        """Load middleware, threads start with the first request."""
+        self.wsgi = WSGIHandler()
+        self.threads = threads or settings.ASGI_THREADS
+        self.executor = None
+
+    async def __call__(self, scope, receive, send):
+        """Serve HTTP request or lifespan events of the server."""
+        if scope["type"] == "http":
+            await self.handle(scope, receive, send)
+        elif scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+        else:
+            raise ValueError(f"Unsupported ASGI scope {scope['type']}")
+
+    async def lifespan(self, receive, send):
+        """Start threads with the server, let requests in work finish."""
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                self.get_executor()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                if self.executor is not None:
+                    await asyncio.get_running_loop().run_in_executor(
+                        None, self.executor.shutdown,
+                    )
+                    self.executor = None
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    def get_executor(self):
+        """Return pool of request threads, starting it if needed."""
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(
+                max_workers=self.threads, thread_name_prefix="asgi",
+            )
+        return self.executor
+
+    async def read_body(self, receive):
+        """Return request body file, None if the client went away."""
+        body = tempfile.SpooledTemporaryFile(
+            max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE,
+        )
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                body.close()
+                return None
+            body.write(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        body.seek(0)
+        return body
+
+    async def handle(self, scope, receive, send):
+        """Read the request and serve it on a request thread."""
+        body = await self.read_body(receive)
+        if body is None:
+            return
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(
+                self.get_executor(),
+                self.respond,
+                make_environ(scope, body),
+                loop,
+                send,
+            )
+        finally:
+            body.close()
+
+    def respond(self, environ, loop, send):
+        """Run the WSGI handler and send its response through the loop.
+
+        Streamed responses are sent chunk by chunk, waiting for the
+        client to take each one before the next is read.
+        """
+        def reply(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started["status"] = int(status.split(" ", 1)[0])
+            started["headers"] = [
+                (name.lower().encode("latin-1"), value.encode("latin-1"))
+                for name, value in headers
+            ]
+
+        response = self.wsgi(environ, start_response)
+        try:
+            reply({"type": "http.response.start", **started})
+            if not getattr(response, "streaming", False):
+                reply({"type": "http.response.body", "body": response.content})
+                return
+            for chunk in response:
+                if chunk:
+                    reply({
+                        "type": "http.response.body",
+                        "body": chunk,
+                        "more_body": True,
+                    })
+            reply({"type": "http.response.body"})
+        finally:
+            response.close()
+
+
+def get_asgi_application():
+    """Set up django and return the ASGI application of the project."""
+    django.setup(set_prefix=False)
+    return ASGIHandler()
@@ -0,0 +1,6 @@
+"""Benchmarks of yatube routes.
+
+bench_seed command fills the database with a synthetic dataset and
+bench_routes measures query count, latency and peak memory of every
+named route against the committed baseline.json.
+"""
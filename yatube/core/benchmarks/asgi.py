@@ -0,0 +1,202 @@
+"""Requests per second under WSGI and ASGI with a slow database.
+
+Every query is delayed, as on a database across the network, and
+concurrent clients request the index, group, profile, post and follow
+pages of the route benchmark in turn, as the reader following most
+authors. Requests go to the handlers in process, without sockets:
+
+* WSGI: sync workers, each serving one request at a time;
+* ASGI: one process serving requests on ASGI_THREADS threads;
+* ASGI, concurrent parts: the same with independent parts of views run
+  concurrently on CONCURRENT_FETCH_THREADS threads.
+
+Sync workers are threads of this process here, sharing the interpreter
+lock the way ASGI threads do, while real ones are separate processes.
+"""
+import asyncio
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test import Client, override_settings
+
+from core.asgi import ASGIHandler, make_environ
+from core.benchmarks.routes import ROUTES, pick_targets
+from core.benchmarks.runner import percentile
+
+ROUTE_NAMES = (
+    "posts:index",
+    "posts:group_list",
+    "posts:profile",
+    "posts:post_detail",
+    "posts:follow_index",
+)
+
+
+class SlowQueries:
+    """Execute wrapper delaying every query by the given seconds."""
+
+    def __init__(self, delay):
+        """Store delay."""
+        self.delay = delay
+
+    def __call__(self, execute, sql, params, many, context):
+        """Wait, then run the query."""
+        time.sleep(self.delay)
+        return execute(sql, params, many, context)
+
+
+@contextmanager
+def slow_database(delay):
+    """Delay queries of connections opened within the context."""
+    wrapper = SlowQueries(delay)
+
+    def slow_down(sender, connection, **kwargs):
+        connection.execute_wrappers.append(wrapper)
+
+    connections.close_all()
+    connection_created.connect(slow_down, weak=False)
+    try:
+        yield
+    finally:
+        connection_created.disconnect(slow_down)
+        connections.close_all()
+
+
+def make_scope(path, query, cookie):
+    """Return ASGI scope of a GET request of the reader."""
+    return {
+        "type": "http",
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "root_path": "",
+        "query_string": query.encode(),
+        "headers": [(b"host", b"testserver"), (b"cookie", cookie.encode())],
+        "client": ("127.0.0.1", 0),
+        "server": ("testserver", 80),
+    }
+
+
+def wsgi_get(handler, scope):
+    """Serve request with the WSGI handler, return response status."""
+    started = {}
+
+    def start_response(status, headers, exc_info=None):
+        started["status"] = int(status.split(" ", 1)[0])
+
+    response = handler(make_environ(scope, io.BytesIO()), start_response)
+    try:
+        for _ in response:
+            pass
+    finally:
+        response.close()
+    return started["status"]
+
+
+async def asgi_get(application, scope):
+    """Serve request with the ASGI application, return response status."""
+    started = {}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            started["status"] = message["status"]
+
+    await application(scope, receive, send)
+    return started["status"]
+
+
+async def load(get, scopes, clients, requests):
+    """Send requests from concurrent clients, return rate and latency."""
+    numbers = iter(range(requests))
+    timings = []
+
+    async def client():
+        for number in numbers:
+            started = time.perf_counter()
+            status = await get(scopes[number % len(scopes)])
+            assert status == 200, status
+            timings.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests_per_second": round(requests / elapsed, 1),
+        "p50_ms": round(percentile(timings, 0.5), 2),
+        "p95_ms": round(percentile(timings, 0.95), 2),
+    }
+
+
+def make_scopes():
+    """Return scopes of the measured pages requested by the reader."""
+    targets = pick_targets()
+    client = Client()
+    client.force_login(targets.reader)
+    session = client.cookies[settings.SESSION_COOKIE_NAME]
+    cookie = f"{session.key}={session.value}"
+    return [
+        make_scope(
+            route.url(targets), urlencode(route.query(targets)), cookie,
+        )
+        for route in ROUTES
+        if route.name in ROUTE_NAMES and not route.missing(targets)
+    ]
+
+
+def run_wsgi(scopes, clients, requests, workers):
+    """Measure sync workers serving the pages."""
+    handler = WSGIHandler()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        async def get(scope):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                executor, wsgi_get, handler, scope,
+            )
+
+        return asyncio.run(load(get, scopes, clients, requests))
+
+
+def run_asgi(scopes, clients, requests, threads):
+    """Measure the ASGI application serving the pages."""
+    application = ASGIHandler(threads=threads)
+
+    async def get(scope):
+        return await asgi_get(application, scope)
+
+    try:
+        return asyncio.run(load(get, scopes, clients, requests))
+    finally:
+        application.get_executor().shutdown()
+
+
+def run(clients, requests, delay, workers, threads):
+    """Measure every mode, return results by mode name."""
+    scopes = make_scopes()
+    modes = (
+        (f"WSGI, {workers} workers", 0,
+         lambda: run_wsgi(scopes, clients, requests, workers)),
+        (f"ASGI, {threads} threads", 0,
+         lambda: run_asgi(scopes, clients, requests, threads)),
+        (f"ASGI, {threads} threads, concurrent parts",
+         settings.CONCURRENT_FETCH_THREADS,
+         lambda: run_asgi(scopes, clients, requests, threads)),
+    )
+    results = {}
+    with slow_database(delay), override_settings(REQUEST_QUERY_BUDGET=None):
+        for name, fetch_threads, measure in modes:
+            cache.clear()
+            with override_settings(CONCURRENT_FETCH_THREADS=fetch_threads):
+                results[name] = measure()
+    return results
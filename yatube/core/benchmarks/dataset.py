@@ -0,0 +1,176 @@
+"""Synthetic dataset for route benchmarks.
+
+Rows are bulk inserted in batches with explicit ids, so the dataset can
+be as large as production without keeping it in memory. Authors, posts
+and followed accounts are picked with a heavy-tailed popularity, like in
+a real social network: few accounts get most of posts, comments and
+followers. Signals are bypassed, so counters, follow feeds and the
+search index are rebuilt at the end.
+"""
+import io
+import itertools
+import random
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.db.models import Max
+from django.utils import timezone
+from faker import Faker
+from mixer.backend.django import mixer
+
+from posts.community import manual_dates
+from posts.counters import recount_all
+from posts.models import Comment, Follow, Group, Post
+from posts.search import rebuild_index
+
+User = get_user_model()
+
+SIZES = {
+    "users": 100000,
+    "groups": 100,
+    "posts": 1000000,
+    "comments": 5000000,
+    "follows": 2000000,
+}
+TEXTS = 2000
+PERIOD = timedelta(days=3 * 365)
+
+
+def next_id(model):
+    """Return first free primary key of the model."""
+    return (model.objects.aggregate(last=Max("pk"))["last"] or 0) + 1
+
+
+def popularity(rng, count, alpha=1.2):
+    """Return cumulative heavy-tailed weights of count items."""
+    return list(itertools.accumulate(
+        rng.paretovariate(alpha) for _ in range(count)
+    ))
+
+
+def batches(items, size):
+    """Split iterable into lists of the given size."""
+    iterator = iter(items)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class DatasetBuilder:
+    """Fill database with synthetic users, posts, comments and follows."""
+
+    def __init__(self, seed=0, batch_size=5000, log=None):
+        """Seed generators."""
+        self.rng = random.Random(seed)
+        self.fake = Faker("ru_RU")
+        self.fake.seed_instance(seed)
+        self.batch_size = batch_size
+        self.log = log or (lambda message: None)
+        self.now = timezone.now()
+
+    def texts(self, count, words):
+        """Return pool of generated texts."""
+        return [
+            self.fake.sentence(nb_words=words) for _ in range(count)
+        ]
+
+    def insert(self, model, rows):
+        """Bulk insert generated rows batch by batch."""
+        total = 0
+        for batch in batches(rows, self.batch_size):
+            model.objects.bulk_create(batch, ignore_conflicts=True)
+            total += len(batch)
+        self.log(f"{model.__name__}: {total} rows")
+
+    def random_date(self):
+        """Return moment within the dataset period."""
+        return self.now - PERIOD * self.rng.random()
+
+    def build(self, users, groups, posts, comments, follows):
+        """Insert rows of every model and rebuild derived data."""
+        first_user = next_id(User)
+        user_ids = range(first_user, first_user + users)
+        password = make_password(None)
+        first_names = [self.fake.first_name() for _ in range(500)]
+        last_names = [self.fake.last_name() for _ in range(500)]
+        self.insert(User, (
+            User(
+                pk=pk,
+                username=f"bench{pk}",
+                first_name=self.rng.choice(first_names),
+                last_name=self.rng.choice(last_names),
+                password=password,
+            )
+            for pk in user_ids
+        ))
+
+        first_group = next_id(Group)
+        group_ids = [
+            group.pk for group in mixer.cycle(groups).blend(
+                Group,
+                slug=mixer.sequence(
+                    lambda number: f"bench-{first_group + number}",
+                ),
+            )
+        ] if groups else []
+
+        author_weights = popularity(self.rng, users)
+        post_texts = self.texts(TEXTS, 40)
+        first_post = next_id(Post)
+        post_ids = range(first_post, first_post + posts)
+        pub_date = Post._meta.get_field("pub_date")
+        with manual_dates(pub_date):
+            self.insert(Post, (
+                Post(
+                    pk=pk,
+                    author_id=self.rng.choices(
+                        user_ids, cum_weights=author_weights,
+                    )[0],
+                    group_id=(
+                        self.rng.choice(group_ids)
+                        if group_ids and self.rng.random() < 0.7 else None
+                    ),
+                    text=self.rng.choice(post_texts),
+                    pub_date=self.random_date(),
+                )
+                for pk in post_ids
+            ))
+
+        post_weights = popularity(self.rng, posts)
+        comment_texts = self.texts(TEXTS, 12)
+        created = Comment._meta.get_field("created")
+        with manual_dates(created):
+            self.insert(Comment, (
+                Comment(
+                    post_id=self.rng.choices(
+                        post_ids, cum_weights=post_weights,
+                    )[0],
+                    author_id=self.rng.choice(user_ids),
+                    text=self.rng.choice(comment_texts),
+                    created=self.random_date(),
+                )
+                for _ in range(comments)
+            ))
+
+        self.insert(Follow, (
+            Follow(user_id=user_id, author_id=author_id)
+            for user_id, author_id in (
+                (
+                    self.rng.choice(user_ids),
+                    self.rng.choices(user_ids, cum_weights=author_weights)[0],
+                )
+                for _ in range(follows)
+            )
+            if user_id != author_id
+        ))
+
+        self.log("Recounting counters")
+        recount_all()
+        self.log("Rebuilding follow feeds")
+        call_command("rebuild_feeds", stdout=io.StringIO())
+        self.log("Rebuilding search index")
+        rebuild_index()
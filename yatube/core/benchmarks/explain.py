@@ -0,0 +1,77 @@
+"""Query plans of SELECT queries made by routes.
+
+Queries are captured while benchmark routes are requested and then run
+again under EXPLAIN. A plan step reading a whole table instead of
+seeking through an index is reported as a full scan.
+"""
+import re
+
+from django.db import connection
+from django.test import override_settings
+
+from core.benchmarks.runner import make_client
+
+SQLITE_SCAN = re.compile(
+    r"^SCAN (?:TABLE )?(\w+)\b(?! USING| VIRTUAL TABLE INDEX)",
+)
+POSTGRES_SCAN = re.compile(r"Seq Scan on (\w+)")
+
+# Tables read whole by design: every group is listed in the post form.
+ALLOWED_SCANS = {"posts_group", "CONSTANT"}
+
+
+class QueryCollector:
+    """Database execute wrapper remembering distinct SELECT queries."""
+
+    def __init__(self):
+        """Start with no queries."""
+        self.queries = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        """Remember query and run it."""
+        if sql.lstrip().upper().startswith("SELECT"):
+            self.queries.setdefault(sql, params)
+        return execute(sql, params, many, context)
+
+
+def route_queries(route, targets):
+    """Return distinct SELECT queries made by the route."""
+    client = make_client(route, targets)
+    collector = QueryCollector()
+    with override_settings(REQUEST_QUERY_BUDGET=None):
+        with connection.execute_wrapper(collector):
+            client.get(route.url(targets), route.query(targets))
+    return collector.queries
+
+
+def explain(sql, params):
+    """Return plan of the query as lines of text."""
+    if connection.vendor == "sqlite":
+        prefix = "EXPLAIN QUERY PLAN "
+    elif connection.vendor == "postgresql":
+        prefix = "EXPLAIN "
+    else:
+        raise NotImplementedError(
+            f"EXPLAIN is not supported for {connection.vendor}",
+        )
+    with connection.cursor() as cursor:
+        cursor.execute(prefix + sql, params)
+        return [str(row[-1]) for row in cursor.fetchall()]
+
+
+def sorts(plan):
+    """Check if the plan sorts rows instead of reading them in order."""
+    return any("TEMP B-TREE FOR ORDER BY" in line for line in plan) or any(
+        line.strip().startswith("Sort ") for line in plan
+    )
+
+
+def full_scans(plan):
+    """Return names of tables the plan reads whole."""
+    pattern = SQLITE_SCAN if connection.vendor == "sqlite" else POSTGRES_SCAN
+    tables = set()
+    for line in plan:
+        match = pattern.search(line.strip())
+        if match and match.group(1) not in ALLOWED_SCANS:
+            tables.add(match.group(1))
+    return tables
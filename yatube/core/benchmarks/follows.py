@@ -0,0 +1,121 @@
+"""Followers page of an account with a huge audience.
+
+build() gives a celebrity account the requested number of followers,
+bulk inserted without signals. run() requests its followers page warm
+from cache, cold after the cached page went stale, and deep in the list
+by cursor, and times the query of a page at the same depth done with
+COUNT and OFFSET the way a numbered paginator does it.
+"""
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.paginator import Paginator
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+
+from core.benchmarks.dataset import DatasetBuilder, next_id
+from core.benchmarks.runner import QueryCounter, percentile
+from posts import feed_cache
+from posts.models import Follow, UserStats
+from posts.pagination import encode_cursor
+from yatube.settings import MAX_USERS_PER_PAGE
+
+User = get_user_model()
+
+CELEBRITY = "bench_celebrity"
+
+
+def build(followers, batch_size=5000, log=None):
+    """Return celebrity with at least the given number of followers."""
+    celebrity, _ = User.objects.get_or_create(username=CELEBRITY)
+    missing = followers - Follow.objects.filter(author=celebrity).count()
+    if missing > 0:
+        builder = DatasetBuilder(batch_size=batch_size, log=log)
+        first = next_id(User)
+        fan_ids = range(first, first + missing)
+        password = make_password(None)
+        builder.insert(User, (
+            User(pk=pk, username=f"bench_fan{pk}", password=password)
+            for pk in fan_ids
+        ))
+        builder.insert(Follow, (
+            Follow(user_id=pk, author=celebrity) for pk in fan_ids
+        ))
+        builder.insert(UserStats, (
+            UserStats(user_id=pk, following_count=1) for pk in fan_ids
+        ))
+    UserStats.objects.filter(user=celebrity).update(
+        follower_count=Follow.objects.filter(author=celebrity).count(),
+    )
+    return celebrity
+
+
+def summarize(timings, queries):
+    """Return median and p95 of timings with number of queries."""
+    return {
+        "median_ms": round(percentile(timings, 0.5), 3),
+        "p95_ms": round(percentile(timings, 0.95), 3),
+        "queries": queries,
+    }
+
+
+def measure(action, repeat, before=None):
+    """Time action, return summary with queries of its last run."""
+    timings = []
+    for _ in range(repeat):
+        if before is not None:
+            before()
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            started = time.perf_counter()
+            action()
+            timings.append((time.perf_counter() - started) * 1000)
+    return summarize(timings, counter.count)
+
+
+def run(celebrity, repeat):
+    """Measure followers page of the celebrity."""
+    client = Client()
+    url = reverse("posts:followers", kwargs={"username": celebrity.username})
+    follows = Follow.objects.filter(author=celebrity).select_related("user")
+    depth = follows.count() // 2
+    deep_user = (
+        follows.order_by("-user_id")
+        .values_list("user_id", flat=True)[depth:depth + 1]
+        .first()
+    )
+    cursor = encode_cursor([deep_user]) if deep_user else ""
+    offset_page = (depth // MAX_USERS_PER_PAGE) + 1
+
+    def get(query=None):
+        response = client.get(url, query or {})
+        assert response.status_code == 200, response.status_code
+
+    def offset_query():
+        paginator = Paginator(follows.order_by("-user_id"), MAX_USERS_PER_PAGE)
+        list(paginator.get_page(offset_page))
+
+    def seek_query():
+        list(
+            follows.filter(user_id__lt=deep_user or 0)
+            .order_by("-user_id")[:MAX_USERS_PER_PAGE + 1],
+        )
+
+    get()
+    return {
+        "first page, warm": measure(get, repeat),
+        "first page, cold": measure(
+            get,
+            repeat,
+            before=lambda: feed_cache.bump_generation(
+                f"followers:{celebrity.pk}",
+            ),
+        ),
+        f"page at {depth}, cursor": measure(
+            lambda: get({"cursor": cursor}), repeat,
+        ),
+        f"query at {depth}, cursor": measure(seek_query, repeat),
+        f"query at {depth}, count and offset": measure(offset_query, repeat),
+    }
@@ -0,0 +1,113 @@
+"""Routes measured by benchmarks.
+
+Every named GET route of posts, users and about apps is requested with
+arguments pointing at the heaviest objects of the dataset: the biggest
+group, the most followed author, the most commented post and the reader
+following most accounts. Routes changing data are left out, and routes
+needing an object the dataset lacks, e.g. a group, are skipped.
+"""
+import re
+from collections import namedtuple
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from posts.models import Group, Post, UserStats
+
+User = get_user_model()
+
+Targets = namedtuple(
+    "Targets", ("group", "author", "own_post", "post", "reader", "word"),
+)
+
+
+class Route:
+    """Named url with a way to build its arguments and a login role."""
+
+    def __init__(self, name, kwargs=None, query=None, login=None, needs=()):
+        """Store route description."""
+        self.name = name
+        self.kwargs = kwargs or (lambda targets: {})
+        self.query = query or (lambda targets: {})
+        self.login = login
+        self.needs = needs
+
+    def missing(self, targets):
+        """Return names of needed targets the dataset has none of."""
+        return [name for name in self.needs if getattr(targets, name) is None]
+
+    def url(self, targets):
+        """Return path of the route for the dataset targets."""
+        return reverse(self.name, kwargs=self.kwargs(targets))
+
+    def user(self, targets):
+        """Return user the route is requested by or None."""
+        return getattr(targets, self.login) if self.login else None
+
+
+ROUTES = (
+    Route("posts:index"),
+    Route(
+        "posts:group_list",
+        lambda t: {"slug": t.group.slug},
+        needs=("group",),
+    ),
+    Route("posts:profile", lambda t: {"username": t.author.username}),
+    Route(
+        "posts:post_detail",
+        lambda t: {"post_id": t.post.pk},
+        needs=("post",),
+    ),
+    Route(
+        "posts:post_comments",
+        lambda t: {"post_id": t.post.pk},
+        needs=("post",),
+    ),
+    Route("posts:follow_index", login="reader"),
+    Route("posts:followers", lambda t: {"username": t.author.username}),
+    Route("posts:following", lambda t: {"username": t.reader.username}),
+    Route("posts:search", query=lambda t: {"q": t.word}),
+    Route("posts:post_create", login="author"),
+    Route(
+        "posts:post_edit",
+        lambda t: {"post_id": t.own_post.pk},
+        login="author",
+        needs=("own_post",),
+    ),
+    Route("about:author"),
+    Route("about:tech"),
+    Route("users:signup"),
+    Route("users:login"),
+    Route("users:password_change_form", login="reader"),
+    Route("users:password_change_done", login="reader"),
+    Route("users:password_reset_form"),
+    Route("users:password_reset_done"),
+    Route(
+        "users:password_reset_confirm",
+        lambda t: {"uidb64": "MQ", "token": "invalid-token"},
+    ),
+    Route("users:password_reset_complete"),
+    Route("users:logout", login="reader"),
+)
+
+
+def pick_targets():
+    """Find the heaviest objects of the dataset."""
+    author_stats = (
+        UserStats.objects.filter(post_count__gt=0)
+        .order_by("-follower_count", "pk")
+        .first()
+    )
+    reader_stats = (
+        UserStats.objects.order_by("-following_count", "pk").first()
+    )
+    post = Post.objects.order_by("-comment_count", "pk").first()
+    words = re.findall(r"\w{4,}", post.text) if post else []
+    return Targets(
+        group=Group.objects.order_by("-post_count", "pk").first(),
+        author=User.objects.get(pk=author_stats.user_id),
+        own_post=Post.objects.filter(author_id=author_stats.user_id).first(),
+        post=post,
+        reader=User.objects.get(pk=reader_stats.user_id),
+        word=words[0] if words else "post",
+    )
@@ -0,0 +1,165 @@
+"""Measuring routes and comparing measurements with a baseline.
+
+Each route is requested once on an empty cache to count queries of a
+cold render, once more under tracemalloc for peak memory, and then the
+given number of times to sample latency of warm renders.
+"""
+import json
+import math
+import time
+import tracemalloc
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, override_settings
+
+from core.benchmarks.routes import ROUTES, pick_targets
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+def percentile(values, fraction):
+    """Return nearest-rank percentile of the values."""
+    ordered = sorted(values)
+    rank = max(math.ceil(fraction * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+class QueryCounter:
+    """Database execute wrapper counting queries.
+
+    Unlike connection.queries it is not reset when a request starts.
+    """
+
+    def __init__(self):
+        """Start from zero."""
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        """Count query and run it."""
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def make_client(route, targets):
+    """Return client logged in as the user of the route."""
+    client = Client()
+    user = route.user(targets)
+    if user is not None:
+        client.force_login(user)
+    return client
+
+
+def count_queries(route, targets):
+    """Request the route and return response with number of queries."""
+    client = make_client(route, targets)
+    counter = QueryCounter()
+    with connection.execute_wrapper(counter):
+        response = client.get(route.url(targets), route.query(targets))
+    return response, counter.count
+
+
+def request(route, targets):
+    """Request the route as its user and return the response."""
+    client = make_client(route, targets)
+    return client.get(route.url(targets), route.query(targets))
+
+
+def measure(route, targets, repeat):
+    """Return measurements of one route."""
+    cache.clear()
+    response, cold_queries = count_queries(route, targets)
+    _, warm_queries = count_queries(route, targets)
+
+    tracemalloc.start()
+    try:
+        request(route, targets)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        request(route, targets)
+        timings.append((time.perf_counter() - started) * 1000)
+    return {
+        "url": route.url(targets),
+        "status": response.status_code,
+        "queries": cold_queries,
+        "warm_queries": warm_queries,
+        "p50_ms": round(percentile(timings, 0.5), 2),
+        "p95_ms": round(percentile(timings, 0.95), 2),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def dataset_sizes():
+    """Count rows of the benchmarked dataset."""
+    return {
+        "users": User.objects.count(),
+        "groups": Group.objects.count(),
+        "posts": Post.objects.count(),
+        "comments": Comment.objects.count(),
+        "follows": Follow.objects.count(),
+    }
+
+
+def run(repeat=20, routes=ROUTES):
+    """Measure every route the dataset has targets for.
+
+    Query budget warnings are off, the counts are reported anyway.
+    """
+    targets = pick_targets()
+    with override_settings(REQUEST_QUERY_BUDGET=None):
+        return {
+            route.name: measure(route, targets, repeat)
+            for route in routes if not route.missing(targets)
+        }
+
+
+def compare(results, baseline, tolerance=0.25, same_dataset=True):
+    """Return descriptions of regressions against the baseline.
+
+    Query counts must not grow at all. Latency and memory may grow by
+    the tolerance share and are only compared on the same dataset.
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        for key in ("queries", "warm_queries"):
+            if result[key] > base[key]:
+                regressions.append(
+                    f"{name}: {key} {base[key]} -> {result[key]}",
+                )
+        if not same_dataset:
+            continue
+        for key in ("p95_ms", "peak_kib"):
+            if result[key] > base[key] * (1 + tolerance):
+                regressions.append(
+                    f"{name}: {key} {base[key]} -> {result[key]}",
+                )
+    return regressions
+
+
+def load_baseline(path):
+    """Read baseline file."""
+    with open(path, encoding="utf-8") as baseline_file:
+        return json.load(baseline_file)
+
+
+def save_baseline(path, dataset, results):
+    """Write measurements as the new baseline."""
+    with open(path, "w", encoding="utf-8") as baseline_file:
+        json.dump(
+            {"dataset": dataset, "routes": results},
+            baseline_file,
+            ensure_ascii=False,
+            indent=2,
+            sort_keys=True,
+        )
+        baseline_file.write("\n")
@@ -0,0 +1,121 @@
+"""Concurrent read and write throughput of a SQLite database file.
+
+Writer threads add comments the way add_comment does: a comment row and
+a counter update in one transaction. Reader threads meanwhile read the
+latest comments of random posts. Every thread has its own connection,
+as every worker thread of the server does.
+"""
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from core.db import apply_pragmas
+
+POSTS = 100
+
+SCHEMA = (
+    "CREATE TABLE post ("
+    "id INTEGER PRIMARY KEY, comment_count INTEGER NOT NULL DEFAULT 0)",
+    "CREATE TABLE comment ("
+    "id INTEGER PRIMARY KEY, post_id INTEGER NOT NULL, "
+    "text TEXT NOT NULL, created REAL NOT NULL)",
+    "CREATE INDEX comment_post_created ON comment (post_id, created)",
+)
+
+
+def connect(path, pragmas):
+    """Open connection in autocommit mode, as Django does."""
+    db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+    apply_pragmas(db.cursor(), pragmas)
+    return db
+
+
+def create(path, pragmas):
+    """Create benchmark tables with posts."""
+    db = connect(path, pragmas)
+    for statement in SCHEMA:
+        db.execute(statement)
+    db.executemany(
+        "INSERT INTO post (id) VALUES (?)",
+        [(pk,) for pk in range(1, POSTS + 1)],
+    )
+    db.close()
+
+
+def write(db, rng):
+    """Add comment to a random post."""
+    post_id = rng.randint(1, POSTS)
+    db.execute("BEGIN")
+    try:
+        db.execute(
+            "INSERT INTO comment (post_id, text, created) VALUES (?, ?, ?)",
+            (post_id, "comment " * 20, time.time()),
+        )
+        db.execute(
+            "UPDATE post SET comment_count = comment_count + 1 "
+            "WHERE id = ?",
+            (post_id,),
+        )
+        db.execute("COMMIT")
+    except sqlite3.OperationalError:
+        db.execute("ROLLBACK")
+        raise
+
+
+def read(db, rng):
+    """Read latest comments of a random post."""
+    db.execute(
+        "SELECT id, text FROM comment WHERE post_id = ? "
+        "ORDER BY created DESC LIMIT 10",
+        (rng.randint(1, POSTS),),
+    ).fetchall()
+
+
+def worker(path, pragmas, operation, deadline, seed, totals, lock):
+    """Repeat operation until the deadline and add up the outcomes."""
+    rng = random.Random(seed)
+    db = connect(path, pragmas)
+    done = locked = 0
+    while time.perf_counter() < deadline:
+        try:
+            operation(db, rng)
+            done += 1
+        except sqlite3.OperationalError as error:
+            if "locked" not in str(error):
+                raise
+            locked += 1
+    db.close()
+    with lock:
+        totals[operation.__name__] += done
+        totals["locked"] += locked
+
+
+def run(pragmas, writers=4, readers=4, seconds=3.0, directory=None):
+    """Measure operations per second on a fresh database file."""
+    with tempfile.TemporaryDirectory(dir=directory) as tmp:
+        path = os.path.join(tmp, "bench.sqlite3")
+        create(path, pragmas)
+        totals = {"write": 0, "read": 0, "locked": 0}
+        lock = threading.Lock()
+        deadline = time.perf_counter() + seconds
+        threads = [
+            threading.Thread(
+                target=worker,
+                args=(path, pragmas, operation, deadline, seed, totals, lock),
+            )
+            for seed, operation in enumerate(
+                [write] * writers + [read] * readers,
+            )
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    return {
+        "writes_per_second": round(totals["write"] / seconds),
+        "reads_per_second": round(totals["read"] / seconds),
+        "locked": totals["locked"],
+    }
@@ -0,0 +1,137 @@
+"""Render time of the index and post pages under template profiles.
+
+Pages are rendered from unsaved objects, so no query is made and only
+the template engine is measured: a 10-card index page and a post page
+with 20 comments. Cards are rendered every time instead of being taken
+from the card cache.
+"""
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.paginator import Paginator
+from django.template.backends.django import DjangoTemplates
+from django.test import RequestFactory, override_settings
+from django.utils import timezone
+
+from core.benchmarks.runner import percentile
+from posts.forms import CommentForm
+from posts.models import Comment, Group, Post, UserStats
+from posts.pagination import WindowedPaginator
+
+User = get_user_model()
+
+CARDS = 10
+COMMENTS = 20
+LOADERS = [
+    "django.template.loaders.filesystem.Loader",
+    "django.template.loaders.app_directories.Loader",
+]
+CACHED_LOADERS = [("django.template.loaders.cached.Loader", LOADERS)]
+
+
+def profiles():
+    """Return name, loaders and prefixed views of compared profiles."""
+    return (
+        ("uncached loader, reverse", LOADERS, ()),
+        ("cached loader, reverse", CACHED_LOADERS, ()),
+        ("cached loader, prefixes", CACHED_LOADERS,
+         settings.URL_PREFIX_VIEWS),
+    )
+
+
+def make_engine(loaders):
+    """Return template backend of the project with the given loaders."""
+    config = settings.TEMPLATES[0]
+    return DjangoTemplates({
+        "NAME": "bench_templates",
+        "DIRS": config["DIRS"],
+        "APP_DIRS": False,
+        "OPTIONS": dict(config["OPTIONS"], loaders=loaders),
+    })
+
+
+def make_pages():
+    """Return request and contexts of the index and post pages."""
+    author = User(
+        pk=1, username="bench_author", first_name="Bench", last_name="Author",
+    )
+    author.stats = UserStats(user=author, post_count=CARDS)
+    group = Group(pk=1, title="Bench group", slug="bench-group")
+    now = timezone.now()
+    posts = [
+        Post(
+            pk=pk,
+            author=author,
+            group=group,
+            text=f"Benchmark post {pk} " * 20,
+            pub_date=now,
+            updated=now,
+            comment_count=COMMENTS,
+        )
+        for pk in range(1, CARDS + 1)
+    ]
+    for post in posts:
+        post.card_cache_key = f"bench_templates:{post.pk}"
+    comments = [
+        Comment(
+            pk=pk,
+            post=posts[0],
+            author=author,
+            text=f"Benchmark comment {pk}",
+            created=now,
+        )
+        for pk in range(1, COMMENTS * 2 + 1)
+    ]
+    request = RequestFactory().get("/")
+    request.user = author
+    # A middle page of a long feed, as paginator links go.
+    paginator = WindowedPaginator(posts * 50, CARDS, count=500)
+    index = {
+        "page_obj": paginator.get_page(25),
+        "title": "Benchmark",
+        "is_group_link": True,
+    }
+    detail = {
+        "post": posts[0],
+        "is_author": True,
+        "form": CommentForm(),
+        "page_obj": Paginator(comments, COMMENTS).get_page(1),
+    }
+    return request, posts, (
+        ("index", "posts/index.html", index),
+        ("post_detail", "posts/post_detail.html", detail),
+    )
+
+
+def measure(engine, request, posts, name, context, repeat):
+    """Return render times of the template in milliseconds."""
+    template = engine.get_template(name)
+    timings = []
+    for _ in range(repeat):
+        for post in posts:
+            post.cached_card = None
+        started = time.perf_counter()
+        template.render(context, request)
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def run(repeat):
+    """Render pages under every profile, return median and p95 times."""
+    request, posts, pages = make_pages()
+    results = {}
+    for profile, loaders, prefixed in profiles():
+        engine = make_engine(loaders)
+        with override_settings(URL_PREFIX_VIEWS=prefixed):
+            for page, name, context in pages:
+                # One render to fill the loader cache and the prefixes.
+                measure(engine, request, posts, name, context, 1)
+                timings = measure(
+                    engine, request, posts, name, context, repeat,
+                )
+                results[profile, page] = {
+                    "median_ms": round(percentile(timings, 0.5), 3),
+                    "p95_ms": round(percentile(timings, 0.95), 3),
+                }
+    return results
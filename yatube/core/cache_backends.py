@@ -0,0 +1,214 @@
+"""Cache backends of yatube project.
+
+TwoTierCache keeps a small in-process LRU in front of a shared network
+cache (memcached, redis) configured under another alias. Local copies
+live only LOCAL_TIMEOUT seconds, which bounds how long one worker may
+miss an invalidation made by another one.
+
+FakeSharedCache stands in for the network cache in tests: it is shared
+by every client in the process and is as strict about keys and values
+as memcached is.
+"""
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import (
+    DEFAULT_TIMEOUT,
+    BaseCache,
+    InvalidCacheKey,
+    memcache_key_warnings,
+)
+from django.core.cache.backends.locmem import LocMemCache
+
+MISSING = object()
+
+
+class TwoTierCache(BaseCache):
+    """In-process LRU cache in front of a shared cache alias."""
+
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        """Read tier options."""
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        self.shared_alias = options.get("SHARED_ALIAS", "shared")
+        self.local_timeout = options.get("LOCAL_TIMEOUT", 2)
+        self.local_max_entries = options.get("LOCAL_MAX_ENTRIES", 1000)
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def shared(self):
+        """Return backend of the shared tier."""
+        return caches[self.shared_alias]
+
+    def clock(self):
+        """Return current time of the local tier."""
+        return time.monotonic()
+
+    def local_key(self, key, version):
+        """Return key identifying the value in both tiers."""
+        return self.shared.make_key(key, version=version)
+
+    def _local_get(self, key):
+        """Return locally cached value or MISSING."""
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return MISSING
+            expires, pickled = entry
+            if expires <= self.clock():
+                del self._local[key]
+                return MISSING
+            self._local.move_to_end(key)
+        return pickle.loads(pickled)
+
+    def _local_set(self, key, value, timeout=DEFAULT_TIMEOUT):
+        """Keep a short-lived local copy of the value."""
+        lifetime = self.local_timeout
+        if timeout is not DEFAULT_TIMEOUT and timeout is not None:
+            lifetime = min(lifetime, timeout)
+        if lifetime <= 0:
+            self._local_delete(key)
+            return
+        pickled = pickle.dumps(value, self.pickle_protocol)
+        with self._lock:
+            self._local[key] = (self.clock() + lifetime, pickled)
+            self._local.move_to_end(key)
+            while len(self._local) > self.local_max_entries:
+                self._local.popitem(last=False)
+
+    def _local_delete(self, key):
+        """Forget local copy of the value."""
+        with self._lock:
+            self._local.pop(key, None)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        """Add value to shared tier if it is not there yet."""
+        added = self.shared.add(key, value, timeout, version)
+        local_key = self.local_key(key, version)
+        if added:
+            self._local_set(local_key, value, timeout)
+        else:
+            self._local_delete(local_key)
+        return added
+
+    def get(self, key, default=None, version=None):
+        """Read value from local tier, then from shared one."""
+        local_key = self.local_key(key, version)
+        value = self._local_get(local_key)
+        if value is not MISSING:
+            return value
+        value = self.shared.get(key, MISSING, version)
+        if value is MISSING:
+            return default
+        self._local_set(local_key, value)
+        return value
+
+    def get_many(self, keys, version=None):
+        """Read values from local tier, the rest in one shared call."""
+        found = {}
+        remote = []
+        for key in keys:
+            value = self._local_get(self.local_key(key, version))
+            if value is MISSING:
+                remote.append(key)
+            else:
+                found[key] = value
+        if remote:
+            fetched = self.shared.get_many(remote, version)
+            for key, value in fetched.items():
+                self._local_set(self.local_key(key, version), value)
+            found.update(fetched)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        """Write value to both tiers."""
+        self.shared.set(key, value, timeout, version)
+        self._local_set(self.local_key(key, version), value, timeout)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        """Write values to both tiers."""
+        failed = self.shared.set_many(data, timeout, version)
+        for key, value in data.items():
+            self._local_set(self.local_key(key, version), value, timeout)
+        return failed
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        """Update expiry of the shared value."""
+        return self.shared.touch(key, timeout, version)
+
+    def delete(self, key, version=None):
+        """Drop value from both tiers."""
+        self.shared.delete(key, version)
+        self._local_delete(self.local_key(key, version))
+
+    def delete_many(self, keys, version=None):
+        """Drop values from both tiers."""
+        self.shared.delete_many(keys, version)
+        for key in keys:
+            self._local_delete(self.local_key(key, version))
+
+    def has_key(self, key, version=None):
+        """Check if any tier has the value."""
+        local_key = self.local_key(key, version)
+        if self._local_get(local_key) is not MISSING:
+            return True
+        return self.shared.has_key(key, version)
+
+    def incr(self, key, delta=1, version=None):
+        """Increment value in shared tier, where counters live."""
+        self._local_delete(self.local_key(key, version))
+        return self.shared.incr(key, delta, version)
+
+    def clear(self):
+        """Empty both tiers."""
+        self.shared.clear()
+        self.clear_local()
+
+    def clear_local(self):
+        """Empty local tier of this process."""
+        with self._lock:
+            self._local.clear()
+
+
+class FakeSharedCache(LocMemCache):
+    """Pure-python stand-in of a shared network cache.
+
+    Every client with the same LOCATION sees the same data, like clients
+    of one memcached server do. Keys memcached would reject and values
+    over its item size limit raise errors instead of warnings.
+    """
+
+    def __init__(self, name, params):
+        """Read size limit."""
+        super().__init__(name, params)
+        options = params.get("OPTIONS", {})
+        self.max_value_size = options.get("MAX_VALUE_SIZE", 1024 * 1024)
+
+    def validate_key(self, key):
+        """Reject keys memcached would not accept."""
+        for warning in memcache_key_warnings(key):
+            raise InvalidCacheKey(warning)
+
+    def _check_size(self, value):
+        """Reject values memcached would not store."""
+        size = len(pickle.dumps(value, self.pickle_protocol))
+        if size > self.max_value_size:
+            raise ValueError(
+                f"Value of {size} bytes exceeds {self.max_value_size} limit",
+            )
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        """Add value after checking its size."""
+        self._check_size(value)
+        return super().add(key, value, timeout, version)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        """Set value after checking its size."""
+        self._check_size(value)
+        super().set(key, value, timeout, version)
@@ -0,0 +1,117 @@
+"""Independent parts of a view run concurrently.
+
+Views are synchronous, so a view needing several things that do not
+depend on each other, e.g. rows of a page and the author shown beside
+them, passes them to gather(). The first part runs in the calling
+thread, the rest on a shared pool of threads, each with its own
+database connection kept between parts as long as CONN_MAX_AGE allows.
+Parts run
+in a copy of the request context, so the chosen replica and request
+statistics carry over, and under execute wrappers of the request
+connections, so their queries are counted as queries of the request.
+
+Inside a transaction the parts run one by one in the calling thread,
+since other connections would not see its writes.
+"""
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Return shared pool of threads, starting it if needed."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.CONCURRENT_FETCH_THREADS,
+                thread_name_prefix="fetch",
+            )
+        return _executor
+
+
+def in_transaction():
+    """Check if any connection of this thread is in an atomic block."""
+    return any(connection.in_atomic_block for connection in connections.all())
+
+
+def release_connections():
+    """Close connections of the thread that failed or outlived CONN_MAX_AGE."""
+    for connection in connections.all():
+        connection.close_if_unusable_or_obsolete()
+
+
+def close_request_connections():
+    """Close connections of the thread not kept beyond a request.
+
+    Pool threads outlive requests and never see request_finished, so
+    connections with CONN_MAX_AGE of 0 are closed once the part is over.
+    """
+    for connection in connections.all():
+        if connection.settings_dict["CONN_MAX_AGE"] == 0:
+            connection.close()
+
+
+def run_part(call, wrappers, connected):
+    """Run part of a view under execute wrappers of the request.
+
+    Databases the request is connected to are connected to first, so
+    setting the connection up is not counted as queries of the request.
+    """
+    release_connections()
+    try:
+        for alias in connected:
+            connections[alias].ensure_connection()
+        with ExitStack() as stack:
+            for alias, alias_wrappers in wrappers.items():
+                for wrapper in alias_wrappers:
+                    stack.enter_context(
+                        connections[alias].execute_wrapper(wrapper),
+                    )
+            return call()
+    finally:
+        close_request_connections()
+
+
+def gather(*calls):
+    """Run callables concurrently, return their results in order.
+
+    An exception of a part is raised once every part is over.
+    """
+    if (
+        len(calls) < 2
+        or settings.CONCURRENT_FETCH_THREADS <= 0
+        or in_transaction()
+    ):
+        return [call() for call in calls]
+    wrappers = {
+        connection.alias: list(connection.execute_wrappers)
+        for connection in connections.all()
+    }
+    connected = [
+        connection.alias for connection in connections.all()
+        if connection.connection is not None
+    ]
+    executor = get_executor()
+    futures = [
+        executor.submit(
+            contextvars.copy_context().run,
+            run_part,
+            call,
+            wrappers,
+            connected,
+        )
+        for call in calls[1:]
+    ]
+    try:
+        first = calls[0]()
+    finally:
+        wait(futures)
+    return [first] + [future.result() for future in futures]
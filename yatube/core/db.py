@@ -0,0 +1,87 @@
+"""Database routing and connection checks.
+
+Reads go to the primary unless ReplicaMiddleware marked the request as
+safe to read from a replica: a GET of a read-only view by a client that
+has not written anything recently. Writes always go to the primary.
+"""
+import contextvars
+import random
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_read_alias = contextvars.ContextVar("read_alias", default=None)
+
+
+def replica_aliases():
+    """Return aliases of configured replicas."""
+    return [alias for alias in settings.DATABASES if alias != "default"]
+
+
+def use_replica():
+    """Send reads of the current request to one of the replicas.
+
+    Returns token for release_replica(), or None without replicas.
+    """
+    aliases = replica_aliases()
+    if not aliases:
+        return None
+    return _read_alias.set(random.choice(aliases))
+
+
+def release_replica(token):
+    """Send reads back to the primary."""
+    if token is not None:
+        _read_alias.reset(token)
+
+
+class ReplicaRouter:
+    """Route reads of marked requests to a replica, the rest to primary."""
+
+    def db_for_read(self, model, **hints):
+        """Return replica chosen for the request or the primary."""
+        return _read_alias.get() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        """Write to the primary."""
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        """Allow relations, every database holds the same data."""
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        """Migrate only the primary, replicas follow it."""
+        return db == DEFAULT_DB_ALIAS
+
+
+def check_connections(**kwargs):
+    """Close persistent connections that stopped working.
+
+    Runs when a request starts, so a connection dropped by the server
+    while the worker was idle is reopened instead of failing the request.
+    """
+    if not settings.DATABASE_HEALTH_CHECKS:
+        return
+    for connection in connections.all():
+        if connection.connection is not None and not connection.is_usable():
+            connection.close()
+
+
+def apply_pragmas(cursor, pragmas):
+    """Run PRAGMA statements on a SQLite connection."""
+    for name, pragma_value in pragmas.items():
+        cursor.execute(f"PRAGMA {name} = {pragma_value}")
+
+
+def tune_sqlite(sender, connection, **kwargs):
+    """Set SQLITE_PRAGMAS on every new SQLite connection.
+
+    WAL lets readers work while a writer commits, and busy_timeout makes
+    concurrent writers wait for the lock instead of failing with
+    "database is locked".
+    """
+    if connection.vendor != "sqlite" or not settings.SQLITE_TUNING:
+        return
+    with connection.cursor() as cursor:
+        apply_pragmas(cursor, settings.SQLITE_PRAGMAS)
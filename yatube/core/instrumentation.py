@@ -0,0 +1,171 @@
+"""Per-request performance statistics.
+
+RequestMetricsMiddleware opens a RequestStats for every request. SQL
+queries reach it through a database execute wrapper, template renders
+through the instrumented template backend and cache lookups through
+count_cache(). When the request is over, the statistics are added to
+process metrics under the name of the resolved view. Stacks of queries
+are taken only once the request goes over REQUEST_QUERY_BUDGET, the
+only case they are logged in.
+"""
+import contextvars
+import logging
+import threading
+import time
+import traceback
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from core import metrics
+
+logger = logging.getLogger("yatube.performance")
+
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+STACK_LIMIT = 12
+
+metrics.describe(
+    "http_requests_total", "Finished requests by view, method and status.",
+)
+metrics.describe(
+    "http_request_duration_seconds", "Request latency by view.",
+)
+metrics.describe(
+    "http_request_queries", "SQL queries per request by view.",
+    buckets=QUERY_BUCKETS,
+)
+metrics.describe("db_queries_total", "SQL queries by view.")
+metrics.describe("db_query_seconds_total", "Time spent in SQL by view.")
+metrics.describe(
+    "template_render_seconds_total", "Time spent rendering templates.",
+)
+metrics.describe(
+    "cache_lookups_total", "Cache lookups by view, cache and result.",
+)
+metrics.describe(
+    "query_budget_exceeded_total", "Requests over the query budget.",
+)
+
+_current = contextvars.ContextVar("request_stats", default=None)
+
+
+def current():
+    """Return statistics of the request in progress or None."""
+    return _current.get()
+
+
+def project_stack():
+    """Return stack frames of project code, innermost last."""
+    frames = [
+        frame for frame in traceback.extract_stack()
+        if settings.BASE_DIR in frame.filename
+        and "site-packages" not in frame.filename
+        and frame.filename != __file__
+    ]
+    return traceback.format_list(frames[-STACK_LIMIT:])
+
+
+class RequestStats:
+    """Statistics of one request."""
+
+    def __init__(self):
+        """Start collecting."""
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.query_time = 0.0
+        self.template_time = 0.0
+        self.cache = []
+        self.slowest_time = -1.0
+        self.slowest_sql = None
+        self.slowest_stack = None
+        self.budget = settings.REQUEST_QUERY_BUDGET
+        self.budget_stack = None
+        # Queries of parts run by gather() come from pool threads.
+        self.lock = threading.Lock()
+
+    def record_query(self, execute, sql, params, many, context):
+        """Execute wrapper timing every SQL query."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            with self.lock:
+                self.add_query(sql, duration)
+
+    def add_query(self, sql, duration):
+        """Count query that took duration seconds.
+
+        The stack of the slowest query is kept only if it came after the
+        query that went over the budget, whose stack is kept instead.
+        """
+        self.queries += 1
+        self.query_time += duration
+        over = self.budget is not None and self.queries > self.budget
+        stack = None
+        if over and self.budget_stack is None:
+            stack = self.budget_stack = project_stack()
+        if duration > self.slowest_time:
+            self.slowest_time = duration
+            self.slowest_sql = sql
+            self.slowest_stack = (stack or project_stack()) if over else None
+
+    def track(self):
+        """Return context collecting queries of every database."""
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(self.record_query))
+        stack.callback(_current.reset, _current.set(self))
+        return stack
+
+    def publish(self, view, method, status):
+        """Add statistics to process metrics."""
+        duration = time.perf_counter() - self.started
+        metrics.inc(
+            "http_requests_total", view=view, method=method, status=status,
+        )
+        metrics.observe("http_request_duration_seconds", duration, view=view)
+        metrics.observe("http_request_queries", self.queries, view=view)
+        metrics.inc("db_queries_total", self.queries, view=view)
+        metrics.inc("db_query_seconds_total", self.query_time, view=view)
+        metrics.inc(
+            "template_render_seconds_total", self.template_time, view=view,
+        )
+        for cache, result in self.cache:
+            metrics.inc(
+                "cache_lookups_total", view=view, cache=cache, result=result,
+            )
+        if self.budget is not None and self.queries > self.budget:
+            metrics.inc("query_budget_exceeded_total", view=view)
+            if self.slowest_stack is not None:
+                stack = "".join(self.slowest_stack)
+            else:
+                stack = "First query over the budget made at:\n" + "".join(
+                    self.budget_stack or (),
+                )
+            logger.warning(
+                "%s made %d queries (budget %d) in %.1f ms of SQL; "
+                "slowest query took %.1f ms:\n%s\n%s",
+                view,
+                self.queries,
+                self.budget,
+                self.query_time * 1000,
+                self.slowest_time * 1000,
+                self.slowest_sql,
+                stack,
+            )
+
+
+def count_cache(cache, result):
+    """Record cache lookup result of the request in progress."""
+    stats = current()
+    if stats is not None:
+        stats.cache.append((cache, result))
+
+
+def add_template_time(duration):
+    """Record time of a top-level template render."""
+    stats = current()
+    if stats is not None:
+        stats.template_time += duration
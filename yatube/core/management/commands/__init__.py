@@ -0,0 +1 @@
+"""Management commands of core app."""
@@ -0,0 +1,44 @@
+"""Management command comparing WSGI and ASGI under a slow database."""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.benchmarks import asgi
+
+
+class Command(BaseCommand):
+    """Load feed and detail pages through WSGI and ASGI handlers."""
+
+    help = (
+        "Delay every query by --delay milliseconds and send --requests "
+        "requests of the feed and detail pages from --clients concurrent "
+        "clients to sync WSGI workers and to the ASGI application, and "
+        "print requests per second with median and 95th percentile "
+        "latency."
+    )
+
+    def add_arguments(self, parser):
+        """Define load options."""
+        parser.add_argument("--clients", type=int, default=32)
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument("--delay", type=float, default=20)
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument(
+            "--threads", type=int, default=settings.ASGI_THREADS,
+        )
+
+    def handle(self, *args, **options):
+        """Run benchmark."""
+        results = asgi.run(
+            clients=options["clients"],
+            requests=options["requests"],
+            delay=options["delay"] / 1000,
+            workers=options["workers"],
+            threads=options["threads"],
+        )
+        for name, result in results.items():
+            self.stdout.write(
+                "{name:<40} {requests_per_second:>8} req/s "
+                "{p50_ms:>9} ms p50 {p95_ms:>9} ms p95".format(
+                    name=name, **result,
+                ),
+            )
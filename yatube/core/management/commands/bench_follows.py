@@ -0,0 +1,34 @@
+"""Management command measuring followers page of a huge account."""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.benchmarks import follows
+
+
+class Command(BaseCommand):
+    """Measure followers page of an account with a million followers."""
+
+    help = (
+        "Give a celebrity account the requested number of followers and "
+        "measure its followers page warm, cold and deep by cursor, next "
+        "to COUNT and OFFSET pagination. Use a dedicated database: "
+        "followers are added to existing rows."
+    )
+
+    def add_arguments(self, parser):
+        """Define size options."""
+        parser.add_argument("--followers", type=int, default=1000000)
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        """Run benchmark."""
+        with transaction.atomic():
+            celebrity = follows.build(
+                options["followers"], log=self.stdout.write,
+            )
+        results = follows.run(celebrity, options["repeat"])
+        for name, result in results.items():
+            self.stdout.write(
+                "{name:<40} {queries:>3}q {median_ms:>10} ms median "
+                "{p95_ms:>10} ms p95".format(name=name, **result),
+            )
@@ -0,0 +1,74 @@
+"""Management command benchmarking every named route."""
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmarks import runner
+
+BASELINE = os.path.join(
+    os.path.dirname(runner.__file__), "baseline.json",
+)
+
+
+class Command(BaseCommand):
+    """Measure routes and compare them with the baseline."""
+
+    help = (
+        "Request every named GET route of posts, users and about apps, "
+        "record query count, p50/p95 latency and peak memory, and fail "
+        "on regressions against the baseline."
+    )
+
+    def add_arguments(self, parser):
+        """Define run options."""
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--baseline", default=BASELINE)
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.25,
+            help="Allowed share of latency and memory growth.",
+        )
+        parser.add_argument(
+            "--update-baseline",
+            action="store_true",
+            help="Write results to the baseline instead of comparing.",
+        )
+
+    def handle(self, *args, **options):
+        """Run benchmarks."""
+        dataset = runner.dataset_sizes()
+        if not dataset["posts"]:
+            raise CommandError("Database is empty, run bench_seed first.")
+        results = runner.run(options["repeat"])
+
+        for name, result in results.items():
+            self.stdout.write(
+                "{name:<36} {status} {queries:>4}q {warm_queries:>4}q "
+                "p50 {p50_ms:>8}ms p95 {p95_ms:>8}ms "
+                "{peak_kib:>9}KiB".format(name=name, **result),
+            )
+
+        if options["update_baseline"]:
+            runner.save_baseline(options["baseline"], dataset, results)
+            self.stdout.write(f"Baseline is saved to {options['baseline']}.")
+            return
+
+        baseline = runner.load_baseline(options["baseline"])
+        same_dataset = baseline["dataset"] == dataset
+        if not same_dataset:
+            self.stdout.write(
+                "Dataset differs from the baseline one, "
+                "only query counts are compared.",
+            )
+        regressions = runner.compare(
+            results,
+            baseline["routes"],
+            options["tolerance"],
+            same_dataset,
+        )
+        if regressions:
+            raise CommandError(
+                "Regressions:\n" + "\n".join(regressions),
+            )
+        self.stdout.write("No regressions.")
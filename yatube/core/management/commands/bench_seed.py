@@ -0,0 +1,47 @@
+"""Management command filling database with benchmark dataset."""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.benchmarks.dataset import SIZES, DatasetBuilder
+
+
+class Command(BaseCommand):
+    """Insert synthetic users, groups, posts, comments and follows."""
+
+    help = (
+        "Fill the database with a synthetic dataset for bench_routes. "
+        "Use a dedicated database: rows are added to existing ones."
+    )
+
+    def add_arguments(self, parser):
+        """Define dataset size options."""
+        for name, size in SIZES.items():
+            parser.add_argument(
+                f"--{name}",
+                type=int,
+                help=(
+                    f"Number of {name}, {size} times scale by default, "
+                    "at least one."
+                ),
+            )
+        parser.add_argument(
+            "--scale",
+            type=float,
+            default=1,
+            help="Multiply default sizes, e.g. 0.01 for a quick run.",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        """Build dataset."""
+        sizes = {
+            name: (
+                options[name] if options[name] is not None
+                else max(1, int(size * options["scale"]))
+            )
+            for name, size in SIZES.items()
+        }
+        builder = DatasetBuilder(seed=options["seed"], log=self.stdout.write)
+        with transaction.atomic():
+            builder.build(**sizes)
+        self.stdout.write("Dataset is ready.")
@@ -0,0 +1,52 @@
+"""Management command comparing SQLite pragma settings under load."""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.benchmarks import sqlite
+
+
+class Command(BaseCommand):
+    """Measure concurrent throughput with and without SQLITE_PRAGMAS."""
+
+    help = (
+        "Run writer and reader threads against a temporary SQLite file, "
+        "first with default pragmas and then with SQLITE_PRAGMAS, and "
+        "print reads and writes per second of both."
+    )
+
+    def add_arguments(self, parser):
+        """Define load options."""
+        parser.add_argument("--writers", type=int, default=4)
+        parser.add_argument("--readers", type=int, default=4)
+        parser.add_argument("--seconds", type=float, default=3.0)
+        parser.add_argument(
+            "--directory",
+            help="Where to create database files, temporary by default.",
+        )
+
+    def handle(self, *args, **options):
+        """Run benchmark."""
+        results = {}
+        for mode, pragmas in (
+            ("default", {}),
+            ("tuned", settings.SQLITE_PRAGMAS),
+        ):
+            results[mode] = sqlite.run(
+                pragmas,
+                options["writers"],
+                options["readers"],
+                options["seconds"],
+                options["directory"],
+            )
+            self.stdout.write(
+                "{mode:<8} {writes_per_second:>8} writes/s "
+                "{reads_per_second:>8} reads/s {locked:>6} locked".format(
+                    mode=mode, **results[mode],
+                ),
+            )
+        default, tuned = results["default"], results["tuned"]
+        for key in ("writes_per_second", "reads_per_second"):
+            if default[key]:
+                self.stdout.write(
+                    f"{key}: x{tuned[key] / default[key]:.1f}",
+                )
@@ -0,0 +1,29 @@
+"""Management command comparing render time of template profiles."""
+from django.core.management.base import BaseCommand
+
+from core.benchmarks import templates
+
+
+class Command(BaseCommand):
+    """Measure rendering of the index and post pages."""
+
+    help = (
+        "Render a 10-card index page and a post page with 20 comments "
+        "with and without the cached loader and URL prefixes, and print "
+        "median and 95th percentile render times."
+    )
+
+    def add_arguments(self, parser):
+        """Define repeat option."""
+        parser.add_argument("--repeat", type=int, default=200)
+
+    def handle(self, *args, **options):
+        """Run benchmark."""
+        results = templates.run(options["repeat"])
+        for (profile, page), result in results.items():
+            self.stdout.write(
+                "{profile:<26} {page:<12} {median_ms:>8} ms median "
+                "{p95_ms:>8} ms p95".format(
+                    profile=profile, page=page, **result,
+                ),
+            )
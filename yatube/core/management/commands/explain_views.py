@@ -0,0 +1,56 @@
+"""Management command checking query plans of every route."""
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmarks import explain
+from core.benchmarks.routes import ROUTES, pick_targets
+
+
+class Command(BaseCommand):
+    """EXPLAIN queries of every route and fail on full table scans."""
+
+    help = (
+        "Request every named GET route, run EXPLAIN on each SELECT it "
+        "makes and fail if any plan reads a whole table."
+    )
+
+    def add_arguments(self, parser):
+        """Define output options."""
+        parser.add_argument(
+            "--plans",
+            action="store_true",
+            help="Print plans of all queries, not only failing ones.",
+        )
+
+    def handle(self, *args, **options):
+        """Check plans."""
+        targets = pick_targets()
+        failures = 0
+        for route in ROUTES:
+            missing = route.missing(targets)
+            if missing:
+                self.stdout.write(
+                    f"{route.name}: skipped, no {', '.join(missing)} "
+                    "in the dataset",
+                )
+                continue
+            queries = explain.route_queries(route, targets)
+            for sql, params in queries.items():
+                plan = explain.explain(sql, params)
+                scans = explain.full_scans(plan)
+                if scans:
+                    failures += 1
+                    self.stdout.write(
+                        f"{route.name}: full scan of "
+                        f"{', '.join(sorted(scans))}",
+                    )
+                elif explain.sorts(plan):
+                    self.stdout.write(
+                        f"{route.name}: sorts rows without an index",
+                    )
+                if scans or options["plans"]:
+                    self.stdout.write(f"  {sql}")
+                    for line in plan:
+                        self.stdout.write(f"    {line}")
+        if failures:
+            raise CommandError(f"{failures} queries read whole tables.")
+        self.stdout.write("Every query uses an index.")
@@ -0,0 +1,105 @@
+"""Management command running queued background tasks."""
+import time
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core import tasks, workers
+from core.models import Task
+
+
+class Command(BaseCommand):
+    """Claim due tasks and run them in a pool of worker processes."""
+
+    help = (
+        "Run tasks queued by delay() in worker processes, retrying "
+        "failed ones with exponential backoff."
+    )
+
+    def add_arguments(self, parser):
+        """Define worker options."""
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=settings.TASK_WORKERS,
+            help="Worker processes, 0 runs tasks in this process.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Run tasks due now and exit.",
+        )
+        parser.add_argument(
+            "--poll",
+            type=float,
+            default=settings.TASK_POLL_INTERVAL,
+            help="Seconds to wait when no task is due.",
+        )
+
+    def handle(self, *args, **options):
+        """Run tasks until interrupted."""
+        count = options["workers"]
+        self.workers = count
+        self.executor = workers.make_executor(count) if count > 0 else None
+        self.done = 0
+        self.waited = 0.0
+        try:
+            while True:
+                close_old_connections()
+                tasks.requeue_stalled()
+                tasks.purge_finished()
+                claimed = tasks.claim(max(count, 1) * 2)
+                if claimed:
+                    self.run(claimed)
+                elif options["once"]:
+                    break
+                else:
+                    time.sleep(options["poll"])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if self.executor is not None:
+                self.executor.shutdown()
+        mean = self.waited / self.done if self.done else 0.0
+        self.stdout.write(
+            f"Ran {self.done} tasks, mean latency {mean:.3f}s.",
+        )
+
+    def run(self, claimed):
+        """Run claimed tasks and wait for all of them.
+
+        A worker dying breaks the whole pool and every task in it, so
+        those tasks are retried and the pool is started anew.
+        """
+        if self.executor is None:
+            results = {pk: partial(tasks.execute, pk) for pk in claimed}
+        else:
+            results = {
+                pk: self.executor.submit(tasks.execute, pk).result
+                for pk in claimed
+            }
+        broken = False
+        for pk, result in results.items():
+            try:
+                outcome = result()
+            except BrokenProcessPool as error:
+                broken = True
+                self.retry(pk, error)
+            except Exception as error:
+                # The outcome could not be stored.
+                self.retry(pk, error)
+            else:
+                self.done += 1
+                self.waited += outcome[2]
+        if broken:
+            self.executor.shutdown(wait=False)
+            self.executor = workers.make_executor(self.workers)
+
+    def retry(self, pk, error):
+        """Queue the task again, or fail it once out of attempts."""
+        task_row = Task.objects.filter(pk=pk, status=Task.RUNNING).first()
+        if task_row is not None:
+            tasks.finish(task_row, repr(error))
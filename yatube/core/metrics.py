@@ -0,0 +1,158 @@
+"""Process-local metrics exported in Prometheus text format.
+
+Every worker keeps its own values, Prometheus sums them up across
+workers when scraping each of them. Values of processes no scrape
+reaches, e.g. of the run_tasks command, are read from the database by
+collectors as gauges at scrape time instead.
+"""
+import bisect
+import threading
+from collections import defaultdict
+
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+
+_lock = threading.Lock()
+_counters = defaultdict(float)
+_histograms = {}
+_descriptions = {}
+_buckets = {}
+_collectors = []
+
+
+def describe(name, text, buckets=None):
+    """Register help text of a metric, and bucket bounds of a histogram."""
+    _descriptions[name] = text
+    if buckets is not None:
+        _buckets[name] = tuple(sorted(buckets))
+
+
+def collector(func):
+    """Register function returning (name, labels, value) gauges.
+
+    It is called on every render, so it reads a store all processes
+    share rather than values of this process.
+    """
+    _collectors.append(func)
+    return func
+
+
+def inc(name, amount=1, **labels):
+    """Increase counter with the given labels by amount."""
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] += amount
+
+
+def observe(name, amount, **labels):
+    """Put observed amount into histogram with the given labels."""
+    buckets = _buckets.get(name, DEFAULT_BUCKETS)
+    key = (name, tuple(sorted(labels.items())))
+    position = bisect.bisect_left(buckets, amount)
+    with _lock:
+        entry = _histograms.get(key)
+        if entry is None:
+            entry = _histograms[key] = [[0] * len(buckets), 0.0, 0]
+        if position < len(buckets):
+            entry[0][position] += 1
+        entry[1] += amount
+        entry[2] += 1
+
+
+def value(name, **labels):
+    """Return current value of the counter with the given labels."""
+    return _counters.get((name, tuple(sorted(labels.items()))), 0)
+
+
+def histogram(name, **labels):
+    """Return count, sum and cumulative buckets of the histogram."""
+    buckets = _buckets.get(name, DEFAULT_BUCKETS)
+    with _lock:
+        entry = _histograms.get((name, tuple(sorted(labels.items()))))
+        counts, total, count = entry or ([0] * len(buckets), 0.0, 0)
+        counts = list(counts)
+    cumulative = [sum(counts[:i + 1]) for i in range(len(counts))]
+    return {
+        "count": count,
+        "sum": total,
+        "buckets": dict(zip(buckets, cumulative)),
+    }
+
+
+def reset():
+    """Forget all collected values."""
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+def format_labels(labels):
+    """Render labels in Prometheus exposition syntax."""
+    if not labels:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(
+            key, str(label).replace("\\", "\\\\").replace('"', '\\"'),
+        )
+        for key, label in labels
+    )
+    return "{" + pairs + "}"
+
+
+def histogram_lines(name, labels, entry):
+    """Render bucket, sum and count samples of one histogram."""
+    counts, total, count = entry
+    lines = []
+    cumulative = 0
+    buckets = _buckets.get(name, DEFAULT_BUCKETS)
+    for bound, bucket_count in zip(buckets, counts):
+        cumulative += bucket_count
+        bucket_labels = labels + (("le", f"{bound:g}"),)
+        lines.append(
+            f"{name}_bucket{format_labels(bucket_labels)} {cumulative}",
+        )
+    lines.append(
+        f'{name}_bucket{format_labels(labels + (("le", "+Inf"),))} {count}',
+    )
+    lines.append(f"{name}_sum{format_labels(labels)} {total:g}")
+    lines.append(f"{name}_count{format_labels(labels)} {count}")
+    return lines
+
+
+def render():
+    """Render all counters and histograms in Prometheus text format."""
+    with _lock:
+        counters = sorted(_counters.items())
+        histograms = sorted(
+            (key, (list(counts), total, count))
+            for key, (counts, total, count) in _histograms.items()
+        )
+    samples = [
+        (name, "counter", [f"{name}{format_labels(labels)} {amount:g}"])
+        for (name, labels), amount in counters
+    ]
+    samples.extend(
+        (name, "histogram", histogram_lines(name, labels, entry))
+        for (name, labels), entry in histograms
+    )
+    samples.extend(
+        (name, "gauge", [f"{name}{format_labels(labels)} {amount:g}"])
+        for name, labels, amount in sorted(
+            (name, tuple(sorted(labels.items())), amount)
+            for func in _collectors
+            for name, labels, amount in func()
+        )
+    )
+    samples.sort(key=lambda sample: sample[0])
+
+    lines = []
+    described = set()
+    for name, kind, sample_lines in samples:
+        if name not in described:
+            described.add(name)
+            if name in _descriptions:
+                lines.append(f"# HELP {name} {_descriptions[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+        lines.extend(sample_lines)
+    return "\n".join(lines) + "\n"
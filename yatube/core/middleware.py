@@ -0,0 +1,83 @@
+"""Middleware of yatube project."""
+import time
+
+from django.conf import settings
+
+from core import db
+from core.instrumentation import RequestStats
+
+PIN_COOKIE = "db_pin"
+
+
+class RequestMetricsMiddleware:
+    """Collect latency, SQL, template and cache statistics per view.
+
+    Should go first in MIDDLEWARE to see the time of the whole request.
+    """
+
+    def __init__(self, get_response):
+        """Store next handler."""
+        self.get_response = get_response
+
+    def __call__(self, request):
+        """Handle request while collecting its statistics."""
+        stats = RequestStats()
+        with stats.track():
+            response = self.get_response(request)
+        match = getattr(request, "resolver_match", None)
+        view = match.view_name if match else "<unresolved>"
+        stats.publish(view, request.method, response.status_code)
+        return response
+
+
+class ReplicaMiddleware:
+    """Let read-only views read from replicas.
+
+    A client that has just written through one of REPLICA_PIN_VIEWS gets
+    a cookie sending its reads to the primary for REPLICA_PIN_SECONDS, so
+    it sees its own post or comment before replicas catch up.
+    """
+
+    def __init__(self, get_response):
+        """Store next handler."""
+        self.get_response = get_response
+
+    def __call__(self, request):
+        """Handle request, releasing replica afterwards."""
+        request.replica_token = None
+        try:
+            response = self.get_response(request)
+        finally:
+            db.release_replica(request.replica_token)
+        match = getattr(request, "resolver_match", None)
+        if (
+            match is not None
+            and match.view_name in settings.REPLICA_PIN_VIEWS
+            and request.method == "POST"
+            and response.status_code < 400
+        ):
+            response.set_cookie(
+                PIN_COOKIE,
+                str(int(time.time()) + settings.REPLICA_PIN_SECONDS),
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+            )
+        return response
+
+    def is_pinned(self, request):
+        """Check if client wrote recently."""
+        try:
+            pinned_until = int(request.COOKIES.get(PIN_COOKIE, 0))
+        except ValueError:
+            return False
+        return pinned_until > time.time()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        """Choose replica for GET of a read-only view."""
+        if (
+            request.method in ("GET", "HEAD")
+            and request.resolver_match.view_name
+            in settings.READ_REPLICA_VIEWS
+            and not self.is_pinned(request)
+        ):
+            request.replica_token = db.use_replica()
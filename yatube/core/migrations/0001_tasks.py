@@ -0,0 +1,40 @@
+# Generated by Django 2.2.16 on 2026-10-17 12:21
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Task',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Dotted path of the task function', max_length=200, verbose_name='Task')),
+                ('args', models.TextField(default='[]', help_text='JSON list of positional arguments', verbose_name='Arguments')),
+                ('key', models.CharField(blank=True, help_text='Task with a key already queued or done is not added', max_length=200, null=True, unique=True, verbose_name='Idempotency key')),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=10, verbose_name='Status')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Attempts')),
+                ('max_attempts', models.PositiveIntegerField(default=3, verbose_name='Attempts limit')),
+                ('run_at', models.DateTimeField(default=django.utils.timezone.now, help_text='Moment the task may start, later for retries', verbose_name='Due date')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Creation date')),
+                ('started', models.DateTimeField(blank=True, null=True, verbose_name='Start date')),
+                ('finished', models.DateTimeField(blank=True, null=True, verbose_name='Finish date')),
+                ('error', models.TextField(blank=True, verbose_name='Last error')),
+            ],
+            options={
+                'verbose_name': 'Task',
+                'verbose_name_plural': 'Tasks',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['status', 'run_at'], name='task_status_run_at_idx'),
+        ),
+    ]
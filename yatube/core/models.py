@@ -0,0 +1,93 @@
+"""Models definition for core app."""
+from django.db import models
+from django.utils import timezone
+
+
+class Task(models.Model):
+    """Model Task is used to store queued background work.
+
+    Rows are both the broker and the result log of core.tasks.
+    """
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUSES = (
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    )
+
+    name = models.CharField(
+        verbose_name="Task",
+        help_text="Dotted path of the task function",
+        max_length=200,
+    )
+    args = models.TextField(
+        verbose_name="Arguments",
+        help_text="JSON list of positional arguments",
+        default="[]",
+    )
+    key = models.CharField(
+        verbose_name="Idempotency key",
+        help_text="Task with a key already queued or done is not added",
+        max_length=200,
+        unique=True,
+        null=True,
+        blank=True,
+    )
+    status = models.CharField(
+        verbose_name="Status",
+        max_length=10,
+        choices=STATUSES,
+        default=QUEUED,
+    )
+    attempts = models.PositiveIntegerField(
+        verbose_name="Attempts",
+        default=0,
+    )
+    max_attempts = models.PositiveIntegerField(
+        verbose_name="Attempts limit",
+        default=3,
+    )
+    run_at = models.DateTimeField(
+        verbose_name="Due date",
+        help_text="Moment the task may start, later for retries",
+        default=timezone.now,
+    )
+    created = models.DateTimeField(
+        verbose_name="Creation date",
+        auto_now_add=True,
+    )
+    started = models.DateTimeField(
+        verbose_name="Start date",
+        null=True,
+        blank=True,
+    )
+    finished = models.DateTimeField(
+        verbose_name="Finish date",
+        null=True,
+        blank=True,
+    )
+    error = models.TextField(
+        verbose_name="Last error",
+        blank=True,
+    )
+
+    class Meta:
+        """Used to change the behavior of Task model fields."""
+
+        verbose_name = "Task"
+        verbose_name_plural = "Tasks"
+        indexes = (
+            models.Index(
+                fields=("status", "run_at"),
+                name="task_status_run_at_idx",
+            ),
+        )
+
+    def __str__(self):
+        """Show task name and status."""
+        return f"{self.name} ({self.status})"
@@ -0,0 +1,234 @@
+"""Background tasks kept in the database.
+
+A function decorated with @task gets a delay() method adding a Task row
+in the current transaction, so work of a rolled back request is never
+queued. The
+run_tasks command claims due rows and runs them in a pool of worker
+processes, retrying failures with exponential backoff. With
+TASKS_ALWAYS_EAGER on, delay() runs the function at once instead, so
+development and tests need no worker.
+"""
+import datetime
+import json
+import logging
+import time
+import traceback
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Min
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from core import metrics
+from core.models import Task
+
+logger = logging.getLogger(__name__)
+
+metrics.describe("tasks_due", "Queued tasks due to start now, by task.")
+metrics.describe(
+    "task_queue_delay_seconds",
+    "Time the oldest due task has waited past its due date, by task.",
+)
+metrics.describe(
+    "task_duration_seconds", "Run time of tasks run eagerly, by task.",
+)
+metrics.describe(
+    "tasks_total", "Finished eager task runs by task and status.",
+)
+
+
+def task(max_attempts=3):
+    """Make function a task queued by its delay() method."""
+    def decorator(func):
+        name = f"{func.__module__}.{func.__qualname__}"
+
+        def delay(*args, key=None, countdown=0):
+            return enqueue(
+                name,
+                args,
+                key=key,
+                countdown=countdown,
+                max_attempts=max_attempts,
+            )
+
+        func.task_name = name
+        func.delay = delay
+        return func
+    return decorator
+
+
+def enqueue(name, args=(), key=None, countdown=0, max_attempts=3):
+    """Queue the task, or run it now when tasks are eager.
+
+    Task with a key some queued or finished task already has is not
+    added again; that task is returned instead.
+    """
+    if settings.TASKS_ALWAYS_EAGER:
+        run_eagerly(name, args)
+        return None
+    fields = {
+        "name": name,
+        "args": json.dumps(list(args)),
+        "max_attempts": max_attempts,
+        "run_at": timezone.now() + datetime.timedelta(seconds=countdown),
+    }
+    if key is None:
+        return Task.objects.create(**fields)
+    try:
+        with transaction.atomic():
+            return Task.objects.create(key=key, **fields)
+    except IntegrityError:
+        return Task.objects.get(key=key)
+
+
+def record(name, status, duration):
+    """Add finished eager run of the task to process metrics."""
+    metrics.inc("tasks_total", task=name, status=status)
+    metrics.observe("task_duration_seconds", duration, task=name)
+
+
+@metrics.collector
+def queue_metrics():
+    """Return due tasks and delay of the oldest one, by task.
+
+    Queued tasks run in the run_tasks process, which no scrape reaches,
+    so their lag is read from the queue itself.
+    """
+    now = timezone.now()
+    rows = (
+        Task.objects.filter(status=Task.QUEUED, run_at__lte=now)
+        .values("name")
+        .annotate(due=Count("pk"), oldest=Min("run_at"))
+        .order_by()
+    )
+    gauges = []
+    for row in rows:
+        labels = {"task": row["name"]}
+        gauges.append(("tasks_due", labels, row["due"]))
+        gauges.append((
+            "task_queue_delay_seconds",
+            labels,
+            (now - row["oldest"]).total_seconds(),
+        ))
+    return gauges
+
+
+def run_eagerly(name, args):
+    """Run the task in this process, logging instead of raising errors."""
+    started = time.perf_counter()
+    status = Task.DONE
+    try:
+        import_string(name)(*args)
+    except Exception:
+        status = Task.FAILED
+        logger.exception("Task %s failed", name)
+    record(name, status, time.perf_counter() - started)
+
+
+def backoff(attempts):
+    """Return delay before the next attempt after a failed one."""
+    return datetime.timedelta(
+        seconds=settings.TASK_RETRY_BACKOFF * 2 ** (attempts - 1),
+    )
+
+
+def execute(pk):
+    """Run claimed task in a worker process and store the outcome.
+
+    Returns name, status, latency and duration for the summary of the
+    process that claimed it.
+    """
+    task_row = Task.objects.get(pk=pk)
+    started = time.perf_counter()
+    try:
+        import_string(task_row.name)(*json.loads(task_row.args))
+    except Exception:
+        finish(task_row, traceback.format_exc())
+    else:
+        finish(task_row)
+    return (
+        task_row.name,
+        task_row.status,
+        (task_row.started - task_row.run_at).total_seconds(),
+        time.perf_counter() - started,
+    )
+
+
+def finish(task_row, error=None):
+    """Mark task done, or queue it again after a failed attempt."""
+    now = timezone.now()
+    if error is None:
+        task_row.status = Task.DONE
+        task_row.error = ""
+    elif task_row.attempts < task_row.max_attempts:
+        task_row.status = Task.QUEUED
+        task_row.run_at = now + backoff(task_row.attempts)
+        task_row.error = error
+    else:
+        task_row.status = Task.FAILED
+        task_row.error = error
+        logger.error("Task %s failed for good:\n%s", task_row.name, error)
+    task_row.finished = now
+    Task.objects.filter(pk=task_row.pk).update(
+        status=task_row.status,
+        run_at=task_row.run_at,
+        error=task_row.error,
+        finished=now,
+    )
+
+
+def claim(limit):
+    """Mark up to limit due tasks as running and return their ids.
+
+    Each row is taken by a conditional update, so several run_tasks
+    processes never start the same task twice.
+    """
+    now = timezone.now()
+    due = (
+        Task.objects.filter(status=Task.QUEUED, run_at__lte=now)
+        .order_by("run_at")
+        .values_list("pk", flat=True)[:limit]
+    )
+    return [
+        pk for pk in due
+        if Task.objects.filter(pk=pk, status=Task.QUEUED).update(
+            status=Task.RUNNING,
+            started=now,
+            attempts=F("attempts") + 1,
+        )
+    ]
+
+
+def requeue_stalled():
+    """Queue again tasks of workers that died while running them.
+
+    Tasks out of attempts are failed instead, so a task killing its
+    worker is not run forever.
+    """
+    now = timezone.now()
+    stalled = Task.objects.filter(
+        status=Task.RUNNING,
+        started__lt=now - datetime.timedelta(
+            seconds=settings.TASK_VISIBILITY_TIMEOUT,
+        ),
+    )
+    failed = stalled.filter(attempts__gte=F("max_attempts")).update(
+        status=Task.FAILED,
+        error="The worker stopped while running the task.",
+        finished=now,
+    )
+    if failed:
+        logger.error("%s stalled tasks failed for good", failed)
+    return stalled.update(status=Task.QUEUED)
+
+
+def purge_finished():
+    """Delete done tasks older than TASK_KEEP_DONE_DAYS."""
+    deadline = timezone.now() - datetime.timedelta(
+        days=settings.TASK_KEEP_DONE_DAYS,
+    )
+    deleted, _ = Task.objects.filter(
+        status=Task.DONE, finished__lt=deadline,
+    ).delete()
+    return deleted
@@ -0,0 +1,39 @@
+"""Template backends of yatube project."""
+import time
+
+from django.template.backends.django import DjangoTemplates, Template
+
+from core.instrumentation import add_template_time
+
+
+class InstrumentedTemplate(Template):
+    """Django template measuring its render time."""
+
+    def render(self, context=None, request=None):
+        """Render template and record time spent."""
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            add_template_time(time.perf_counter() - started)
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """Django template engine reporting render time of the request.
+
+    Only templates rendered by views are timed: includes and tags render
+    engine templates directly, so their time is counted once, within the
+    template that uses them.
+    """
+
+    def from_string(self, template_code):
+        """Compile template from string."""
+        return InstrumentedTemplate(
+            self.engine.from_string(template_code), self,
+        )
+
+    def get_template(self, template_name):
+        """Load template by name."""
+        return InstrumentedTemplate(
+            super().get_template(template_name).template, self,
+        )
@@ -0,0 +1,12 @@
+"""Tags building links from precomputed URL prefixes."""
+from django import template
+
+from core import links
+
+register = template.Library()
+
+
+@register.simple_tag
+def link(viewname, value):
+    """Return URL of the view taking the value as its only argument."""
+    return links.link(viewname, value)
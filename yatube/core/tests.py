@@ -1,6 +1,66 @@
 """Contain tests in core app in yatube project."""
-from django.test import TestCase, Client, override_settings
-from django.urls import reverse_lazy
+import asyncio
+import datetime
+import io
+import json
+import threading
+from concurrent.futures.process import BrokenProcessPool
+from unittest import mock
+from urllib.parse import urlencode
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.core.cache.backends.base import InvalidCacheKey
+from django.db import connection, connections, transaction
+from django.middleware.csrf import get_token
+from django.test import (
+    TestCase,
+    TransactionTestCase,
+    Client,
+    RequestFactory,
+    override_settings,
+)
+from django.urls import reverse, reverse_lazy, set_script_prefix
+from django.utils import timezone
+
+from core import (
+    asgi,
+    concurrent,
+    db,
+    instrumentation,
+    links,
+    metrics,
+    tasks,
+    workers,
+)
+from core.benchmarks import (
+    asgi as asgi_benchmark,
+    explain,
+    follows,
+    runner,
+    sqlite,
+    templates,
+)
+from core.benchmarks.dataset import DatasetBuilder
+from core.benchmarks.routes import ROUTES, pick_targets
+from core.management.commands.bench_routes import BASELINE
+from core.middleware import PIN_COOKIE
+from core.models import Task
+from posts.models import FeedEntry, Follow, Group, Post, UserStats
+
+User = get_user_model()
+
+CALLS = []
+
+
+@tasks.task(max_attempts=2)
+def remember(value):
+    """Task remembering its argument, failing for negative ones."""
+    if value < 0:
+        raise ValueError(value)
+    CALLS.append(value)
 
 
 @override_settings(DEBUG=False)
@@ -28,3 +88,679 @@ class ErrorPageTests(TestCase):
             index_page,
         )
         self.assertTemplateUsed(response, template)
+
+
+TWO_WORKERS_CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "shared": {
+        "BACKEND": "core.cache_backends.FakeSharedCache",
+        "LOCATION": "two-tier-tests",
+    },
+    "worker_a": {
+        "BACKEND": "core.cache_backends.TwoTierCache",
+        "OPTIONS": {"SHARED_ALIAS": "shared", "LOCAL_TIMEOUT": 2},
+    },
+    "worker_b": {
+        "BACKEND": "core.cache_backends.TwoTierCache",
+        "OPTIONS": {"SHARED_ALIAS": "shared", "LOCAL_TIMEOUT": 2},
+    },
+}
+
+
+@override_settings(CACHES=TWO_WORKERS_CACHES)
+class TwoTierCacheTests(TestCase):
+    """Tests two-tier cache shared by several workers."""
+
+    def setUp(self):
+        """Define two workers over one fake shared cache."""
+        caches["shared"].clear()
+        self.worker_a = caches["worker_a"]
+        self.worker_b = caches["worker_b"]
+        self.now = 1000.0
+        patcher = mock.patch(
+            "core.cache_backends.time.monotonic", lambda: self.now,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_core_two_tier_cache_propagates_invalidation(self):
+        """Check if other worker sees invalidation after local timeout."""
+        self.worker_a.set("generation", 1)
+        self.assertEqual(self.worker_b.get("generation"), 1)
+
+        self.worker_a.set("generation", 2)
+        self.assertEqual(self.worker_a.get("generation"), 2)
+        self.assertEqual(self.worker_b.get("generation"), 1)
+
+        self.now += 3
+        self.assertEqual(self.worker_b.get("generation"), 2)
+
+        self.worker_b.delete("generation")
+        self.now += 3
+        self.assertIsNone(self.worker_a.get("generation"))
+
+    def test_core_two_tier_cache_locks_and_counters_are_shared(self):
+        """Check if add and incr are decided by the shared tier."""
+        self.assertTrue(self.worker_a.add("lock", 1))
+        self.assertFalse(self.worker_b.add("lock", 1))
+
+        self.worker_a.set("hits", 1)
+        self.worker_b.get("hits")
+        self.assertEqual(self.worker_b.incr("hits"), 2)
+        self.assertEqual(self.worker_b.get("hits"), 2)
+        self.assertEqual(
+            self.worker_a.get_many(["hits", "lock", "none"]),
+            {"hits": 1, "lock": 1},
+        )
+
+    def test_core_fake_shared_cache_rejects_what_memcached_rejects(self):
+        """Check if fake shared cache is as strict as memcached."""
+        with self.assertRaises(InvalidCacheKey):
+            caches["shared"].set("key with spaces", 1)
+        with self.assertRaises(ValueError):
+            caches["shared"].set("huge", "x" * 2 * 1024 * 1024)
+
+
+class RouteBenchmarkTests(TestCase):
+    """Tests query counts of routes against benchmark baseline."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Build a small synthetic dataset."""
+        DatasetBuilder(seed=1).build(
+            users=40, groups=3, posts=300, comments=600, follows=200,
+        )
+
+    def test_core_routes_do_not_exceed_baseline_queries(self):
+        """Check if no route makes more queries than in the baseline."""
+        results = runner.run(repeat=1)
+        for name, result in results.items():
+            with self.subTest(route=name):
+                self.assertLess(result["status"], 400)
+        baseline = runner.load_baseline(BASELINE)
+        self.assertEqual(
+            runner.compare(results, baseline["routes"], same_dataset=False),
+            [],
+        )
+
+    def test_core_explain_views_skips_routes_without_targets(self):
+        """Check if a dataset without groups skips the group route."""
+        Group.objects.all().delete()
+        stdout = io.StringIO()
+
+        call_command("explain_views", stdout=stdout)
+
+        self.assertIn(
+            "posts:group_list: skipped, no group in the dataset",
+            stdout.getvalue(),
+        )
+        self.assertIn("Every query uses an index.", stdout.getvalue())
+
+    def test_core_route_queries_use_indexes(self):
+        """Check if no route query reads a whole table."""
+        targets = pick_targets()
+        for route in ROUTES:
+            for sql, params in explain.route_queries(route, targets).items():
+                with self.subTest(route=route.name, sql=sql):
+                    self.assertEqual(
+                        explain.full_scans(explain.explain(sql, params)),
+                        set(),
+                    )
+
+
+class RequestMetricsTests(TestCase):
+    """Tests per-view request statistics."""
+
+    def setUp(self):
+        """Define client and clean metrics before each test."""
+        self.test_client = Client()
+        cache.clear()
+        metrics.reset()
+
+    def test_core_requests_are_measured_per_view(self):
+        """Check if latency, SQL, templates and cache are recorded."""
+        self.test_client.get(reverse_lazy("posts:index"))
+
+        self.assertEqual(
+            metrics.value(
+                "http_requests_total",
+                view="posts:index",
+                method="GET",
+                status=200,
+            ),
+            1,
+        )
+        self.assertEqual(
+            metrics.histogram(
+                "http_request_duration_seconds", view="posts:index",
+            )["count"],
+            1,
+        )
+        self.assertGreater(
+            metrics.value("db_queries_total", view="posts:index"), 0,
+        )
+        self.assertGreater(
+            metrics.value("template_render_seconds_total", view="posts:index"),
+            0,
+        )
+        self.assertEqual(
+            metrics.value(
+                "cache_lookups_total",
+                view="posts:index",
+                cache="feed_page",
+                result="miss",
+            ),
+            1,
+        )
+        response = self.test_client.get(reverse_lazy("metrics"))
+        self.assertContains(
+            response,
+            'http_request_duration_seconds_bucket'
+            '{view="posts:index",le="+Inf"} 1',
+        )
+        self.assertContains(response, "# TYPE http_request_queries histogram")
+
+    @override_settings(REQUEST_QUERY_BUDGET=0)
+    def test_core_requests_over_query_budget_are_logged(self):
+        """Check if slowest query is logged with its stack."""
+        with self.assertLogs("yatube.performance", "WARNING") as logs:
+            self.test_client.get(reverse_lazy("posts:index"))
+        self.assertIn("posts:index made", logs.output[0])
+        self.assertIn("posts/views.py", logs.output[0])
+        self.assertEqual(
+            metrics.value("query_budget_exceeded_total", view="posts:index"),
+            1,
+        )
+
+    def test_core_metrics_are_shown_to_scrapers_and_staff_only(self):
+        """Check if /metrics/ refuses other addresses and users."""
+        url = reverse_lazy("metrics")
+        outside = {"REMOTE_ADDR": "203.0.113.5"}
+        self.assertEqual(self.test_client.get(url).status_code, 200)
+        self.assertEqual(
+            self.test_client.get(url, **outside).status_code, 403,
+        )
+        user = User.objects.create_user(username="auth_user")
+        self.test_client.force_login(user)
+        self.assertEqual(
+            self.test_client.get(url, **outside).status_code, 403,
+        )
+        User.objects.filter(pk=user.pk).update(is_staff=True)
+        self.assertEqual(
+            self.test_client.get(url, **outside).status_code, 200,
+        )
+
+    def test_core_query_stacks_are_taken_over_budget_only(self):
+        """Check if requests within the budget take no stacks."""
+        with mock.patch.object(
+            instrumentation, "project_stack", return_value=[],
+        ) as project_stack:
+            with override_settings(REQUEST_QUERY_BUDGET=1000):
+                self.test_client.get(reverse_lazy("posts:index"))
+            self.assertFalse(project_stack.called)
+
+            cache.clear()
+            with override_settings(REQUEST_QUERY_BUDGET=0):
+                with self.assertLogs("yatube.performance", "WARNING"):
+                    self.test_client.get(reverse_lazy("posts:index"))
+            self.assertTrue(project_stack.called)
+
+
+class ReplicaRoutingTests(TestCase):
+    """Tests routing of reads to replicas."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Create author with a post."""
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="reader")
+        cls.post = Post.objects.create(text="Текст", author=cls.user)
+
+    def setUp(self):
+        """Define logged in client."""
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        cache.clear()
+
+    def test_core_router_reads_from_replica_of_request(self):
+        """Check if reads follow replica chosen for the request."""
+        router = db.ReplicaRouter()
+        self.assertEqual(router.db_for_read(Post), "default")
+        with mock.patch.object(
+            db, "replica_aliases", return_value=["replica_0"],
+        ):
+            token = db.use_replica()
+        self.assertEqual(router.db_for_read(Post), "replica_0")
+        self.assertEqual(router.db_for_write(Post), "default")
+        self.assertFalse(router.allow_migrate("replica_0", "posts"))
+        db.release_replica(token)
+        self.assertEqual(router.db_for_read(Post), "default")
+
+    def test_core_read_views_use_replica_until_client_writes(self):
+        """Check if client reads primary right after commenting."""
+        with mock.patch.object(
+            db, "use_replica", return_value=None,
+        ) as use_replica:
+            self.authorized_client.get(reverse_lazy("posts:index"))
+            self.assertEqual(use_replica.call_count, 1)
+
+            response = self.authorized_client.post(
+                reverse_lazy(
+                    "posts:add_comment", kwargs={"post_id": self.post.pk},
+                ),
+                {"text": "Комментарий"},
+            )
+            self.assertIn(PIN_COOKIE, response.cookies)
+            self.authorized_client.get(reverse_lazy("posts:index"))
+            self.assertEqual(use_replica.call_count, 1)
+
+    @override_settings(DATABASE_HEALTH_CHECKS=True)
+    def test_core_broken_connections_are_closed(self):
+        """Check if unusable connection is closed before request."""
+        broken = mock.Mock(connection=object())
+        broken.is_usable.return_value = False
+        idle = mock.Mock(connection=None)
+        with mock.patch.object(db, "connections") as connections:
+            connections.all.return_value = [broken, idle]
+            db.check_connections()
+        broken.close.assert_called_once_with()
+        idle.close.assert_not_called()
+
+
+class SQLiteTuningTests(TestCase):
+    """Tests SQLite connection pragmas."""
+
+    def test_core_sqlite_connections_are_tuned(self):
+        """Check if pragmas are set on the connection."""
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA busy_timeout")
+            self.assertEqual(cursor.fetchone()[0], 5000)
+            cursor.execute("PRAGMA temp_store")
+            # 2 is MEMORY.
+            self.assertEqual(cursor.fetchone()[0], 2)
+
+    def test_core_sqlite_benchmark_writes_concurrently(self):
+        """Check if concurrent writers are not locked out."""
+        result = sqlite.run(
+            {"journal_mode": "WAL", "busy_timeout": 5000},
+            writers=3,
+            readers=2,
+            seconds=0.3,
+        )
+        self.assertGreater(result["writes_per_second"], 0)
+        self.assertGreater(result["reads_per_second"], 0)
+        self.assertEqual(result["locked"], 0)
+
+
+@override_settings(TASKS_ALWAYS_EAGER=False, TASK_RETRY_BACKOFF=10)
+class TaskQueueTests(TestCase):
+    """Tests background tasks kept in the database."""
+
+    def setUp(self):
+        """Forget calls of previous tests."""
+        CALLS.clear()
+
+    def run_tasks(self):
+        """Run due tasks in this process."""
+        call_command(
+            "run_tasks", once=True, workers=0, stdout=io.StringIO(),
+        )
+
+    def test_core_tasks_delay_queues_task(self):
+        """Check if delay stores the task instead of running it."""
+        task_row = remember.delay(1)
+        self.assertEqual(CALLS, [])
+        self.assertEqual(task_row.name, "core.tests.remember")
+        self.assertEqual(json.loads(task_row.args), [1])
+        self.assertEqual(task_row.status, Task.QUEUED)
+
+        self.run_tasks()
+
+        self.assertEqual(CALLS, [1])
+        task_row.refresh_from_db()
+        self.assertEqual(task_row.status, Task.DONE)
+        self.assertEqual(task_row.attempts, 1)
+
+    def test_core_tasks_key_makes_delay_idempotent(self):
+        """Check if a task with a known key is queued once."""
+        first = remember.delay(1, key="remember:1")
+        second = remember.delay(1, key="remember:1")
+        self.assertEqual(first.pk, second.pk)
+        self.run_tasks()
+        remember.delay(1, key="remember:1")
+        self.run_tasks()
+        self.assertEqual(CALLS, [1])
+
+    def test_core_tasks_failed_task_is_retried_with_backoff(self):
+        """Check if failure postpones the task until attempts run out."""
+        task_row = remember.delay(-1)
+        before = timezone.now()
+        self.run_tasks()
+
+        task_row.refresh_from_db()
+        self.assertEqual(task_row.status, Task.QUEUED)
+        self.assertIn("ValueError", task_row.error)
+        self.assertGreaterEqual(
+            task_row.run_at, before + datetime.timedelta(seconds=10),
+        )
+        self.run_tasks()
+        task_row.refresh_from_db()
+        self.assertEqual(task_row.attempts, 1)
+
+        Task.objects.update(run_at=timezone.now())
+        with self.assertLogs("core.tasks", "ERROR"):
+            self.run_tasks()
+        task_row.refresh_from_db()
+        self.assertEqual(task_row.status, Task.FAILED)
+        self.assertEqual(task_row.attempts, 2)
+
+    def test_core_tasks_stalled_task_is_claimed_again(self):
+        """Check if a task of a dead worker is queued again."""
+        task_row = remember.delay(1)
+        self.assertEqual(tasks.claim(10), [task_row.pk])
+        self.assertEqual(tasks.claim(10), [])
+        Task.objects.update(
+            started=timezone.now() - datetime.timedelta(hours=1),
+        )
+        self.run_tasks()
+        self.assertEqual(CALLS, [1])
+
+    def test_core_tasks_stalled_task_out_of_attempts_fails(self):
+        """Check if a task killing its workers is not queued forever."""
+        task_row = remember.delay(1)
+        Task.objects.update(
+            status=Task.RUNNING,
+            attempts=2,
+            started=timezone.now() - datetime.timedelta(hours=1),
+        )
+        with self.assertLogs("core.tasks", "ERROR"):
+            self.assertEqual(tasks.requeue_stalled(), 0)
+        task_row.refresh_from_db()
+        self.assertEqual(task_row.status, Task.FAILED)
+        self.assertEqual(CALLS, [])
+
+    def test_core_tasks_broken_pool_is_started_anew(self):
+        """Check if tasks after a dead worker run in a new pool."""
+        task_row = remember.delay(1)
+        broken = mock.Mock()
+        broken.submit.return_value.result.side_effect = BrokenProcessPool
+        pool = mock.Mock()
+        pool.submit.side_effect = (
+            lambda func, *args: mock.Mock(result=lambda: func(*args))
+        )
+        with mock.patch.object(
+            workers, "make_executor", side_effect=[broken, pool],
+        ), override_settings(TASK_RETRY_BACKOFF=0):
+            call_command(
+                "run_tasks", once=True, workers=1, stdout=io.StringIO(),
+            )
+        broken.shutdown.assert_called_once()
+        pool.shutdown.assert_called_once()
+        task_row.refresh_from_db()
+        self.assertEqual(task_row.status, Task.DONE)
+        self.assertEqual(task_row.attempts, 2)
+        self.assertEqual(CALLS, [1])
+
+    def test_core_tasks_queue_delay_is_exported(self):
+        """Check if due tasks and their delay are served by /metrics/."""
+        remember.delay(1)
+        Task.objects.update(
+            run_at=timezone.now() - datetime.timedelta(minutes=1),
+        )
+        response = self.client.get(reverse_lazy("metrics"))
+        self.assertContains(
+            response, 'tasks_due{task="core.tests.remember"} 1',
+        )
+        self.assertContains(response, "# TYPE task_queue_delay_seconds gauge")
+        self.run_tasks()
+        response = self.client.get(reverse_lazy("metrics"))
+        self.assertNotContains(response, "tasks_due{")
+
+    def test_core_tasks_post_side_effects_are_queued(self):
+        """Check if follow backfill and password email wait for worker."""
+        author = User.objects.create_user(username="auth_author")
+        reader = User.objects.create_user(
+            username="auth_reader",
+            email="reader@example.com",
+            password="reader-password",
+        )
+        Post.objects.create(author=author, text="Queued post")
+        Follow.objects.create(user=reader, author=author)
+        self.client.post(
+            reverse_lazy("users:password_reset_form"),
+            {"email": "reader@example.com"},
+        )
+        self.assertFalse(FeedEntry.objects.filter(user=reader).exists())
+        self.assertEqual(len(mail.outbox), 0)
+
+        self.run_tasks()
+
+        self.assertTrue(FeedEntry.objects.filter(user=reader).exists())
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn("reader@example.com", mail.outbox[0].to)
+
+
+class LinkTests(TestCase):
+    """Tests links built from precomputed URL prefixes."""
+
+    def tearDown(self):
+        """Restore script prefix of the test client."""
+        set_script_prefix("/")
+        links.clear_prefixes("URL_PREFIX_VIEWS")
+
+    def test_core_links_match_reversed_urls(self):
+        """Check if prefixed links equal links made by reverse."""
+        for viewname, value in (
+            ("posts:post_detail", 15),
+            ("posts:profile", "ivan.petrov+1@mail"),
+            ("posts:profile", "пользователь"),
+            ("posts:group_list", "test-slug"),
+            ("posts:post_edit", 15),
+        ):
+            with self.subTest(viewname=viewname, value=value):
+                self.assertEqual(
+                    links.link(viewname, value),
+                    reverse(viewname, args=[value]),
+                )
+
+    def test_core_links_follow_script_prefix(self):
+        """Check if prefixes are kept per script prefix."""
+        links.link("posts:post_detail", 1)
+        set_script_prefix("/yatube/")
+        self.assertEqual(
+            links.link("posts:post_detail", 1), "/yatube/posts/1/",
+        )
+
+    def test_core_template_benchmark_renders_without_queries(self):
+        """Check if benchmark pages render from unsaved objects only."""
+        with self.assertNumQueries(0):
+            results = templates.run(repeat=1)
+        self.assertEqual(len(results), 6)
+        self.assertIn(("cached loader, prefixes", "index"), results)
+
+
+class FollowBenchmarkTests(TestCase):
+    """Tests followers page benchmark."""
+
+    def test_core_follow_benchmark_builds_celebrity_once(self):
+        """Check if rebuilding keeps the followers already inserted."""
+        celebrity = follows.build(120, batch_size=50)
+        follows.build(100)
+
+        self.assertEqual(Follow.objects.filter(author=celebrity).count(), 120)
+        self.assertEqual(
+            UserStats.objects.get(user=celebrity).follower_count, 120,
+        )
+        results = follows.run(celebrity, repeat=1)
+        self.assertEqual(results["first page, warm"]["queries"], 1)
+        self.assertEqual(results["page at 60, cursor"]["queries"], 2)
+        self.assertEqual(
+            results["query at 60, count and offset"]["queries"], 2,
+        )
+
+
+class ASGITests(TransactionTestCase):
+    """Tests ASGI application and concurrent parts of views."""
+
+    def setUp(self):
+        """Start every test with an empty cache."""
+        cache.clear()
+
+    def request(self, path, method="GET", body=b"", headers=()):
+        """Serve request through the ASGI application, return messages."""
+        scope = {
+            "type": "http",
+            "method": method,
+            "path": path,
+            "query_string": b"",
+            "headers": [(b"host", b"testserver"), *headers],
+        }
+        chunks = [body[:1], body[1:]]
+        messages = []
+
+        async def receive():
+            chunk = chunks.pop(0)
+            return {
+                "type": "http.request", "body": chunk, "more_body": chunks,
+            }
+
+        async def send(message):
+            messages.append(message)
+
+        application = asgi.ASGIHandler(threads=2)
+        asyncio.run(application(scope, receive, send))
+        application.get_executor().shutdown()
+        return messages
+
+    def test_core_asgi_serves_pages_from_threads(self):
+        """Check if pages are rendered with the database of the project."""
+        author = User.objects.create_user(username="auth_asgi")
+        Post.objects.create(author=author, text="Served through ASGI")
+
+        start, body = self.request(
+            reverse("posts:profile", kwargs={"username": author.username}),
+        )
+
+        self.assertEqual(start["status"], 200)
+        self.assertIn(
+            (b"content-type", b"text/html; charset=utf-8"), start["headers"],
+        )
+        self.assertIn("Served through ASGI", body["body"].decode())
+        self.assertFalse(body.get("more_body", False))
+
+    def test_core_asgi_passes_request_body(self):
+        """Check if the body read in chunks reaches the view."""
+        user = User.objects.create_user(username="auth_asgi")
+        client = Client()
+        client.force_login(user)
+        request = RequestFactory().get("/")
+        token = get_token(request)
+        cookie = "sessionid={}; csrftoken={}".format(
+            client.cookies["sessionid"].value, request.META["CSRF_COOKIE"],
+        )
+        start, _ = self.request(
+            reverse("posts:post_create"),
+            method="POST",
+            body=urlencode({
+                "text": "Posted through ASGI",
+                "csrfmiddlewaretoken": token,
+            }).encode(),
+            headers=[
+                (b"content-type", b"application/x-www-form-urlencoded"),
+                (b"cookie", cookie.encode()),
+            ],
+        )
+
+        self.assertEqual(start["status"], 302)
+        self.assertTrue(
+            Post.objects.filter(text="Posted through ASGI").exists(),
+        )
+
+    def test_core_gather_runs_parts_on_threads(self):
+        """Check if parts run concurrently and their queries are counted."""
+        counter = runner.QueryCounter()
+        with connection.execute_wrapper(counter):
+            names, count = concurrent.gather(
+                lambda: threading.current_thread().name,
+                lambda: (
+                    threading.current_thread().name, Post.objects.count(),
+                ),
+            )
+
+        self.assertNotEqual(names, count[0])
+        self.assertEqual(count[1], 0)
+        self.assertEqual(counter.count, 1)
+
+    def test_core_gather_closes_connections_of_parts(self):
+        """Check if parts close connections not kept beyond a request."""
+        wrapper_class = type(connections["default"])
+        # In-memory test databases ignore close(), so calls are checked.
+        with mock.patch.object(wrapper_class, "close", autospec=True) as close:
+            _, (part_connection, count) = concurrent.gather(
+                lambda: None,
+                lambda: (connections["default"], Post.objects.count()),
+            )
+
+        self.assertEqual(count, 0)
+        self.assertEqual(part_connection.settings_dict["CONN_MAX_AGE"], 0)
+        self.assertIn(mock.call(part_connection), close.call_args_list)
+
+    def test_core_gather_counts_queries_of_every_part(self):
+        """Check if queries of parts on threads are all counted."""
+        stats = instrumentation.RequestStats()
+        with stats.track():
+            concurrent.gather(
+                *[lambda: list(Post.objects.all()) for _ in range(4)],
+            )
+
+        self.assertEqual(stats.queries, 4)
+
+    def test_core_gather_runs_parts_in_order_in_transactions(self):
+        """Check if parts of a transaction run in the calling thread."""
+        with transaction.atomic():
+            names = concurrent.gather(
+                lambda: threading.current_thread().name,
+                lambda: threading.current_thread().name,
+            )
+        self.assertEqual(names, [threading.current_thread().name] * 2)
+
+    def test_core_asgi_environ_of_scope(self):
+        """Check if headers and path are given as WSGI expects them."""
+        environ = asgi.make_environ(
+            {
+                "method": "GET",
+                "path": "/profile/юзер/",
+                "query_string": b"page=2",
+                "headers": [
+                    (b"content-type", b"text/plain"),
+                    (b"cookie", b"a=1"),
+                    (b"cookie", b"b=2"),
+                    (b"x-forwarded-for", b"10.0.0.1"),
+                ],
+            },
+            io.BytesIO(),
+        )
+
+        self.assertEqual(
+            environ["PATH_INFO"].encode("latin-1").decode(),
+            "/profile/юзер/",
+        )
+        self.assertEqual(environ["QUERY_STRING"], "page=2")
+        self.assertEqual(environ["CONTENT_TYPE"], "text/plain")
+        self.assertEqual(environ["HTTP_COOKIE"], "a=1; b=2")
+        self.assertEqual(environ["HTTP_X_FORWARDED_FOR"], "10.0.0.1")
+
+    def test_core_asgi_benchmark_loads_every_mode(self):
+        """Check if every mode serves the pages of the benchmark."""
+        DatasetBuilder(seed=1).build(
+            users=20, groups=2, posts=60, comments=60, follows=60,
+        )
+        results = asgi_benchmark.run(
+            clients=3, requests=10, delay=0, workers=1, threads=2,
+        )
+        self.assertEqual(len(results), 3)
+        for name, result in results.items():
+            with self.subTest(mode=name):
+                self.assertGreater(result["requests_per_second"], 0)
@@ -2,10 +2,14 @@
 
 pages
 404
+metrics
 """
-
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
 from django.shortcuts import render
 
+from core import metrics as metrics_registry
+
 
 def page_not_found(request, exception):
     """Exchange basic 404 error page with custom template."""
@@ -15,3 +19,17 @@ def page_not_found(request, exception):
 def csrf_failure(request, reason=""):
     """Exchange basic 404 csrf error page with custom template."""
     return render(request, "core/403csrf.html")
+
+
+def metrics(request):
+    """Expose collected metrics in Prometheus text format.
+
+    Only scrapers from METRICS_ALLOWED_IPS and staff users get them.
+    """
+    allowed = request.META.get("REMOTE_ADDR") in settings.METRICS_ALLOWED_IPS
+    if not (allowed or request.user.is_staff and request.user.is_active):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        metrics_registry.render(),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
@@ -0,0 +1,27 @@
+"""Pools of worker processes.
+
+Kept apart from modules importing models, since spawned workers import
+this module before django is set up.
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+
+
+def init_worker():
+    """Set up django in a fresh worker process."""
+    django.setup()
+
+
+def make_executor(workers):
+    """Start a pool of worker processes.
+
+    Workers are spawned rather than forked, so they never share database
+    connections or locks of the parent process.
+    """
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_worker,
+    )
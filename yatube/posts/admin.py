@@ -1,10 +1,29 @@
 """Administrator panel settings for posts app."""
 from django.contrib import admin
+from django.conf import settings
 
-from posts.models import Post, Group, Comment, Follow
+from posts.models import Post, Group, Comment, Follow, UserStats
+from posts.search import get_backend, matching_ids
 
 
-class PostAdmin(admin.ModelAdmin):
+class IndexedSearchMixin:
+    """Search changelist through full-text index instead of LIKE scans."""
+
+    search_kind = None
+
+    def get_search_results(self, request, queryset, search_term):
+        """Filter queryset by ids of best index matches."""
+        if not search_term or get_backend() is None:
+            return super().get_search_results(
+                request, queryset, search_term,
+            )
+        ids = matching_ids(
+            search_term, self.search_kind, settings.SEARCH_ADMIN_LIMIT,
+        )
+        return queryset.filter(pk__in=ids), False
+
+
+class PostAdmin(IndexedSearchMixin, admin.ModelAdmin):
     """Custom settings for posts admin panel."""
 
     list_display = (
@@ -13,8 +32,10 @@ class PostAdmin(admin.ModelAdmin):
         "pub_date",
         "author",
         "group",
+        "comment_count",
     )
     search_fields = ("text",)
+    search_kind = "post"
     list_filter = ("pub_date",)
     empty_value_display = "-пусто-"
     list_editable = ("group",)
@@ -34,14 +55,8 @@ class GroupAdmin(admin.ModelAdmin):
     empty_value_display = "-пусто-"
     list_editable = ("description",)
 
-    def post_count(self, obj):
-        """Count post quantity."""
-        return obj.posts.count()
 
-    post_count.short_description = "Posts quantity"
-
-
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(IndexedSearchMixin, admin.ModelAdmin):
     """Custom settings for comment admin panel."""
 
     list_display = (
@@ -52,6 +67,7 @@ class CommentAdmin(admin.ModelAdmin):
         "author",
     )
     search_fields = ("text",)
+    search_kind = "comment"
     list_filter = ("created",)
     empty_value_display = "-пусто-"
 
@@ -68,7 +84,22 @@ class FollowAdmin(admin.ModelAdmin):
     empty_value_display = "-пусто-"
 
 
+class UserStatsAdmin(admin.ModelAdmin):
+    """Custom settings for user statistics admin panel."""
+
+    list_display = (
+        "user",
+        "post_count",
+        "follower_count",
+        "following_count",
+    )
+    list_select_related = ("user",)
+    search_fields = ("user__username",)
+    readonly_fields = ("post_count", "follower_count", "following_count")
+
+
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group, GroupAdmin)
 admin.site.register(Comment, CommentAdmin)
 admin.site.register(Follow, FollowAdmin)
+admin.site.register(UserStats, UserStatsAdmin)
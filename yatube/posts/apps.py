@@ -6,3 +6,12 @@ class PostsConfig(AppConfig):
     """Posts app config class."""
 
     name = "posts"
+
+    def ready(self):
+        """Connect signal handlers and limit decoded image size."""
+        from django.conf import settings
+        from PIL import Image
+
+        import posts.signals  # noqa: F401
+
+        Image.MAX_IMAGE_PIXELS = settings.POST_IMAGE_MAX_PIXELS
@@ -0,0 +1,97 @@
+"""Render cache of post cards.
+
+Rendered includes/post.html is stored under a key made of post id, its
+update time and versions of its group and author, so changing any of
+them makes the old fragment unreachable.
+"""
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core import instrumentation, metrics
+
+CARD_KEY = "post_card:{pk}:{updated}:{group}:{author}"
+VERSION_KEY = "post_card_version:{kind}:{pk}"
+
+metrics.describe(
+    "post_card_cache_total", "Post card render cache lookups by result.",
+)
+
+
+def version_key(kind, pk):
+    """Return cache key of the version of a group or a user."""
+    return VERSION_KEY.format(kind=kind, pk=pk)
+
+
+def bump_version(kind, pk):
+    """Invalidate cards of all posts of the given group or user."""
+    cache.set(version_key(kind, pk), uuid4().hex[:8], None)
+
+
+def get_versions(keys):
+    """Fetch versions by keys, starting new ones for missing keys.
+
+    Evicted version must not fall back to a value some stale card was
+    stored with, so it is replaced by a fresh one.
+    """
+    versions = cache.get_many(keys)
+    missing = {
+        key: uuid4().hex[:8] for key in keys if key not in versions
+    }
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return versions
+
+
+def card_key(post, versions):
+    """Build cache key of the card of the given post."""
+    return CARD_KEY.format(
+        pk=post.pk,
+        updated=int(post.updated.timestamp() * 1000000),
+        group=versions.get(version_key("group", post.group_id), "-"),
+        author=versions[version_key("user", post.author_id)],
+    )
+
+
+def prefetch_cards(posts):
+    """Attach card cache keys and cached fragments to posts.
+
+    Costs two cache round trips for the whole page.
+    """
+    posts = list(posts)
+    keys = {version_key("user", post.author_id) for post in posts}
+    keys.update(
+        version_key("group", post.group_id)
+        for post in posts if post.group_id
+    )
+    versions = get_versions(list(keys))
+    for post in posts:
+        post.card_cache_key = card_key(post, versions)
+    cards = cache.get_many([post.card_cache_key for post in posts])
+    for post in posts:
+        post.cached_card = cards.get(post.card_cache_key)
+
+
+def get_card(post):
+    """Return cached fragment of the post card or None."""
+    if not hasattr(post, "card_cache_key"):
+        prefetch_cards([post])
+    html = post.cached_card
+    result = "miss" if html is None else "hit"
+    metrics.inc("post_card_cache_total", result=result)
+    instrumentation.count_cache("post_card", result)
+    return html
+
+
+def store_card(post, html):
+    """Put rendered post card into cache."""
+    cache.set(post.card_cache_key, html, settings.POST_CARD_CACHE_TIMEOUT)
+    post.cached_card = html
+
+
+def delete_card(post):
+    """Drop cached card of the post."""
+    prefetch_cards([post])
+    cache.delete(post.card_cache_key)
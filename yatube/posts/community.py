@@ -0,0 +1,295 @@
+"""Streaming export and import of a whole community as JSONL.
+
+Every line holds one row in the shape of Django serialization:
+{"model": "post", "pk": 1, "fields": {...}}. Users come first, then
+groups, posts, comments and follows, so rows only point to rows above
+them. Both directions go through the database in chunks and never keep
+more than one batch in memory.
+
+Imported rows keep their ids shifted by the largest id the model had
+before the import started, so they never clash with existing rows.
+Users and groups whose username or slug already exists are merged into
+the existing ones instead. An import can be resumed from a checkpoint
+file saved after every committed batch.
+"""
+import datetime
+import gzip
+import json
+import os
+import time
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.core.management.color import no_style
+from django.db import connection, reset_queries, transaction
+from django.db.models import Max
+
+from posts import feed, feed_cache, follow_graph
+from posts.counters import recount_all
+from posts.models import Comment, Follow, Group, Post
+from posts.search import rebuild_index
+
+User = get_user_model()
+
+MODELS = {
+    "user": User,
+    "group": Group,
+    "post": Post,
+    "comment": Comment,
+    "follow": Follow,
+}
+FIELDS = {
+    "user": (
+        "username",
+        "email",
+        "first_name",
+        "last_name",
+        "password",
+        "is_active",
+        "date_joined",
+    ),
+    "group": ("title", "slug", "description"),
+    "post": (
+        "text",
+        "pub_date",
+        "author",
+        "group",
+        "image",
+        "image_width",
+        "image_height",
+    ),
+    "comment": ("text", "created", "post", "author"),
+    "follow": ("user", "author"),
+}
+# Rows merged into existing ones by natural key instead of being added.
+NATURAL_KEYS = {"user": "username", "group": "slug"}
+REFERENCES = {
+    "post": {"author": "user", "group": "group"},
+    "comment": {"post": "post", "author": "user"},
+    "follow": {"user": "user", "author": "user"},
+}
+DATES = {"user": "date_joined", "post": "pub_date", "comment": "created"}
+
+
+@contextmanager
+def manual_dates(*fields):
+    """Let bulk inserts keep given values of auto_now_add fields."""
+    previous = [field.auto_now_add for field in fields]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now_add in zip(fields, previous):
+            field.auto_now_add = auto_now_add
+
+
+def encode(value):
+    """Serialize dates with full precision, unlike DjangoJSONEncoder."""
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def open_stream(path, mode):
+    """Open JSONL file, gzip-compressed when its name ends with .gz."""
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class Progress:
+    """Rows done per model with the rate they are done at."""
+
+    def __init__(self, log=None):
+        """Start the clock."""
+        self.log = log or (lambda message: None)
+        self.started = time.perf_counter()
+        self.counts = {}
+
+    def add(self, model_name, count):
+        """Count rows and report the total and the rate."""
+        self.counts[model_name] = self.counts.get(model_name, 0) + count
+        elapsed = max(time.perf_counter() - self.started, 1e-6)
+        self.log(
+            f"{model_name}: {self.counts[model_name]} rows, "
+            f"{sum(self.counts.values()) / elapsed:.0f} rows/s",
+        )
+
+
+def column(model_name, field):
+    """Return attribute name of the exported field."""
+    return f"{field}_id" if field in REFERENCES.get(model_name, ()) else field
+
+
+def export_community(stream, batch_size=5000, log=None):
+    """Write every row of community models to the stream."""
+    progress = Progress(log)
+    for model_name, model in MODELS.items():
+        columns = [column(model_name, field) for field in FIELDS[model_name]]
+        rows = (
+            model.objects.order_by("pk")
+            .values_list("pk", *columns)
+            .iterator(chunk_size=batch_size)
+        )
+        done = 0
+        for pk, *values in rows:
+            stream.write(json.dumps(
+                {
+                    "model": model_name,
+                    "pk": pk,
+                    "fields": dict(zip(FIELDS[model_name], values)),
+                },
+                default=encode,
+                ensure_ascii=False,
+            ))
+            stream.write("\n")
+            done += 1
+            if done % batch_size == 0:
+                progress.add(model_name, batch_size)
+        progress.add(model_name, done % batch_size)
+    return progress.counts
+
+
+class Importer:
+    """Import JSONL stream batch by batch with a resumable checkpoint."""
+
+    def __init__(self, checkpoint=None, batch_size=1000, log=None):
+        """Load checkpoint of an interrupted import or start afresh."""
+        self.checkpoint = checkpoint
+        self.batch_size = batch_size
+        self.progress = Progress(log)
+        if checkpoint and os.path.exists(checkpoint):
+            with open(checkpoint, encoding="utf-8") as checkpoint_file:
+                self.state = json.load(checkpoint_file)
+        else:
+            self.state = {
+                "line": 0,
+                "offsets": {
+                    name: model.objects.aggregate(last=Max("pk"))["last"]
+                    or 0
+                    for name, model in MODELS.items()
+                },
+                "merged": {name: {} for name in NATURAL_KEYS},
+            }
+
+    @property
+    def resumed_from(self):
+        """Return number of lines imported before."""
+        return self.state["line"]
+
+    def new_pk(self, model_name, pk):
+        """Return id the exported row gets in this database."""
+        if pk is None:
+            return None
+        merged = self.state["merged"].get(model_name, {})
+        return merged.get(str(pk), pk + self.state["offsets"][model_name])
+
+    def merge_existing(self, model_name, records):
+        """Map rows with taken natural keys to the existing rows."""
+        key = NATURAL_KEYS.get(model_name)
+        if key is None:
+            return records
+        values = [record["fields"][key] for record in records]
+        existing = dict(
+            MODELS[model_name].objects.filter(**{f"{key}__in": values})
+            .values_list(key, "pk"),
+        )
+        merged = self.state["merged"][model_name]
+        fresh = []
+        for record in records:
+            pk = existing.get(record["fields"][key])
+            if pk is None:
+                fresh.append(record)
+            elif pk != self.new_pk(model_name, record["pk"]):
+                merged[str(record["pk"])] = pk
+        return fresh
+
+    def build(self, model_name, record):
+        """Return unsaved instance of the exported row."""
+        model = MODELS[model_name]
+        values = {}
+        for field in FIELDS[model_name]:
+            value = record["fields"][field]
+            if field in REFERENCES.get(model_name, {}):
+                value = self.new_pk(REFERENCES[model_name][field], value)
+                field = f"{field}_id"
+            elif field == DATES.get(model_name):
+                value = model._meta.get_field(field).to_python(value)
+            values[field] = value
+        return model(pk=self.new_pk(model_name, record["pk"]), **values)
+
+    def save_batch(self, model_name, records, last_line):
+        """Insert one batch and remember how far the import got.
+
+        Ids are known in advance, so replaying a batch inserted right
+        before a crash only skips rows that are already there.
+        """
+        with transaction.atomic():
+            objs = [
+                self.build(model_name, record)
+                for record in self.merge_existing(model_name, records)
+            ]
+            if model_name == "follow":
+                objs = [obj for obj in objs if obj.user_id != obj.author_id]
+            MODELS[model_name].objects.bulk_create(
+                objs, ignore_conflicts=True,
+            )
+        # With DEBUG on, every batch statement would be kept in memory.
+        reset_queries()
+        self.state["line"] = last_line
+        self.save_checkpoint()
+        self.progress.add(model_name, len(records))
+
+    def save_checkpoint(self):
+        """Atomically write state to the checkpoint file."""
+        if not self.checkpoint:
+            return
+        temporary = self.checkpoint + ".tmp"
+        with open(temporary, "w", encoding="utf-8") as checkpoint_file:
+            json.dump(self.state, checkpoint_file)
+        os.replace(temporary, self.checkpoint)
+
+    def run(self, stream):
+        """Import every line after the checkpoint and rebuild derived data."""
+        batch = []
+        batch_model = None
+        line_number = 0
+        dates = [
+            MODELS[name]._meta.get_field(field)
+            for name, field in DATES.items()
+        ]
+        with manual_dates(*dates):
+            for line_number, line in enumerate(stream, start=1):
+                if line_number <= self.state["line"] or not line.strip():
+                    continue
+                record = json.loads(line)
+                if batch and (
+                    record["model"] != batch_model
+                    or len(batch) >= self.batch_size
+                ):
+                    self.save_batch(batch_model, batch, line_number - 1)
+                    batch = []
+                batch_model = record["model"]
+                batch.append(record)
+            if batch:
+                self.save_batch(batch_model, batch, line_number)
+        self.finish()
+        return self.progress.counts
+
+    def finish(self):
+        """Rebuild what signals keep for rows saved one by one."""
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), list(MODELS.values()),
+        )
+        if statements:
+            with connection.cursor() as cursor:
+                for statement in statements:
+                    cursor.execute(statement)
+        recount_all()
+        feed.rebuild_all_feeds()
+        rebuild_index()
+        feed_cache.bump_generation("posts")
+        follow_graph.invalidate_all()
+        if self.checkpoint and os.path.exists(self.checkpoint):
+            os.remove(self.checkpoint)
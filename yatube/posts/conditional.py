@@ -0,0 +1,171 @@
+"""Conditional GET of post, profile and group pages.
+
+A validator reads a few indexed values the page depends on, e.g. the
+latest publication date in the group, and the page is answered with
+304 Not Modified before any pagination or rendering when the client
+holds a page built from the same values. The "posts" feed generation is
+mixed in for edits and deletions the indexed values do not reflect, and
+the requesting user for parts of pages shown to them only. Pages of
+signed in users carry forms, so their validator also holds the CSRF
+secret the forms are built from.
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.db.models import OuterRef, Subquery
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+)
+from django.utils.http import http_date, quote_etag
+
+from posts import feed_cache
+from posts.models import Comment, Group, Post, UserStats
+
+
+def latest(model, field, date_field):
+    """Return subquery of the newest date among rows pointing to outer row.
+
+    Reads one entry of the (field, date) index instead of aggregating
+    over all rows of a big group or a long comment thread.
+    """
+    return Subquery(
+        model.objects.filter(**{field: OuterRef("pk")})
+        .order_by(f"-{date_field}")
+        .values(date_field)[:1],
+    )
+
+
+def group_validator(request, slug):
+    """Return counter and latest post time of the group."""
+    row = (
+        Group.objects.filter(slug=slug)
+        .annotate(latest=latest(Post, "group", "pub_date"))
+        .values_list("pk", "post_count", "latest")
+        .first()
+    )
+    if row is None:
+        return None
+    return row[:2], row[2]
+
+
+def post_validator(request, post_id):
+    """Return comment counter, update and latest comment time of the post.
+
+    The "comments" generation stands for edits of comments, which leave
+    the counter and the times as they are.
+    """
+    row = (
+        Post.objects.filter(pk=post_id)
+        .annotate(latest_comment=latest(Comment, "post", "created"))
+        .values_list("updated", "comment_count", "latest_comment")
+        .first()
+    )
+    if row is None:
+        return None
+    updated, comment_count, latest_comment = row
+    comments = feed_cache.get_generation("comments")
+    moments = (
+        updated, latest_comment, feed_cache.generation_time(comments),
+    )
+    return (comment_count, comments), max(filter(None, moments))
+
+
+def profile_validator(request, username):
+    """Return counters of the author and follow state of the reader."""
+    row = (
+        UserStats.objects.filter(user__username=username)
+        .values_list("post_count", "follower_count", "following_count")
+        .first()
+    )
+    if row is None:
+        return None
+    reader_follows = (
+        feed_cache.get_generation(f"follow:{request.user.pk}")
+        if request.user.is_authenticated else "-"
+    )
+    return row + (reader_follows,), None
+
+
+def csrf_secret(request):
+    """Return CSRF secret the forms of the page are signed with.
+
+    It is rotated on login, so a page kept from an earlier session is
+    not served with a token the next POST would fail with. Anonymous
+    pages show no forms and are shared, so they do not depend on it.
+    """
+    if not request.user.is_authenticated:
+        return "-"
+    return request.META.get("CSRF_COOKIE", "")
+
+
+def set_cache_headers(request, response):
+    """Let shared caches keep anonymous pages only."""
+    if request.user.is_authenticated:
+        patch_cache_control(response, private=True, no_cache=True)
+    else:
+        patch_cache_control(
+            response,
+            public=True,
+            max_age=0,
+            s_maxage=settings.PAGE_CACHE_MAX_AGE,
+        )
+    patch_vary_headers(response, ("Cookie",))
+
+
+def conditional_page(validator):
+    """Answer GET of the page with 304 when its validator is unchanged.
+
+    Pages with thumbnail placeholders get no validator, so clients
+    fetch them again once thumbnails are ready. Pages of signed in users
+    get no Last-Modified, which does not reflect their CSRF secret.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return view(request, *args, **kwargs)
+            validated = validator(request, *args, **kwargs)
+            if validated is None:
+                return view(request, *args, **kwargs)
+            values, last_modified = validated
+            generation = feed_cache.get_generation("posts")
+            moments = [
+                moment for moment in (
+                    last_modified, feed_cache.generation_time(generation),
+                )
+                if moment is not None
+            ]
+            last_modified = max(moments) if moments else None
+            raw = "|".join(map(str, (
+                request.get_full_path(),
+                request.user.pk,
+                csrf_secret(request),
+                generation,
+                *values,
+                last_modified,
+            )))
+            etag = quote_etag(hashlib.md5(raw.encode()).hexdigest())
+            timestamp = (
+                int(last_modified.timestamp())
+                if last_modified and not request.user.is_authenticated
+                else None
+            )
+            response = get_conditional_response(
+                request, etag=etag, last_modified=timestamp,
+            )
+            if response is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code != 200 or getattr(
+                    request, "thumbnail_pending", False,
+                ):
+                    return response
+                response["ETag"] = etag
+                if timestamp is not None:
+                    response["Last-Modified"] = http_date(timestamp)
+            set_cache_headers(request, response)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,113 @@
+"""Denormalized counters of posts app.
+
+Signal handlers keep Group.post_count, Post.comment_count and UserStats
+in step with the rows they count, in the transaction of the save or
+delete; recount_all repairs any drift.
+"""
+from django.apps import apps as global_apps
+from django.db import router, transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+# Users whose missing counters rows are added by one statement.
+RECOUNT_BATCH_SIZE = 5000
+
+
+def change_counter(model, pk, field, delta):
+    """Shift counter field of the given row by delta."""
+    if pk is not None:
+        model.objects.filter(pk=pk).update(**{field: F(field) + delta})
+
+
+def change_counters(changes):
+    """Apply (model, pk, field, delta) changes in one transaction.
+
+    Inside the transaction of a save no savepoint is made, so a failed
+    update rolls the saved row back with it.
+    """
+    with transaction.atomic(savepoint=False):
+        for model, pk, field, delta in changes:
+            change_counter(model, pk, field, delta)
+
+
+def count_of(model, field, outer="pk"):
+    """Return subquery counting rows of model pointing to outer row."""
+    rows = (
+        model.objects.filter(**{field: OuterRef(outer)})
+        .order_by()
+        .values(field)
+        .annotate(count=Count("pk"))
+        .values("count")
+    )
+    return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+
+def user_counts(apps):
+    """Return counters of UserStats as subqueries over counted rows."""
+    Post = apps.get_model("posts", "Post")
+    Follow = apps.get_model("posts", "Follow")
+    return {
+        "post_count": count_of(Post, "author", "user_id"),
+        "follower_count": count_of(Follow, "author", "user_id"),
+        "following_count": count_of(Follow, "user", "user_id"),
+    }
+
+
+def ensure_stats(user):
+    """Return counters of the user, counting them if the row is missing.
+
+    Users inserted in bulk, e.g. by the dataset builders, skip the
+    post_save handler adding the row. The row is read back from the
+    database written to, a replica may not have it yet.
+    """
+    UserStats = global_apps.get_model("posts", "UserStats")
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        pass
+    UserStats.objects.bulk_create(
+        [UserStats(user=user)], ignore_conflicts=True,
+    )
+    UserStats.objects.filter(user=user).update(**user_counts(global_apps))
+    user.stats = UserStats.objects.using(
+        router.db_for_write(UserStats),
+    ).get(user=user)
+    return user.stats
+
+
+def create_missing_stats(apps, batch_size):
+    """Add counters rows of users lacking them, batch by batch.
+
+    Users are read in pages of primary keys, so memory holds one batch
+    and no cursor stays open over the table being filled.
+    """
+    User = apps.get_model("auth", "User")
+    UserStats = apps.get_model("posts", "UserStats")
+    missing = (
+        User.objects.filter(stats__isnull=True)
+        .order_by("pk")
+        .values_list("pk", flat=True)
+    )
+    last = 0
+    while True:
+        pks = list(missing.filter(pk__gt=last)[:batch_size])
+        if not pks:
+            return
+        UserStats.objects.bulk_create(
+            [UserStats(user_id=pk) for pk in pks], ignore_conflicts=True,
+        )
+        last = pks[-1]
+
+
+def recount_all(apps=global_apps, batch_size=RECOUNT_BATCH_SIZE):
+    """Recompute every stored counter from the counted tables."""
+    Group = apps.get_model("posts", "Group")
+    Post = apps.get_model("posts", "Post")
+    Comment = apps.get_model("posts", "Comment")
+    UserStats = apps.get_model("posts", "UserStats")
+
+    with transaction.atomic():
+        create_missing_stats(apps, batch_size)
+        Group.objects.update(post_count=count_of(Post, "group"))
+        Post.objects.update(comment_count=count_of(Comment, "post"))
+        UserStats.objects.update(**user_counts(apps))
@@ -0,0 +1,367 @@
+"""Materialized follow feed for posts app.
+
+New posts are copied into FeedEntry rows of every follower of the author
+(fan-out on write), and feeds are trimmed to FOLLOW_FEED_DEPTH entries
+as they grow. Authors with too many followers are skipped on write and
+their posts are merged into the feed on read instead, so a page reads
+one bounded index range of the reader's entries and one of every such
+author.
+"""
+import heapq
+from operator import itemgetter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Q
+
+from posts import feed_cache, follow_graph
+from posts.models import (
+    CARD_DEFERRED_FIELDS,
+    FeedEntry,
+    Follow,
+    Post,
+    UserStats,
+)
+
+# Longer lists of followed authors go to the database as a subquery
+# rather than as query parameters.
+FEED_MAX_LISTED_AUTHORS = 500
+# Authors fanned out on read are kept under the generation of the scope,
+# bumped when another author joins them.
+READ_SIDE_SCOPE = "read_side"
+READ_SIDE_KEY = "feed_read_side:{limit}:{generation}"
+FEED_READ_SIDE_TIMEOUT = 60 * 60
+# Key values of rows pages of a feed end with, kept under generations of
+# everything the feed is made of.
+BOUNDARY_KEY = "feed_boundary:{user}:{position}:{generations}"
+FEED_BOUNDARY_TIMEOUT = 60 * 60
+
+
+def is_fanned_out_on_read(author_id):
+    """Check if author has too many followers to copy posts on write."""
+    return UserStats.objects.filter(
+        user_id=author_id,
+        follower_count__gt=settings.FOLLOW_FEED_FANOUT_MAX_FOLLOWERS,
+    ).exists()
+
+
+def fan_out_post(post):
+    """Deliver new post to feeds of followers of its author."""
+    if is_fanned_out_on_read(post.author_id):
+        mark_read_side(post.author_id)
+        return
+    follower_ids = follow_graph.followers(post.author_id)
+    batch = []
+    for user_id in follower_ids:
+        batch.append(FeedEntry(
+            user_id=user_id,
+            post_id=post.pk,
+            author_id=post.author_id,
+            pub_date=post.pub_date,
+        ))
+        if len(batch) >= settings.FOLLOW_FEED_BATCH_SIZE:
+            deliver(batch)
+            batch = []
+    deliver(batch)
+
+
+def deliver(entries):
+    """Insert feed entries and trim feeds they were added to."""
+    if not entries:
+        return
+    FeedEntry.objects.bulk_create(entries, ignore_conflicts=True)
+    trim_feeds([entry.user_id for entry in entries])
+
+
+def backfill_feed(user_id, author_id):
+    """Copy latest posts of newly followed author into reader's feed."""
+    if is_fanned_out_on_read(author_id):
+        mark_read_side(author_id)
+        return
+    posts = (
+        Post.objects.filter(author_id=author_id)
+        .order_by("-pub_date")
+        .values_list("pk", "pub_date")[:settings.FOLLOW_FEED_DEPTH]
+    )
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(
+                user_id=user_id,
+                post_id=post_id,
+                author_id=author_id,
+                pub_date=pub_date,
+            )
+            for post_id, pub_date in posts
+        ],
+        ignore_conflicts=True,
+    )
+    trim_feed(user_id)
+
+
+def purge_feed(user_id, author_id):
+    """Remove posts of unfollowed author from reader's feed."""
+    FeedEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def trim_feed(user_id):
+    """Drop feed entries older than FOLLOW_FEED_DEPTH newest ones."""
+    trim_feeds([user_id])
+
+
+def trim_feeds(user_ids):
+    """Drop entries past FOLLOW_FEED_DEPTH newest ones of every feed.
+
+    One statement for the whole batch, reading at most a few entries
+    more than the depth of every feed.
+    """
+    table = FeedEntry._meta.db_table
+    marks = ", ".join(["%s"] * len(user_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {table} WHERE id IN ("
+            "SELECT id FROM ("
+            "SELECT id, ROW_NUMBER() OVER ("
+            "PARTITION BY user_id "
+            "ORDER BY pub_date DESC, post_id DESC) AS position "
+            f"FROM {table} WHERE user_id IN ({marks})"
+            ") ranked WHERE position > %s)",
+            [*user_ids, settings.FOLLOW_FEED_DEPTH],
+        )
+
+
+def rebuild_all_feeds():
+    """Refill every follow feed from Follow table in one statement.
+
+    Newest FOLLOW_FEED_DEPTH posts of fanned out authors are picked per
+    reader with a window function, which is much cheaper than backfilling
+    follows one by one after bulk loads.
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FeedEntry._meta.db_table}")
+        cursor.execute(
+            f"INSERT INTO {FeedEntry._meta.db_table} "
+            "(user_id, post_id, author_id, pub_date) "
+            "SELECT user_id, post_id, author_id, pub_date FROM ("
+            "SELECT follow.user_id, post.id AS post_id, post.author_id, "
+            "post.pub_date, ROW_NUMBER() OVER ("
+            "PARTITION BY follow.user_id "
+            "ORDER BY post.pub_date DESC, post.id DESC) AS position "
+            f"FROM {Follow._meta.db_table} follow "
+            f"JOIN {Post._meta.db_table} post "
+            "ON post.author_id = follow.author_id "
+            f"LEFT JOIN {UserStats._meta.db_table} stats "
+            "ON stats.user_id = follow.author_id "
+            "WHERE COALESCE(stats.follower_count, 0) <= %s"
+            ") ranked WHERE position <= %s",
+            [
+                settings.FOLLOW_FEED_FANOUT_MAX_FOLLOWERS,
+                settings.FOLLOW_FEED_DEPTH,
+            ],
+        )
+
+
+def newer(fields, values, backwards):
+    """Return condition of rows past (pub_date, id) boundary values."""
+    date_field, id_field = fields
+    lookup = "gt" if backwards else "lt"
+    pub_date, pk = values
+    return Q(**{f"{date_field}__{lookup}": pub_date}) | Q(
+        **{date_field: pub_date, f"{id_field}__{lookup}": pk},
+    )
+
+
+def read_side_authors():
+    """Return ids of all authors fanned out on read."""
+    limit = settings.FOLLOW_FEED_FANOUT_MAX_FOLLOWERS
+    key = READ_SIDE_KEY.format(
+        limit=limit, generation=feed_cache.get_generation(READ_SIDE_SCOPE),
+    )
+    return cache.get_or_set(
+        key,
+        lambda: list(
+            UserStats.objects.filter(follower_count__gt=limit)
+            .values_list("user", flat=True)
+        ),
+        FEED_READ_SIDE_TIMEOUT,
+    )
+
+
+def mark_read_side(author_id):
+    """Make readers look for the author fanned out on read anew.
+
+    An author passes the follower limit on a new follow and is seen
+    there by backfill_feed, or later by fan_out_post, so both bump the
+    generation if the author is not among those kept yet.
+    """
+    if author_id not in read_side_authors():
+        feed_cache.bump_generation(READ_SIDE_SCOPE)
+
+
+def read_side_ids(user_id, author_ids):
+    """Return ids of followed authors fanned out on read.
+
+    Picked out of all such authors, usually none, so a list of followed
+    authors needs no query and a subquery needs one only if there are.
+    """
+    authors = read_side_authors()
+    if not authors:
+        return []
+    if isinstance(author_ids, list):
+        followed = set(author_ids)
+        return [author_id for author_id in authors if author_id in followed]
+    return list(
+        Follow.objects.filter(user_id=user_id, author__in=authors)
+        .values_list("author", flat=True)
+    )
+
+
+class FollowFeed:
+    """Posts of authors followed by a reader, newest first.
+
+    Instead of one query sorting the union of the sources, every source
+    is read as an index range limited to the rows a page can need: the
+    reader's feed entries joined with their posts, and posts of every
+    followed author fanned out on read. Rows are merged here by
+    (pub_date, id). Slices serve numbered paginators, seeking from the
+    key of the row before the slice when an earlier page left it, and
+    seek() serves KeysetPaginator.
+    """
+
+    model = Post
+    ordered = True
+
+    def __init__(self, user, author_ids, prepared=False):
+        """Store reader and followed authors, a list or a subquery."""
+        self.user = user
+        self.author_ids = author_ids
+        self.prepared = prepared
+
+    def for_feed(self):
+        """Return the feed loading posts prepared for cards."""
+        return FollowFeed(self.user, self.author_ids, prepared=True)
+
+    def sources(self, values, backwards):
+        """Return querysets of every source with their key fields."""
+        if isinstance(self.author_ids, list) and not self.author_ids:
+            return []
+        authors = read_side_ids(self.user.pk, self.author_ids)
+        entries = FeedEntry.objects.filter(user=self.user)
+        if authors:
+            # Entries made before the author passed the follower limit.
+            entries = entries.exclude(author__in=authors)
+        posts = Post.objects.all()
+        if self.prepared:
+            entries = entries.select_related(
+                "post__author", "post__group",
+            ).defer(*(f"post__{name}" for name in CARD_DEFERRED_FIELDS))
+            posts = posts.for_feed()
+        else:
+            entries = entries.select_related("post")
+        sources = [(entries, ("pub_date", "post_id"))] + [
+            (posts.filter(author_id=author_id), ("pub_date", "id"))
+            for author_id in authors
+        ]
+        sign = "" if backwards else "-"
+        result = []
+        for queryset, fields in sources:
+            if values is not None:
+                queryset = queryset.filter(newer(fields, values, backwards))
+            result.append(
+                queryset.order_by(*(sign + field for field in fields)),
+            )
+        return result
+
+    def seek(self, values, backwards, limit):
+        """Return up to limit posts past (pub_date, id) values."""
+        rows = heapq.merge(
+            *(
+                [
+                    (row.pub_date, row.pk, row) if isinstance(row, Post)
+                    else (row.pub_date, row.post_id, row.post)
+                    for row in (
+                        source if limit is None else source[:limit]
+                    )
+                ]
+                for source in self.sources(values, backwards)
+            ),
+            key=itemgetter(0, 1),
+            reverse=not backwards,
+        )
+        return [post for _, _, post in rows][:limit]
+
+    def boundary_key(self, position, generations):
+        """Return cache key of the row before the position in the feed."""
+        return BOUNDARY_KEY.format(
+            user=self.user.pk, position=position, generations=generations,
+        )
+
+    def generations(self):
+        """Return generations of everything the feed is made of."""
+        return "|".join(
+            feed_cache.get_generation(scope)
+            for scope in ("posts", f"follow:{self.user.pk}", READ_SIDE_SCOPE)
+        )
+
+    def remember_boundaries(self, start, posts, generations):
+        """Keep keys of the last two posts for slices starting past them.
+
+        Numbered paginators read one post more than a page shows, so the
+        next page starts right after either of them.
+        """
+        end = start + len(posts)
+        cache.set_many(
+            {
+                self.boundary_key(end - offset, generations): [
+                    post.pub_date, post.pk,
+                ]
+                for offset, post in enumerate(reversed(posts[-2:]))
+            },
+            FEED_BOUNDARY_TIMEOUT,
+        )
+
+    def __getitem__(self, index):
+        """Return posts of the slice, or one post."""
+        if not isinstance(index, slice):
+            posts = self[index:index + 1]
+            if not posts:
+                raise IndexError(index)
+            return posts[0]
+        start, stop = index.start or 0, index.stop
+        generations = self.generations()
+        values = None
+        if start:
+            values = cache.get(self.boundary_key(start, generations))
+        if values is None:
+            posts = self.seek(None, False, stop)[start:]
+        else:
+            posts = self.seek(
+                values, False, None if stop is None else stop - start,
+            )
+        if stop is not None:
+            self.remember_boundaries(start, posts, generations)
+        return posts
+
+    def __iter__(self):
+        """Iterate over the whole feed."""
+        return iter(self[:])
+
+    def exists(self):
+        """Check if the feed has any post."""
+        return bool(self[:1])
+
+
+def follow_feed(user):
+    """Return feed of posts of authors followed by user.
+
+    Followed authors come from the follow graph where it caches them,
+    and a reader following nobody gets an empty feed without a query.
+    Inside transactions, and for very long lists, a subquery is used
+    instead.
+    """
+    author_ids = Follow.objects.filter(user=user).values("author")
+    if follow_graph.cacheable():
+        following = follow_graph.following(user.pk)
+        if len(following) <= FEED_MAX_LISTED_AUTHORS:
+            author_ids = list(following)
+    return FollowFeed(user, author_ids)
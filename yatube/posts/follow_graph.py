@@ -0,0 +1,206 @@
+"""Follow graph of users kept as cached sorted id arrays.
+
+Each process keeps the ids a user follows, and the ids following a user,
+as sorted arrays of 4-byte integers in an LRU limited by the total
+number of ids held. An array is valid while the follow generations it
+was read under stay current, so every process sees a change as soon as
+signals of Follow bump them. Sets read inside a transaction are not
+cached, since it may still roll back. Membership is a binary search.
+
+Bulk follow inserts all missing rows in one statement and sends
+post_save for them, so counters, feeds and generations stay maintained
+by the same signals as for single follows. Views follow through it too,
+so locking the follower's row serializes all follows of a user.
+"""
+import threading
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models.signals import post_save
+
+from posts import feed_cache
+from posts.models import Follow, User
+
+# Typecode of arrays, user ids are positive 32-bit integers.
+TYPECODE = "I"
+# Generation of every set, bumped when follows change without signals.
+GRAPH_SCOPE = "follows"
+SCOPES = {
+    "following": "follow:{pk}",
+    "followers": "followers:{pk}",
+}
+COLUMNS = {
+    "following": ("user_id", "author_id"),
+    "followers": ("author_id", "user_id"),
+}
+
+
+class SetCache:
+    """LRU of id arrays bounded by the number of ids they hold."""
+
+    def __init__(self, max_ids):
+        """Start empty."""
+        self.max_ids = max_ids
+        self.size = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, generation):
+        """Return array stored under the generation, None if missing."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] != generation:
+                return None
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, generation, ids):
+        """Store array, evicting least recently used ones over the limit."""
+        if len(ids) > self.max_ids:
+            return
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old[1])
+            self.entries[key] = (generation, ids)
+            self.size += len(ids)
+            while self.size > self.max_ids:
+                _, (_, evicted) = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        """Forget all arrays."""
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+
+_sets = SetCache(settings.FOLLOW_GRAPH_CACHE_IDS)
+
+
+def generation(kind, pk):
+    """Return generation the set of the user is valid under."""
+    return "/".join(
+        feed_cache.get_generation(scope)
+        for scope in (GRAPH_SCOPE, SCOPES[kind].format(pk=pk))
+    )
+
+
+def load(kind, pk):
+    """Read sorted ids of the set from the database."""
+    key_column, value_column = COLUMNS[kind]
+    return array(TYPECODE, (
+        Follow.objects.filter(**{key_column: pk})
+        .order_by(value_column)
+        .values_list(value_column, flat=True)
+        .iterator()
+    ))
+
+
+def cacheable():
+    """Check if sets read now are committed and may be cached."""
+    return not transaction.get_connection(
+        router.db_for_read(Follow),
+    ).in_atomic_block
+
+
+def get_set(kind, pk):
+    """Return sorted ids of the set of the user through the cache."""
+    if not cacheable():
+        return load(kind, pk)
+    current = generation(kind, pk)
+    ids = _sets.get((kind, pk), current)
+    if ids is None:
+        ids = load(kind, pk)
+        _sets.set((kind, pk), current, ids)
+    return ids
+
+
+def following(user_id):
+    """Return sorted ids of authors the user follows."""
+    return get_set("following", user_id)
+
+
+def followers(author_id):
+    """Return sorted ids of users following the author."""
+    return get_set("followers", author_id)
+
+
+def contains(ids, pk):
+    """Check if sorted array holds the id."""
+    position = bisect_left(ids, pk)
+    return position < len(ids) and ids[position] == pk
+
+
+def follows(user_id, author_id):
+    """Check if the user follows the author."""
+    if user_id is None:
+        return False
+    return contains(following(user_id), author_id)
+
+
+def follow_many(user_id, author_ids):
+    """Make the user follow the authors, return ids of new follows.
+
+    Authors already followed and the user themself are skipped. The
+    cached set only narrows the candidates down: with the user's row
+    locked, followed authors are read again from the database, and
+    post_save is sent only for rows inserted here.
+    """
+    known = following(user_id)
+    candidates = {
+        author_id for author_id in author_ids
+        if author_id != user_id and not contains(known, author_id)
+    }
+    if not candidates:
+        return []
+    with transaction.atomic():
+        list(User.objects.select_for_update().filter(pk=user_id).values("pk"))
+        new_ids = sorted(candidates.difference(
+            Follow.objects.filter(user_id=user_id, author_id__in=candidates)
+            .values_list("author_id", flat=True)
+        ))
+        if not new_ids:
+            return []
+        Follow.objects.bulk_create(
+            [
+                Follow(user_id=user_id, author_id=author_id)
+                for author_id in new_ids
+            ],
+            ignore_conflicts=True,
+        )
+        # Conflict-ignoring inserts return no ids and send no signals.
+        created = Follow.objects.filter(
+            user_id=user_id, author_id__in=new_ids,
+        )
+        for follow in created:
+            post_save.send(
+                sender=Follow,
+                instance=follow,
+                created=True,
+                update_fields=None,
+                raw=False,
+                using=created.db,
+            )
+    return new_ids
+
+
+def unfollow_many(user_id, author_ids):
+    """Make the user stop following the authors, return removed count.
+
+    Rows are deleted in one statement, not filtered by the cached set
+    which may be stale. The post_delete signals of the rows actually
+    deleted keep counters, feeds and generations.
+    """
+    deleted, _ = Follow.objects.filter(
+        user_id=user_id, author_id__in=set(author_ids),
+    ).delete()
+    return deleted
+
+
+def invalidate_all():
+    """Mark every cached set stale after follows changed in bulk."""
+    feed_cache.bump_generation(GRAPH_SCOPE)
@@ -1,6 +1,9 @@
 """Define forms for posts app."""
 from django import forms
+from django.conf import settings
+from django.template.defaultfilters import filesizeformat
 
+from posts import uploads
 from posts.models import Post, Comment
 
 
@@ -13,6 +16,47 @@ class PostForm(forms.ModelForm):
         model = Post
         fields = ("text", "group", "image")
 
+    def __init__(self, *args, **kwargs):
+        """Put aside uploaded image over the size limit unread."""
+        super().__init__(*args, **kwargs)
+        upload = self.files.get("image")
+        self.image_too_large = bool(upload) and uploads.is_too_large(upload)
+        if self.image_too_large:
+            self.files = self.files.copy()
+            del self.files["image"]
+
+    def clean_image(self):
+        """Check image size and dimensions, then shrink and re-encode it."""
+        if self.image_too_large:
+            raise forms.ValidationError(
+                "Файл больше %(limit)s.",
+                code="file_too_large",
+                params={
+                    "limit": filesizeformat(
+                        settings.POST_IMAGE_MAX_UPLOAD_SIZE,
+                    ),
+                },
+            )
+        image = self.cleaned_data.get("image")
+        if not image:
+            self.instance.image_width = None
+            self.instance.image_height = None
+            return image
+        if not hasattr(image, "image"):
+            return image
+
+        width, height = image.image.size
+        if width * height > settings.POST_IMAGE_MAX_PIXELS:
+            raise forms.ValidationError(
+                "Изображение больше %(limit)s мегапикселей.",
+                code="image_too_large",
+                params={"limit": settings.POST_IMAGE_MAX_PIXELS // 10 ** 6},
+            )
+        image = uploads.normalize(image, image.image)
+        self.instance.image_width = getattr(image, "width", width)
+        self.instance.image_height = getattr(image, "height", height)
+        return image
+
 
 class CommentForm(forms.ModelForm):
     """Process commenting."""
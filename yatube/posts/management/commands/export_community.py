@@ -0,0 +1,29 @@
+"""Management command streaming community data to a JSONL file."""
+from django.core.management.base import BaseCommand
+
+from posts.community import export_community, open_stream
+
+
+class Command(BaseCommand):
+    """Export users, groups, posts, comments and follows."""
+
+    help = (
+        "Write users, groups, posts, comments and follows to a JSONL "
+        "file, gzip-compressed when its name ends with .gz, reading the "
+        "database in chunks."
+    )
+
+    def add_arguments(self, parser):
+        """Define file and chunk options."""
+        parser.add_argument("path")
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        """Export."""
+        with open_stream(options["path"], "w") as stream:
+            counts = export_community(
+                stream, options["batch_size"], self.stdout.write,
+            )
+        self.stdout.write(
+            f"Exported {sum(counts.values())} rows to {options['path']}.",
+        )
@@ -0,0 +1,39 @@
+"""Management command loading community data from a JSONL file."""
+from django.core.management.base import BaseCommand
+
+from posts.community import Importer, open_stream
+
+
+class Command(BaseCommand):
+    """Import rows written by export_community."""
+
+    help = (
+        "Read a JSONL file written by export_community in batches, add "
+        "its rows under new ids, merge users and groups by username and "
+        "slug, and rebuild counters, feeds and the search index. An "
+        "interrupted import continues from its checkpoint file."
+    )
+
+    def add_arguments(self, parser):
+        """Define file, batch and checkpoint options."""
+        parser.add_argument("path")
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--checkpoint",
+            help="State file of the import, PATH.checkpoint by default.",
+        )
+
+    def handle(self, *args, **options):
+        """Import."""
+        importer = Importer(
+            options["checkpoint"] or options["path"] + ".checkpoint",
+            options["batch_size"],
+            self.stdout.write,
+        )
+        if importer.resumed_from:
+            self.stdout.write(
+                f"Resuming after line {importer.resumed_from}.",
+            )
+        with open_stream(options["path"], "r") as stream:
+            counts = importer.run(stream)
+        self.stdout.write(f"Imported {sum(counts.values())} rows.")
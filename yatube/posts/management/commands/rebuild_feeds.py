@@ -0,0 +1,40 @@
+"""Management command rebuilding materialized follow feeds."""
+from django.core.management.base import BaseCommand
+
+from posts import feed
+from posts.models import FeedEntry, Follow
+
+
+class Command(BaseCommand):
+    """Backfill follow feeds from Follow table and trim them to depth."""
+
+    help = (
+        "Fill follow feeds of all readers from existing follows "
+        "and trim them to FOLLOW_FEED_DEPTH entries."
+    )
+
+    def add_arguments(self, parser):
+        """Define command options."""
+        parser.add_argument(
+            "--trim-only",
+            action="store_true",
+            help="Only drop entries beyond FOLLOW_FEED_DEPTH.",
+        )
+
+    def handle(self, *args, **options):
+        """Rebuild feeds."""
+        if options["trim_only"]:
+            readers = (
+                FeedEntry.objects.values_list("user_id", flat=True)
+                .distinct()
+                .iterator()
+            )
+            count = 0
+            for count, user_id in enumerate(readers, start=1):
+                feed.trim_feed(user_id)
+            self.stdout.write(f"Trimmed feeds of {count} readers.")
+            return
+        feed.rebuild_all_feeds()
+        self.stdout.write(
+            f"Rebuilt feeds of {Follow.objects.count()} follows.",
+        )
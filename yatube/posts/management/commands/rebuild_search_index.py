@@ -0,0 +1,18 @@
+"""Management command refilling full-text search index."""
+from django.core.management.base import BaseCommand
+
+from posts.search import rebuild_index
+
+
+class Command(BaseCommand):
+    """Reindex every post and comment."""
+
+    help = (
+        "Refill the full-text search index from posts and comments, "
+        "e.g. after bulk imports that bypass model signals."
+    )
+
+    def handle(self, *args, **options):
+        """Rebuild."""
+        rebuild_index()
+        self.stdout.write("Search index is rebuilt.")
@@ -0,0 +1,18 @@
+"""Management command repairing denormalized counters."""
+from django.core.management.base import BaseCommand
+
+from posts.counters import recount_all
+
+
+class Command(BaseCommand):
+    """Recompute post, comment and follow counters from scratch."""
+
+    help = (
+        "Recompute Group.post_count, Post.comment_count and UserStats "
+        "from the counted tables to repair drift."
+    )
+
+    def handle(self, *args, **options):
+        """Recount."""
+        recount_all()
+        self.stdout.write("Counters are recomputed.")
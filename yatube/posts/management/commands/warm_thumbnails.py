@@ -0,0 +1,42 @@
+"""Management command making thumbnails of existing post images."""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    """Generate missing thumbnails of every post image in parallel."""
+
+    help = (
+        "Make thumbnails of all post images in a pool of worker "
+        "processes, e.g. after a deploy with an empty key-value store."
+    )
+
+    def add_arguments(self, parser):
+        """Add pool size option."""
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=settings.THUMBNAIL_WORKERS,
+            help="Worker processes, 0 generates in this process.",
+        )
+
+    def handle(self, *args, **options):
+        """Warm."""
+        names = list(
+            Post.objects.exclude(image="")
+            .order_by()
+            .values_list("image", flat=True)
+            .distinct(),
+        )
+        workers = options["workers"]
+        if workers > 0:
+            with thumbnails.make_executor(workers) as executor:
+                done = len(list(executor.map(
+                    thumbnails.generate, names, chunksize=16,
+                )))
+        else:
+            done = len([thumbnails.generate(name) for name in names])
+        self.stdout.write(f"Thumbnails of {done} images are ready.")
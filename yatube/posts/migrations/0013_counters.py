@@ -0,0 +1,83 @@
+# Generated by Django 2.2.16 on 2026-10-17 11:38
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+# Users whose counters rows are added by one statement.
+BATCH_SIZE = 5000
+
+
+def count_of(model, field, outer='pk'):
+    rows = (
+        model.objects.filter(**{field: OuterRef(outer)})
+        .order_by()
+        .values(field)
+        .annotate(count=Count('pk'))
+        .values('count')
+    )
+    return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+
+def fill_counters(apps, schema_editor):
+    User = apps.get_model('auth', 'User')
+    Group = apps.get_model('posts', 'Group')
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    Follow = apps.get_model('posts', 'Follow')
+    UserStats = apps.get_model('posts', 'UserStats')
+
+    users = User.objects.order_by('pk').values_list('pk', flat=True)
+    last = 0
+    while True:
+        pks = list(users.filter(pk__gt=last)[:BATCH_SIZE])
+        if not pks:
+            break
+        UserStats.objects.bulk_create(
+            [UserStats(user_id=pk) for pk in pks], ignore_conflicts=True,
+        )
+        last = pks[-1]
+    Group.objects.update(post_count=count_of(Post, 'group'))
+    Post.objects.update(comment_count=count_of(Comment, 'post'))
+    UserStats.objects.update(
+        post_count=count_of(Post, 'author', 'user_id'),
+        follower_count=count_of(Follow, 'author', 'user_id'),
+        following_count=count_of(Follow, 'user', 'user_id'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0012_feedentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='User')),
+                ('post_count', models.PositiveIntegerField(default=0, verbose_name='Posts quantity')),
+                ('follower_count', models.PositiveIntegerField(default=0, verbose_name='Followers quantity')),
+                ('following_count', models.PositiveIntegerField(default=0, verbose_name='Following quantity')),
+            ],
+            options={
+                'verbose_name': 'User statistics',
+                'verbose_name_plural': 'Users statistics',
+            },
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='post_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Number of posts in the group, kept by signals', verbose_name='Posts quantity'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Number of comments to the post, kept by signals', verbose_name='Comments quantity'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
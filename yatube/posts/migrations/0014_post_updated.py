@@ -0,0 +1,20 @@
+# Generated by Django 2.2.16 on 2026-10-17 12:02
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='updated',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, help_text='Moment in time when post was changed last time', verbose_name='Update date'),
+            preserve_default=False,
+        ),
+    ]
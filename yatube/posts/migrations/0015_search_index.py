@@ -0,0 +1,59 @@
+# Generated by Django 2.2.16 on 2026-10-17 12:40
+
+from django.conf import settings
+from django.db import migrations
+
+# Statements are copied here rather than imported from posts.search, so
+# the migration keeps working whatever the module turns into later.
+SQLITE_CREATE = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS posts_search USING fts5("
+    "body, kind UNINDEXED, object_id UNINDEXED, post_id UNINDEXED, "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "INSERT INTO posts_search (rowid, body, kind, object_id, post_id) "
+    "SELECT id * 2, text, 'post', id, id FROM posts_post",
+    "INSERT INTO posts_search (rowid, body, kind, object_id, post_id) "
+    "SELECT id * 2 + 1, text, 'comment', id, post_id FROM posts_comment",
+]
+POSTGRES_CREATE = [
+    "CREATE TABLE IF NOT EXISTS posts_search ("
+    "id bigint PRIMARY KEY, kind varchar(16) NOT NULL, "
+    "object_id integer NOT NULL, post_id integer NOT NULL, "
+    "body text NOT NULL, document tsvector NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS posts_search_document_idx "
+    "ON posts_search USING GIN (document)",
+    "INSERT INTO posts_search (id, kind, object_id, post_id, body, "
+    "document) SELECT id * 2, 'post', id, id, text, "
+    "to_tsvector(%(config)s::regconfig, text) FROM posts_post",
+    "INSERT INTO posts_search (id, kind, object_id, post_id, body, "
+    "document) SELECT id * 2 + 1, 'comment', id, post_id, text, "
+    "to_tsvector(%(config)s::regconfig, text) FROM posts_comment",
+]
+CREATE = {"sqlite": SQLITE_CREATE, "postgresql": POSTGRES_CREATE}
+
+
+def create_search_index(apps, schema_editor):
+    params = {"config": settings.SEARCH_POSTGRES_CONFIG}
+    statements = CREATE.get(schema_editor.connection.vendor, [])
+    with schema_editor.connection.cursor() as cursor:
+        for statement in statements:
+            if "%(config)s" in statement:
+                cursor.execute(statement, params)
+            else:
+                cursor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in CREATE:
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute("DROP TABLE IF EXISTS posts_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_post_updated'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
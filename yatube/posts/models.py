@@ -1,5 +1,5 @@
 """Models definition for posts app."""
-from django.db import models
+from django.db import models, router, transaction
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -19,13 +19,68 @@ class Group(models.Model):
         unique=True,
     )
     description = models.TextField()
+    post_count = models.PositiveIntegerField(
+        verbose_name="Posts quantity",
+        help_text="Number of posts in the group, kept by signals",
+        default=0,
+        editable=False,
+    )
 
     def __str__(self):
         """Show title of group."""
         return self.title
 
 
-class Post(models.Model):
+# Columns of joined author and group post cards never show.
+CARD_DEFERRED_FIELDS = (
+    "author__password",
+    "author__last_login",
+    "author__is_superuser",
+    "author__email",
+    "author__is_staff",
+    "author__is_active",
+    "author__date_joined",
+    "group__description",
+)
+
+
+class CountedModel(models.Model):
+    """Abstract model whose rows are counted in rows of other models.
+
+    Signal handlers of post_save shift the counters, so the save runs in
+    one transaction with them and a failed counter update undoes it.
+    Deletions need nothing: the collector sends post_delete inside its
+    own transaction.
+    """
+
+    class Meta:
+        """Used to make CountedModel abstract."""
+
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        """Save the row and shift counters in one transaction."""
+        using = kwargs.get("using") or router.db_for_write(
+            type(self), instance=self,
+        )
+        with transaction.atomic(using=using, savepoint=False):
+            super().save(*args, **kwargs)
+
+
+class PostQuerySet(models.QuerySet):
+    """Queryset of Post model with shortcuts for post lists."""
+
+    def for_feed(self):
+        """Prepare posts for rendering as cards of a feed page.
+
+        Join author and group and skip columns cards never show.
+        """
+        return self.select_related("author", "group").defer(
+            *CARD_DEFERRED_FIELDS,
+        )
+
+
+class Post(CountedModel):
     """Model Post is used to store posts linked to authors and groups."""
 
     text = models.TextField(
@@ -38,11 +93,17 @@ class Post(models.Model):
         auto_now_add=True,
         db_index=True,
     )
+    updated = models.DateTimeField(
+        verbose_name="Update date",
+        help_text="Moment in time when post was changed last time",
+        auto_now=True,
+    )
     author = models.ForeignKey(
         User,
         verbose_name="Author",
         related_name="posts",
         on_delete=models.CASCADE,
+        db_index=False,
     )
     group = models.ForeignKey(
         Group,
@@ -52,6 +113,7 @@ class Post(models.Model):
         null=True,
         on_delete=models.SET_NULL,
         related_name="posts",
+        db_index=False,
     )
     image = models.ImageField(
         verbose_name="Image",
@@ -59,6 +121,26 @@ class Post(models.Model):
         upload_to="posts/",
         blank=True,
     )
+    image_width = models.PositiveIntegerField(
+        verbose_name="Image width",
+        help_text="Width of the stored image in pixels",
+        null=True,
+        editable=False,
+    )
+    image_height = models.PositiveIntegerField(
+        verbose_name="Image height",
+        help_text="Height of the stored image in pixels",
+        null=True,
+        editable=False,
+    )
+    comment_count = models.PositiveIntegerField(
+        verbose_name="Comments quantity",
+        help_text="Number of comments to the post, kept by signals",
+        default=0,
+        editable=False,
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         """Used to change the behavior of Post model fields."""
@@ -66,13 +148,23 @@ class Post(models.Model):
         ordering = ("-pub_date",)
         verbose_name = "Post"
         verbose_name_plural = "Posts"
+        indexes = (
+            models.Index(
+                fields=("group", "-pub_date"),
+                name="post_group_pub_date_idx",
+            ),
+            models.Index(
+                fields=("author", "-pub_date"),
+                name="post_author_pub_date_idx",
+            ),
+        )
 
     def __str__(self):
         """Show truncated title of post."""
         return self.text[:15]
 
 
-class Comment(models.Model):
+class Comment(CountedModel):
     """Model Comment is used to store comments.
 
     Linked to authors and posts.
@@ -93,6 +185,7 @@ class Comment(models.Model):
         help_text="Post to which comment is related to",
         on_delete=models.CASCADE,
         related_name="comments",
+        db_index=False,
     )
     author = models.ForeignKey(
         User,
@@ -108,6 +201,12 @@ class Comment(models.Model):
         ordering = ("-created",)
         verbose_name = "Comment"
         verbose_name_plural = "Comments"
+        indexes = (
+            models.Index(
+                fields=("post", "-created"),
+                name="comment_post_created_idx",
+            ),
+        )
 
     def __str__(self):
         """Show truncated title of comment."""
@@ -115,7 +214,7 @@ class Comment(models.Model):
                 f"{self.created.strftime('%d.%m.%y_%M:%H')}")
 
 
-class Follow(models.Model):
+class Follow(CountedModel):
     """Model Follow is used to store comments.
 
     Linked to authors and followers.
@@ -134,6 +233,7 @@ class Follow(models.Model):
         help_text="Author who is followed by follower",
         on_delete=models.CASCADE,
         related_name="following",
+        db_index=False,
     )
 
     class Meta:
@@ -148,7 +248,116 @@ class Follow(models.Model):
                 name='Unique_follow',
             ),
         )
+        indexes = (
+            models.Index(
+                fields=("author", "user"),
+                name="follow_author_user_idx",
+            ),
+        )
 
     def __str__(self):
         """Show follower - following chain."""
         return f"{self.user} follows {self.author}"
+
+
+class FeedEntry(models.Model):
+    """Model FeedEntry is used to store materialized follow feeds.
+
+    One row per post delivered to a follower of its author.
+    """
+
+    user = models.ForeignKey(
+        User,
+        verbose_name="Reader",
+        help_text="Follower whose feed contains the post",
+        on_delete=models.CASCADE,
+        related_name="feed_entries",
+    )
+    post = models.ForeignKey(
+        Post,
+        verbose_name="Post",
+        help_text="Post delivered to the feed",
+        on_delete=models.CASCADE,
+        related_name="feed_entries",
+    )
+    author = models.ForeignKey(
+        User,
+        verbose_name="Author",
+        help_text="Copy of post author used to purge unfollowed authors",
+        on_delete=models.CASCADE,
+        related_name="+",
+    )
+    pub_date = models.DateTimeField(
+        verbose_name="Publication date",
+        help_text="Copy of post publication date used to order the feed",
+    )
+
+    class Meta:
+        """Used to change the behavior of FeedEntry model fields."""
+
+        ordering = ("-pub_date",)
+        verbose_name = "Feed entry"
+        verbose_name_plural = "Feed entries"
+        constraints = (
+            models.UniqueConstraint(
+                fields=("user", "post"),
+                name="Unique_feed_entry",
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=("user", "-pub_date", "-post"),
+                name="feed_user_pub_date_post_idx",
+            ),
+            models.Index(
+                fields=("user", "author"),
+                name="feed_user_author_idx",
+            ),
+        )
+
+    def __str__(self):
+        """Show reader - post chain."""
+        return f"{self.post} for {self.user}"
+
+
+class UserStats(models.Model):
+    """Model UserStats is used to store counters of a user.
+
+    Kept by signals of Post and Follow models.
+    """
+
+    user = models.OneToOneField(
+        User,
+        verbose_name="User",
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="stats",
+    )
+    post_count = models.PositiveIntegerField(
+        verbose_name="Posts quantity",
+        default=0,
+    )
+    follower_count = models.PositiveIntegerField(
+        verbose_name="Followers quantity",
+        default=0,
+    )
+    following_count = models.PositiveIntegerField(
+        verbose_name="Following quantity",
+        default=0,
+    )
+
+    class Meta:
+        """Used to change the behavior of UserStats model fields."""
+
+        verbose_name = "User statistics"
+        verbose_name_plural = "Users statistics"
+        indexes = (
+            models.Index(
+                fields=("follower_count",),
+                name="stats_follower_count_idx",
+            ),
+        )
+
+    def __str__(self):
+        """Show owner of counters."""
+        return f"Statistics of {self.user}"
@@ -0,0 +1,356 @@
+"""Cursor (keyset) and windowed pagination for posts app.
+
+Keyset pages are addressed by the key values of their boundary rows
+instead of an OFFSET, so the database seeks straight to the page through
+an index and a deep page costs as much as the first one.
+
+Windowed pages keep page numbers but never COUNT(*) the queryset: the
+total comes from a maintained counter or an estimate, or stays unknown,
+and templates link only a few pages around the current one.
+"""
+import base64
+import binascii
+import copy
+import json
+import math
+from collections.abc import Sequence
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import (
+    EmptyPage,
+    Page,
+    PageNotAnInteger,
+    Paginator,
+)
+from django.db import connections, router
+from django.db.models import Q
+
+COUNT_KEY = "table_count:{table}"
+
+
+class InvalidCursor(Exception):
+    """Raised when a cursor token can not be decoded."""
+
+
+def encode_cursor(values, backwards=False):
+    """Pack key values of a boundary row into an opaque url-safe token."""
+    payload = [
+        value.isoformat() if hasattr(value, "isoformat") else value
+        for value in values
+    ]
+    raw = json.dumps([payload, int(backwards)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    """Unpack token made by encode_cursor into raw values and direction."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values, backwards = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError, binascii.Error) as error:
+        raise InvalidCursor(token) from error
+    if not isinstance(values, list):
+        raise InvalidCursor(token)
+    return values, bool(backwards)
+
+
+class KeysetPaginator:
+    """Paginate queryset in descending order of the given key fields.
+
+    Keys have to identify a row uniquely, so the last one is usually the
+    primary key, e.g. ("pub_date", "pk").
+    """
+
+    cursor_param = "cursor"
+    page_range = ()
+    num_pages = None
+
+    def __init__(self, object_list, per_page, keys=("pub_date", "pk")):
+        """Store queryset, page size and ordering keys."""
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.keys = tuple(keys)
+        opts = object_list.model._meta
+        self.fields = [
+            opts.pk if key == "pk" else opts.get_field(key)
+            for key in self.keys
+        ]
+
+    def row_values(self, obj):
+        """Return key values of the given row."""
+        return [getattr(obj, field.attname) for field in self.fields]
+
+    def parse_cursor(self, token):
+        """Convert cursor token into typed key values and direction."""
+        values, backwards = decode_cursor(token)
+        if len(values) != len(self.fields):
+            raise InvalidCursor(token)
+        try:
+            values = [
+                field.to_python(value)
+                for field, value in zip(self.fields, values)
+            ]
+        except ValidationError as error:
+            raise InvalidCursor(token) from error
+        if any(value is None for value in values):
+            raise InvalidCursor(token)
+        return values, backwards
+
+    def seek_filter(self, values, backwards):
+        """Build condition selecting rows strictly after boundary values."""
+        lookup = "gt" if backwards else "lt"
+        condition = Q()
+        for position, key in enumerate(self.keys):
+            prefix = dict(zip(self.keys[:position], values[:position]))
+            prefix[f"{key}__{lookup}"] = values[position]
+            condition |= Q(**prefix)
+        return condition
+
+    def fetch(self, values, backwards):
+        """Return up to per_page + 1 rows past the boundary in page order.
+
+        Lists that are not querysets page themselves through their
+        seek(values, backwards, limit) method.
+        """
+        seek = getattr(self.object_list, "seek", None)
+        if seek is not None:
+            return seek(values, backwards, self.per_page + 1)
+        ordering = [
+            key if backwards else f"-{key}" for key in self.keys
+        ]
+        queryset = self.object_list.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self.seek_filter(values, backwards))
+        return list(queryset[:self.per_page + 1])
+
+    def get_page(self, token=None):
+        """Return a page for the given cursor.
+
+        Missing or malformed cursor gives the first page, the same way
+        Paginator.get_page tolerates wrong page numbers.
+        """
+        values, backwards = None, False
+        if token:
+            try:
+                values, backwards = self.parse_cursor(token)
+            except InvalidCursor:
+                values, backwards = None, False
+
+        rows = self.fetch(values, backwards)
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if backwards:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, values is not None
+        return KeysetPage(rows, self, has_next, has_previous)
+
+
+class KeysetPage(Sequence):
+    """Page of KeysetPaginator.
+
+    Mirrors the part of django Page interface used by templates, with
+    cursors in place of page numbers.
+    """
+
+    number = None
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        """Store rows of the page and neighbour page flags."""
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        """Show page size."""
+        return f"<Keyset page of {len(self.object_list)} objects>"
+
+    def __len__(self):
+        """Count objects on the page."""
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        """Get object by index."""
+        return self.object_list[index]
+
+    def has_next(self):
+        """Check if there are older rows."""
+        return self._has_next
+
+    def has_previous(self):
+        """Check if there are newer rows."""
+        return self._has_previous
+
+    def has_other_pages(self):
+        """Check if page navigation is needed."""
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        """Token of the following page."""
+        if not self._has_next or not self.object_list:
+            return None
+        return encode_cursor(self.paginator.row_values(self.object_list[-1]))
+
+    @property
+    def previous_cursor(self):
+        """Token of the preceding page."""
+        if not self._has_previous or not self.object_list:
+            return None
+        return encode_cursor(
+            self.paginator.row_values(self.object_list[0]), backwards=True,
+        )
+
+
+def table_count(model):
+    """Return number of rows of the model table, estimated or cached.
+
+    PostgreSQL answers from planner statistics kept by ANALYZE; other
+    databases count once per PAGINATOR_COUNT_TIMEOUT.
+    """
+    connection = connections[router.db_for_read(model)]
+    table = model._meta.db_table
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples FROM pg_class WHERE oid = %s::regclass",
+                [connection.ops.quote_name(table)],
+            )
+            row = cursor.fetchone()
+        # Tables never analyzed have no estimate.
+        if row is not None and row[0] > 0:
+            return int(row[0])
+    return cache.get_or_set(
+        COUNT_KEY.format(table=table),
+        model._default_manager.count,
+        settings.PAGINATOR_COUNT_TIMEOUT,
+    )
+
+
+class WindowedPaginator(Paginator):
+    """Paginator taking the total from the caller instead of counting.
+
+    Count may be an estimate or None when it is unknown. Every page
+    fetches one row more than it shows, so whether the following page
+    exists is known whatever the count says, and a page without one is
+    known to be the last. Pages are plain django pages carrying
+    page_window and last_page_number for the paginator template.
+    """
+
+    def __init__(self, object_list, per_page, count=None):
+        """Store queryset, page size and known or estimated total."""
+        super().__init__(object_list, per_page)
+        self.count = count
+        self.reached = 1
+        self.end_seen = False
+
+    @property
+    def num_pages(self):
+        """Return number of pages by the count and the fetched pages."""
+        if self.end_seen or self.count is None:
+            return self.reached
+        return max(math.ceil(self.count / self.per_page), self.reached)
+
+    @property
+    def page_range(self):
+        """Return no pages, templates link page_window of the page."""
+        return ()
+
+    def validate_number(self, number):
+        """Check that number is a positive integer."""
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger("That page number is not an integer")
+        if number < 1:
+            raise EmptyPage("That page number is less than 1")
+        return number
+
+    def page(self, number):
+        """Return page with the given number."""
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage("That page contains no results")
+        has_next = len(rows) > self.per_page
+        self.reached = number + has_next
+        self.end_seen = not has_next
+        page = Page(rows[:self.per_page], number, self)
+        self.add_window(page)
+        return page
+
+    def get_page(self, number):
+        """Return a page, falling back to the last or the first one."""
+        try:
+            return self.page(number)
+        except PageNotAnInteger:
+            return self.page(1)
+        except EmptyPage:
+            pass
+        last = self.num_pages
+        if 1 < last < int(number):
+            try:
+                return self.page(last)
+            except EmptyPage:
+                pass
+        return self.page(1)
+
+    def add_window(self, page):
+        """Attach numbers of pages to link to the page.
+
+        page_window lists the first page, PAGINATOR_WINDOW pages on both
+        sides of the current one and the last page when it is known,
+        with None where pages are skipped.
+        """
+        window = settings.PAGINATOR_WINDOW
+        number = page.number
+        last = self.num_pages
+        last_known = self.end_seen or self.count is not None
+        high = min(number + window, last) if last_known else last
+        numbers = [1] + list(range(max(number - window, 2), high + 1))
+        if last_known and last > high:
+            numbers.append(last)
+        page.page_window = []
+        for item in numbers:
+            if page.page_window and item > page.page_window[-1] + 1:
+                page.page_window.append(None)
+            page.page_window.append(item)
+        page.last_page_number = (
+            last if last_known and last > number else None
+        )
+
+
+def freeze_page(page):
+    """Return copy of the page detached from its queryset.
+
+    Pickling a paginator would evaluate the whole queryset, so the copy
+    keeps only rows of the page and the numbers templates use.
+    """
+    if isinstance(page, KeysetPage):
+        paginator = copy.copy(page.paginator)
+        paginator.object_list = None
+        return KeysetPage(
+            list(page.object_list),
+            paginator,
+            page.has_next(),
+            page.has_previous(),
+        )
+    source = page.paginator
+    if isinstance(source, WindowedPaginator):
+        paginator = copy.copy(source)
+        paginator.object_list = None
+        frozen = Page(list(page.object_list), page.number, paginator)
+        frozen.page_window = page.page_window
+        frozen.last_page_number = page.last_page_number
+        return frozen
+    paginator = Paginator(
+        [], source.per_page, source.orphans, source.allow_empty_first_page,
+    )
+    paginator.count = source.count
+    return Page(list(page.object_list), page.number, paginator)
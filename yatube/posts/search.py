@@ -0,0 +1,334 @@
+"""Full-text search over posts and comments.
+
+Texts are kept in an inverted index next to the posts tables: an FTS5
+virtual table on SQLite or a table with a GIN-indexed tsvector column on
+PostgreSQL. Signal handlers keep it in step with Post and Comment rows.
+Every document has id object_id * 2 + kind code, so updating or deleting
+one is a primary key lookup.
+
+Results are ordered by relevance and paged with a cursor made of the
+rank and the id of the last result.
+"""
+import math
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from posts.pagination import InvalidCursor, decode_cursor, encode_cursor
+
+TABLE = "posts_search"
+KINDS = {"post": 0, "comment": 1}
+MARK_START = "\x02"
+MARK_END = "\x03"
+
+
+def document_id(kind, object_id):
+    """Return id of the document of the given object."""
+    return object_id * len(KINDS) + KINDS[kind]
+
+
+def highlight(snippet):
+    """Escape snippet text and turn match markers into <mark> tags."""
+    return mark_safe(
+        escape(snippet)
+        .replace(MARK_START, "<mark>")
+        .replace(MARK_END, "</mark>"),
+    )
+
+
+class SQLiteBackend:
+    """Search index stored in SQLite FTS5 virtual table."""
+
+    def create(self, cursor):
+        """Create index table."""
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5("
+            "body, kind UNINDEXED, object_id UNINDEXED, post_id UNINDEXED, "
+            "tokenize='unicode61 remove_diacritics 2')",
+        )
+
+    def drop(self, cursor):
+        """Drop index table."""
+        cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+
+    def rebuild(self, cursor):
+        """Fill index from posts and comments tables."""
+        cursor.execute(f"DELETE FROM {TABLE}")
+        cursor.execute(
+            f"INSERT INTO {TABLE} (rowid, body, kind, object_id, post_id) "
+            "SELECT id * %s + %s, text, 'post', id, id FROM posts_post",
+            [len(KINDS), KINDS["post"]],
+        )
+        cursor.execute(
+            f"INSERT INTO {TABLE} (rowid, body, kind, object_id, post_id) "
+            "SELECT id * %s + %s, text, 'comment', id, post_id "
+            "FROM posts_comment",
+            [len(KINDS), KINDS["comment"]],
+        )
+
+    def save(self, cursor, kind, object_id, post_id, body):
+        """Put document into index replacing its previous version."""
+        doc_id = document_id(kind, object_id)
+        cursor.execute(f"DELETE FROM {TABLE} WHERE rowid = %s", [doc_id])
+        cursor.execute(
+            f"INSERT INTO {TABLE} (rowid, body, kind, object_id, post_id) "
+            "VALUES (%s, %s, %s, %s, %s)",
+            [doc_id, body, kind, object_id, post_id],
+        )
+
+    def delete(self, cursor, kind, object_id):
+        """Remove document from index."""
+        cursor.execute(
+            f"DELETE FROM {TABLE} WHERE rowid = %s",
+            [document_id(kind, object_id)],
+        )
+
+    def match_expression(self, query):
+        """Turn user query into FTS5 expression matching all its words."""
+        words = re.findall(r"\w+", query)
+        return " ".join('"{}"'.format(word) for word in words)
+
+    def search(self, cursor, query, kind, after, limit):
+        """Return (rank, id, kind, object_id, post_id, snippet) rows."""
+        expression = self.match_expression(query)
+        if not expression:
+            return []
+        sql = [
+            f"SELECT bm25({TABLE}) AS score, rowid, kind, object_id, "
+            f"post_id, snippet({TABLE}, 0, %s, %s, '…', 16) "
+            f"FROM {TABLE} WHERE {TABLE} MATCH %s",
+        ]
+        params = [MARK_START, MARK_END, expression]
+        if kind:
+            sql.append("AND kind = %s")
+            params.append(kind)
+        if after:
+            sql.append(f"AND (bm25({TABLE}), rowid) > (%s, %s)")
+            params.extend(after)
+        sql.append("ORDER BY score, rowid LIMIT %s")
+        params.append(limit)
+        cursor.execute(" ".join(sql), params)
+        return cursor.fetchall()
+
+
+class PostgresBackend:
+    """Search index stored in a table with GIN-indexed tsvector column."""
+
+    def create(self, cursor):
+        """Create index table."""
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {TABLE} ("
+            "id bigint PRIMARY KEY, kind varchar(16) NOT NULL, "
+            "object_id integer NOT NULL, post_id integer NOT NULL, "
+            "body text NOT NULL, document tsvector NOT NULL)",
+        )
+        cursor.execute(
+            f"CREATE INDEX IF NOT EXISTS {TABLE}_document_idx "
+            f"ON {TABLE} USING GIN (document)",
+        )
+
+    def drop(self, cursor):
+        """Drop index table."""
+        cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+
+    def rebuild(self, cursor):
+        """Fill index from posts and comments tables."""
+        config = settings.SEARCH_POSTGRES_CONFIG
+        cursor.execute(f"TRUNCATE {TABLE}")
+        cursor.execute(
+            f"INSERT INTO {TABLE} (id, kind, object_id, post_id, body, "
+            "document) SELECT id * %s + %s, 'post', id, id, text, "
+            "to_tsvector(%s::regconfig, text) FROM posts_post",
+            [len(KINDS), KINDS["post"], config],
+        )
+        cursor.execute(
+            f"INSERT INTO {TABLE} (id, kind, object_id, post_id, body, "
+            "document) SELECT id * %s + %s, 'comment', id, post_id, text, "
+            "to_tsvector(%s::regconfig, text) FROM posts_comment",
+            [len(KINDS), KINDS["comment"], config],
+        )
+
+    def save(self, cursor, kind, object_id, post_id, body):
+        """Put document into index replacing its previous version."""
+        cursor.execute(
+            f"INSERT INTO {TABLE} (id, kind, object_id, post_id, body, "
+            "document) VALUES (%s, %s, %s, %s, %s, "
+            "to_tsvector(%s::regconfig, %s)) ON CONFLICT (id) DO UPDATE "
+            "SET body = EXCLUDED.body, document = EXCLUDED.document",
+            [
+                document_id(kind, object_id), kind, object_id, post_id,
+                body, settings.SEARCH_POSTGRES_CONFIG, body,
+            ],
+        )
+
+    def delete(self, cursor, kind, object_id):
+        """Remove document from index."""
+        cursor.execute(
+            f"DELETE FROM {TABLE} WHERE id = %s",
+            [document_id(kind, object_id)],
+        )
+
+    def search(self, cursor, query, kind, after, limit):
+        """Return (rank, id, kind, object_id, post_id, snippet) rows."""
+        if not re.search(r"\w", query):
+            return []
+        config = settings.SEARCH_POSTGRES_CONFIG
+        sql = [
+            "SELECT -ts_rank_cd(document, query) AS score, id, kind, "
+            "object_id, post_id, ts_headline(%s::regconfig, body, query, "
+            "%s) FROM "
+            f"{TABLE}, plainto_tsquery(%s::regconfig, %s) query "
+            "WHERE document @@ query",
+        ]
+        params = [
+            config,
+            f"StartSel={MARK_START}, StopSel={MARK_END}, MaxWords=32",
+            config,
+            query,
+        ]
+        if kind:
+            sql.append("AND kind = %s")
+            params.append(kind)
+        if after:
+            sql.append(
+                "AND (-ts_rank_cd(document, query), id) > (%s, %s)",
+            )
+            params.extend(after)
+        sql.append("ORDER BY score, id LIMIT %s")
+        params.append(limit)
+        cursor.execute(" ".join(sql), params)
+        return cursor.fetchall()
+
+
+BACKENDS = {
+    "sqlite": SQLiteBackend,
+    "postgresql": PostgresBackend,
+}
+
+
+def get_backend(db_connection=None):
+    """Return index backend of the database or None if not supported."""
+    backend = BACKENDS.get((db_connection or connection).vendor)
+    return backend() if backend else None
+
+
+def create_index(db_connection):
+    """Create and fill search index of the given database."""
+    backend = get_backend(db_connection)
+    if backend is not None:
+        with db_connection.cursor() as cursor:
+            backend.create(cursor)
+            backend.rebuild(cursor)
+
+
+def drop_index(db_connection):
+    """Drop search index of the given database."""
+    backend = get_backend(db_connection)
+    if backend is not None:
+        with db_connection.cursor() as cursor:
+            backend.drop(cursor)
+
+
+def rebuild_index():
+    """Refill search index from posts and comments."""
+    backend = get_backend()
+    if backend is not None:
+        with connection.cursor() as cursor:
+            backend.rebuild(cursor)
+
+
+def index_object(kind, object_id, post_id, body):
+    """Put post or comment text into search index."""
+    backend = get_backend()
+    if backend is not None:
+        with connection.cursor() as cursor:
+            backend.save(cursor, kind, object_id, post_id, body)
+
+
+def unindex_object(kind, object_id):
+    """Remove post or comment from search index."""
+    backend = get_backend()
+    if backend is not None:
+        with connection.cursor() as cursor:
+            backend.delete(cursor, kind, object_id)
+
+
+class SearchHit:
+    """One found post or comment."""
+
+    def __init__(self, kind, object_id, post_id, snippet):
+        """Store found document."""
+        self.kind = kind
+        self.object_id = object_id
+        self.post_id = post_id
+        self.snippet = highlight(snippet)
+        self.post = None
+
+
+class SearchResults:
+    """Page of search results with the cursor of the next page."""
+
+    cursor_param = "cursor"
+
+    def __init__(self, hits, next_cursor):
+        """Store hits and next page cursor."""
+        self.hits = hits
+        self.next_cursor = next_cursor
+
+    def __iter__(self):
+        """Iterate over hits."""
+        return iter(self.hits)
+
+    def __len__(self):
+        """Count hits on the page."""
+        return len(self.hits)
+
+    def has_next(self):
+        """Check if there are less relevant results."""
+        return self.next_cursor is not None
+
+
+def parse_cursor(token):
+    """Return rank and id of the result the cursor points to, or None.
+
+    Anything but a finite rank and an integer id, e.g. a token made up
+    by a client, is ignored and gives the first page.
+    """
+    try:
+        values, _ = decode_cursor(token)
+    except InvalidCursor:
+        return None
+    if len(values) != 2:
+        return None
+    rank, doc_id = values
+    if isinstance(rank, bool) or not isinstance(rank, (int, float)):
+        return None
+    if not math.isfinite(rank):
+        return None
+    if isinstance(doc_id, bool) or not isinstance(doc_id, int):
+        return None
+    return [rank, doc_id]
+
+
+def search(query, kind=None, cursor=None, limit=10):
+    """Find posts and comments matching query, best matches first."""
+    backend = get_backend()
+    after = parse_cursor(cursor) if cursor else None
+    if backend is None:
+        return SearchResults([], None)
+    with connection.cursor() as db_cursor:
+        rows = backend.search(db_cursor, query, kind, after, limit + 1)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][:2])
+    hits = [SearchHit(*row[2:]) for row in rows]
+    return SearchResults(hits, next_cursor)
+
+
+def matching_ids(query, kind, limit):
+    """Return ids of objects of the kind matching query."""
+    return [hit.object_id for hit in search(query, kind, limit=limit)]
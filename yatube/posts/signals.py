@@ -0,0 +1,197 @@
+"""Signal handlers of posts app."""
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from posts import cards, feed, feed_cache, search, tasks, thumbnails
+from posts.counters import change_counters
+from posts.models import Comment, Follow, Group, Post, UserStats
+
+User = get_user_model()
+CARD_USER_FIELDS = {"username", "first_name", "last_name"}
+
+
+@receiver(post_save, sender=User)
+def create_user_stats(sender, instance, created, **kwargs):
+    """Create counters row for a new user."""
+    if created:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_group(sender, instance, **kwargs):
+    """Keep group of edited post to move it between group counters."""
+    if instance.pk is not None:
+        instance._previous_group_id = (
+            Post.objects.filter(pk=instance.pk)
+            .values_list("group_id", flat=True)
+            .first()
+        )
+
+
+@receiver(post_save, sender=Post)
+def count_saved_post(sender, instance, created, **kwargs):
+    """Count new post or move edited one to another group."""
+    if created:
+        change_counters((
+            (UserStats, instance.author_id, "post_count", 1),
+            (Group, instance.group_id, "post_count", 1),
+        ))
+        return
+    previous_group_id = getattr(instance, "_previous_group_id", None)
+    if previous_group_id != instance.group_id:
+        change_counters((
+            (Group, previous_group_id, "post_count", -1),
+            (Group, instance.group_id, "post_count", 1),
+        ))
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    """Uncount deleted post."""
+    change_counters((
+        (UserStats, instance.author_id, "post_count", -1),
+        (Group, instance.group_id, "post_count", -1),
+    ))
+
+
+@receiver(post_save, sender=Comment)
+def count_new_comment(sender, instance, created, **kwargs):
+    """Count new comment of the post."""
+    if created:
+        change_counters(((Post, instance.post_id, "comment_count", 1),))
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    """Uncount deleted comment of the post."""
+    change_counters(((Post, instance.post_id, "comment_count", -1),))
+
+
+@receiver(post_save, sender=Follow)
+def count_new_follow(sender, instance, created, **kwargs):
+    """Count new follower and following."""
+    if created:
+        change_counters((
+            (UserStats, instance.author_id, "follower_count", 1),
+            (UserStats, instance.user_id, "following_count", 1),
+        ))
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    """Uncount removed follower and following."""
+    change_counters((
+        (UserStats, instance.author_id, "follower_count", -1),
+        (UserStats, instance.user_id, "following_count", -1),
+    ))
+
+
+@receiver(post_save, sender=Post)
+def deliver_new_post(sender, instance, created, **kwargs):
+    """Fan new post out to followers of its author in background."""
+    if created:
+        tasks.fan_out_post.delay(instance.pk, key=f"fan_out:{instance.pk}")
+
+
+@receiver(post_save, sender=Follow)
+def backfill_followed_author(sender, instance, created, **kwargs):
+    """Fill reader's feed with posts of followed author in background."""
+    if created:
+        tasks.backfill_feed.delay(
+            instance.user_id,
+            instance.author_id,
+            key=f"backfill:{instance.pk}",
+        )
+
+
+@receiver(post_delete, sender=Follow)
+def purge_unfollowed_author(sender, instance, **kwargs):
+    """Remove posts of unfollowed author from reader's feed."""
+    feed.purge_feed(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_author_cards(sender, instance, **kwargs):
+    """Drop cached cards of posts of changed author.
+
+    Saves touching only fields cards do not show, e.g. last_login on
+    every login, keep the cards.
+    """
+    update_fields = kwargs.get("update_fields")
+    if update_fields and not CARD_USER_FIELDS.intersection(update_fields):
+        return
+    cards.bump_version("user", instance.pk)
+    feed_cache.bump_generation("posts")
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group_cards(sender, instance, **kwargs):
+    """Drop cached cards of posts of changed group."""
+    cards.bump_version("group", instance.pk)
+    feed_cache.bump_generation("posts")
+
+
+@receiver(post_delete, sender=Post)
+def invalidate_deleted_post_card(sender, instance, **kwargs):
+    """Drop cached card of deleted post."""
+    cards.delete_card(instance)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_feed_pages(sender, instance, **kwargs):
+    """Mark cached feed pages stale after any change of posts."""
+    feed_cache.bump_generation("posts")
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_pages(sender, instance, **kwargs):
+    """Mark cached responses showing comments of posts stale."""
+    feed_cache.bump_generation("comments")
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow_pages(sender, instance, **kwargs):
+    """Mark follow feed and follow sets of both users stale."""
+    feed_cache.bump_generation(f"follow:{instance.user_id}")
+    feed_cache.bump_generation(f"followers:{instance.author_id}")
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, **kwargs):
+    """Put text of saved post into search index."""
+    search.index_object("post", instance.pk, instance.pk, instance.text)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    """Remove deleted post from search index."""
+    search.unindex_object("post", instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+def index_comment(sender, instance, **kwargs):
+    """Put text of saved comment into search index."""
+    search.index_object(
+        "comment", instance.pk, instance.post_id, instance.text,
+    )
+
+
+@receiver(post_delete, sender=Comment)
+def unindex_comment(sender, instance, **kwargs):
+    """Remove deleted comment from search index."""
+    search.unindex_object("comment", instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def make_post_thumbnails(sender, instance, update_fields=None, **kwargs):
+    """Schedule thumbnails of newly saved post image."""
+    if update_fields is not None and "image" not in update_fields:
+        return
+    if instance.image:
+        thumbnails.schedule(instance.image.name)
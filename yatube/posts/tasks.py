@@ -0,0 +1,34 @@
+"""Background tasks of posts app.
+
+Feeds change when a task finishes, after the request that queued it
+bumped its generations, so tasks bump them again for validators of the
+follow feed not to keep answering 304 with the feed before the task.
+"""
+from core.tasks import task
+from posts import feed, feed_cache, follow_graph
+from posts.models import Post
+
+
+@task()
+def fan_out_post(post_id):
+    """Deliver new post to feeds of followers of its author.
+
+    The "posts" generation is bumped once rather than follow:{pk} of
+    every follower, which would also drop their cached follow sets.
+    """
+    post = Post.objects.filter(pk=post_id).first()
+    if post is not None:
+        feed.fan_out_post(post)
+        feed_cache.bump_generation("posts")
+
+
+@task()
+def backfill_feed(user_id, author_id):
+    """Copy posts of followed author into reader's feed.
+
+    Nothing is copied when the reader unfollowed the author before the
+    task ran.
+    """
+    if follow_graph.follows(user_id, author_id):
+        feed.backfill_feed(user_id, author_id)
+        feed_cache.bump_generation(f"follow:{user_id}")
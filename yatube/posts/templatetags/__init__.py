@@ -0,0 +1 @@
+"""Templatetags of posts app."""
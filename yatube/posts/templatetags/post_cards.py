@@ -0,0 +1,42 @@
+"""Tags rendering post cards through the render cache and thumbnails."""
+from django import template
+from django.utils.safestring import mark_safe
+
+from posts import cards, thumbnails
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def post_card(context, post):
+    """Render includes/post.html for the post or take it from cache."""
+    html = cards.get_card(post)
+    if html is None:
+        card_template = context.template.engine.get_template(
+            "includes/post.html",
+        )
+        with context.push(post=post):
+            html = card_template.render(context)
+        if not getattr(post, "thumbnail_pending", False):
+            cards.store_card(post, html)
+    return mark_safe(html)
+
+
+@register.simple_tag(takes_context=True)
+def post_thumbnail(context, post, geometry="card"):
+    """Return ready thumbnail of the post image or None.
+
+    Missing thumbnail is scheduled for generation, and the post and the
+    request are marked so that neither the card nor the page with a
+    placeholder is cached.
+    """
+    if not post.image:
+        return None
+    thumbnail = thumbnails.lookup(post.image, geometry)
+    if thumbnail is None:
+        post.thumbnail_pending = True
+        request = getattr(context, "request", None)
+        if request is not None:
+            request.thumbnail_pending = True
+        thumbnails.schedule(post.image.name)
+    return thumbnail
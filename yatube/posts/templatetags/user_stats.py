@@ -0,0 +1,12 @@
+"""Filters showing counters of users."""
+from django import template
+
+from posts.counters import ensure_stats
+
+register = template.Library()
+
+
+@register.filter
+def stats(user):
+    """Return counters of the user, counting them if the row is missing."""
+    return ensure_stats(user)
@@ -0,0 +1,65 @@
+"""Contain tests for post card render cache in posts app."""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.urls import reverse_lazy
+
+from core import metrics
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class PostCardCacheTests(TestCase):
+    """Tests caching and invalidation of rendered post cards."""
+
+    def setUp(self):
+        """Define post with author and group before each test."""
+        self.author = User.objects.create_user(username="auth_author")
+        self.group = Group.objects.create(
+            title="Old title", slug="group-slug", description="Group",
+        )
+        self.post = Post.objects.create(
+            author=self.author, group=self.group, text="Old text",
+        )
+        self.guest_client = Client()
+        cache.clear()
+        metrics.reset()
+
+    def get_profile(self):
+        """Render profile page with the card of the post."""
+        return self.guest_client.get(
+            reverse_lazy(
+                "posts:profile", kwargs={"username": self.author.username},
+            ),
+        )
+
+    def test_posts_card_is_rendered_once(self):
+        """Check if the second render takes the card from cache."""
+        self.get_profile()
+        self.get_profile()
+        self.assertEqual(
+            metrics.value("post_card_cache_total", result="miss"), 1,
+        )
+        self.assertEqual(
+            metrics.value("post_card_cache_total", result="hit"), 1,
+        )
+        response = self.guest_client.get(reverse_lazy("metrics"))
+        self.assertContains(
+            response, 'post_card_cache_total{result="hit"} 1',
+        )
+
+    def test_posts_card_is_invalidated_by_related_models(self):
+        """Check if changes of post, group or author reach the card."""
+        self.get_profile()
+
+        changes = (
+            (self.post, "text", "New text"),
+            (self.group, "title", "New title"),
+            (self.author, "first_name", "Newname"),
+        )
+        for instance, field, new_value in changes:
+            with self.subTest(field=field):
+                setattr(instance, field, new_value)
+                instance.save()
+                self.assertContains(self.get_profile(), new_value)
@@ -0,0 +1,115 @@
+"""Contain tests for community export and import in posts app."""
+import io
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts.community import Importer, open_stream
+from posts.models import Comment, FeedEntry, Follow, Group, Post, UserStats
+from posts.search import search
+
+User = get_user_model()
+
+
+class CommunityTransferTests(TestCase):
+    """Tests streaming export and resumable import of community data."""
+
+    def setUp(self):
+        """Define a small community and a file to export it to."""
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "community.jsonl.gz")
+        self.author = User.objects.create_user(username="auth_author")
+        self.reader = User.objects.create_user(username="auth_reader")
+        self.group = Group.objects.create(
+            title="Group", slug="test-slug", description="Description",
+        )
+        for number in range(3):
+            post = Post.objects.create(
+                author=self.author,
+                group=self.group,
+                text=f"Exported lighthouse post {number}",
+            )
+            Comment.objects.create(
+                author=self.reader, post=post, text="Exported comment",
+            )
+        Follow.objects.create(user=self.reader, author=self.author)
+
+    def tearDown(self):
+        """Remove exported file."""
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def export(self):
+        """Export community to the file."""
+        call_command("export_community", self.path, stdout=io.StringIO())
+
+    def test_posts_community_round_trip_keeps_ids(self):
+        """Check if import into an empty database restores the rows."""
+        self.export()
+        posts = list(Post.objects.values_list("pk", "text", "pub_date"))
+        User.objects.all().delete()
+        Group.objects.all().delete()
+
+        call_command("import_community", self.path, stdout=io.StringIO())
+
+        self.assertEqual(
+            list(Post.objects.values_list("pk", "text", "pub_date")), posts,
+        )
+        self.assertEqual(
+            User.objects.get(username="auth_reader").stats.following_count,
+            1,
+        )
+        self.assertEqual(Group.objects.get().post_count, 3)
+        self.assertEqual(Post.objects.first().comment_count, 1)
+        self.assertEqual(FeedEntry.objects.count(), 3)
+        self.assertEqual(len(search("lighthouse", kind="post")), 3)
+        self.assertFalse(os.path.exists(self.path + ".checkpoint"))
+
+    def test_posts_community_import_merges_existing_users(self):
+        """Check if rows get new ids and users are matched by username."""
+        self.export()
+        old_ids = set(Post.objects.values_list("pk", flat=True))
+
+        call_command("import_community", self.path, stdout=io.StringIO())
+
+        self.assertEqual(User.objects.count(), 2)
+        self.assertEqual(Group.objects.count(), 1)
+        self.assertEqual(Follow.objects.count(), 1)
+        new_posts = Post.objects.exclude(pk__in=old_ids)
+        self.assertEqual(new_posts.count(), 3)
+        self.assertEqual(
+            set(new_posts.values_list("author_id", "group_id")),
+            {(self.author.pk, self.group.pk)},
+        )
+        self.assertEqual(
+            Comment.objects.filter(post__in=new_posts).count(), 3,
+        )
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).post_count, 6,
+        )
+
+    def test_posts_community_import_resumes_from_checkpoint(self):
+        """Check if interrupted import continues without duplicates."""
+        self.export()
+        with open_stream(self.path, "r") as stream:
+            lines = stream.readlines()
+        checkpoint = os.path.join(self.directory, "import.checkpoint")
+        User.objects.all().delete()
+        Group.objects.all().delete()
+
+        interrupted = Importer(checkpoint, batch_size=2)
+        interrupted.finish = lambda: None
+        interrupted.run(io.StringIO("".join(lines[:5])))
+        self.assertEqual(Post.objects.count(), 2)
+
+        resumed = Importer(checkpoint, batch_size=2)
+        self.assertEqual(resumed.resumed_from, 5)
+        resumed.run(io.StringIO("".join(lines)))
+
+        self.assertEqual(User.objects.count(), 2)
+        self.assertEqual(Post.objects.count(), 3)
+        self.assertEqual(Comment.objects.count(), 3)
+        self.assertEqual(Follow.objects.count(), 1)
@@ -0,0 +1,175 @@
+"""Contain tests for materialized follow feed in posts app."""
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from posts import follow_graph
+from posts.feed import (
+    FollowFeed,
+    follow_feed,
+    rebuild_all_feeds,
+    trim_feed,
+)
+from posts.models import FeedEntry, Follow, Post, UserStats
+from posts.pagination import KeysetPaginator, WindowedPaginator
+
+User = get_user_model()
+
+
+class FollowFeedTests(TestCase):
+    """Tests fan-out of posts into follow feeds."""
+
+    def setUp(self):
+        """Define author and two readers before each test."""
+        self.author = User.objects.create_user(username="auth_author")
+        self.reader = User.objects.create_user(username="auth_reader")
+        self.other_reader = User.objects.create_user(username="auth_other")
+
+    def test_posts_feed_is_filled_on_write_and_purged_on_unfollow(self):
+        """Check if posts reach followers and leave with unfollowing."""
+        old_post = Post.objects.create(author=self.author, text="Old")
+        Follow.objects.create(user=self.reader, author=self.author)
+        new_post = Post.objects.create(author=self.author, text="New")
+
+        self.assertEqual(
+            list(follow_feed(self.reader)), [new_post, old_post],
+        )
+        self.assertEqual(
+            FeedEntry.objects.filter(user=self.reader).count(), 2,
+        )
+        self.assertFalse(follow_feed(self.other_reader).exists())
+
+        Follow.objects.filter(user=self.reader).delete()
+        self.assertFalse(FeedEntry.objects.filter(user=self.reader).exists())
+        self.assertFalse(follow_feed(self.reader).exists())
+
+    @override_settings(FOLLOW_FEED_FANOUT_MAX_FOLLOWERS=1)
+    def test_posts_feed_reads_popular_authors_on_read(self):
+        """Check if authors over the follower limit are not fanned out."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.other_reader, author=self.author)
+        post = Post.objects.create(author=self.author, text="Popular")
+
+        self.assertFalse(FeedEntry.objects.filter(post=post).exists())
+        self.assertEqual(list(follow_feed(self.reader)), [post])
+        self.assertEqual(list(follow_feed(self.other_reader)), [post])
+
+    @override_settings(FOLLOW_FEED_DEPTH=3)
+    def test_posts_feed_is_trimmed_to_depth(self):
+        """Check if feed keeps only FOLLOW_FEED_DEPTH newest entries."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        posts = [
+            Post.objects.create(author=self.author, text=f"Post #{i}")
+            for i in range(5)
+        ]
+        trim_feed(self.reader.pk)
+
+        self.assertEqual(
+            list(follow_feed(self.reader)), posts[:-4:-1],
+        )
+
+    @override_settings(FOLLOW_FEED_DEPTH=3)
+    def test_posts_feeds_are_rebuilt_from_follows(self):
+        """Check if bulk rebuild restores feeds cut to depth."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        posts = [
+            Post.objects.create(author=self.author, text=f"Post #{i}")
+            for i in range(5)
+        ]
+        FeedEntry.objects.all().delete()
+
+        rebuild_all_feeds()
+
+        self.assertEqual(
+            list(follow_feed(self.reader)), posts[:-4:-1],
+        )
+        self.assertFalse(follow_feed(self.other_reader).exists())
+
+    @override_settings(FOLLOW_FEED_DEPTH=3)
+    def test_posts_feed_is_trimmed_on_fan_out(self):
+        """Check if delivering posts keeps feeds within the depth."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        for number in range(5):
+            Post.objects.create(author=self.author, text=f"Post #{number}")
+
+        self.assertEqual(
+            FeedEntry.objects.filter(user=self.reader).count(), 3,
+        )
+
+    def test_posts_feed_merges_entries_with_authors_read_on_fan_in(self):
+        """Check if pages merge both sources newest first without gaps."""
+        popular = User.objects.create_user(username="auth_popular")
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.reader, author=popular)
+        with override_settings(FOLLOW_FEED_FANOUT_MAX_FOLLOWERS=0):
+            posts = [
+                Post.objects.create(
+                    author=(popular, self.author)[number % 2],
+                    text=f"Post #{number}",
+                )
+                for number in range(7)
+            ]
+            # Entries left from the time the author had few followers.
+            FeedEntry.objects.create(
+                user=self.reader,
+                post=posts[0],
+                author=popular,
+                pub_date=posts[0].pub_date,
+            )
+            expected = posts[::-1]
+            feed = follow_feed(self.reader).for_feed()
+
+            paginator = KeysetPaginator(feed, 3)
+            page = paginator.get_page()
+            keyset = list(page)
+            while page.has_next():
+                page = paginator.get_page(page.next_cursor)
+                keyset += list(page)
+            windowed = WindowedPaginator(feed, 3)
+
+            self.assertEqual(keyset, expected)
+            self.assertEqual(list(windowed.page(3)), expected[6:])
+            self.assertEqual(list(feed), expected)
+
+    def test_posts_feed_numbered_pages_seek_from_previous_page(self):
+        """Check if the next numbered page seeks past the page before."""
+        cache.clear()
+        Follow.objects.create(user=self.reader, author=self.author)
+        posts = [
+            Post.objects.create(author=self.author, text=f"Post #{number}")
+            for number in range(7)
+        ]
+        expected = posts[::-1]
+        paginator = WindowedPaginator(follow_feed(self.reader).for_feed(), 3)
+
+        with mock.patch.object(
+            FollowFeed, "seek", autospec=True, side_effect=FollowFeed.seek,
+        ) as seek:
+            pages = [list(paginator.page(number)) for number in (1, 2, 3)]
+
+        self.assertEqual(pages, [expected[:3], expected[3:6], expected[6:]])
+        boundaries = [call.args[1] for call in seek.call_args_list]
+        self.assertEqual(
+            boundaries,
+            [
+                None,
+                [expected[2].pub_date, expected[2].pk],
+                [expected[5].pub_date, expected[5].pk],
+            ],
+        )
+        self.assertEqual(seek.call_args_list[1].args[3], 4)
+
+    def test_posts_feed_finds_new_authors_read_on_fan_in(self):
+        """Check if cached authors read on fan-in follow limit changes."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        cache.clear()
+        with mock.patch.object(follow_graph, "cacheable", return_value=True):
+            self.assertFalse(follow_feed(self.reader).exists())
+            UserStats.objects.filter(user=self.author).update(
+                follower_count=100,
+            )
+            with override_settings(FOLLOW_FEED_FANOUT_MAX_FOLLOWERS=10):
+                post = Post.objects.create(author=self.author, text="Late")
+                self.assertEqual(list(follow_feed(self.reader)), [post])
@@ -0,0 +1,194 @@
+"""Contain tests for follow graph in posts app."""
+from array import array
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse_lazy
+
+from posts import follow_graph
+from posts.feed import follow_feed
+from posts.models import FeedEntry, Follow, Post, UserStats
+
+User = get_user_model()
+
+
+class FollowGraphTests(TestCase):
+    """Tests cached follow sets and bulk follows."""
+
+    def setUp(self):
+        """Define reader and three authors before each test."""
+        follow_graph._sets.clear()
+        self.reader = User.objects.create_user(username="auth_reader")
+        self.authors = [
+            User.objects.create_user(username=f"auth_author_{number}")
+            for number in range(3)
+        ]
+        self.author_ids = [author.pk for author in self.authors]
+
+    def tearDown(self):
+        """Forget sets cached by the test."""
+        follow_graph._sets.clear()
+
+    def stats(self, user):
+        """Return follower and following counters of the user."""
+        return UserStats.objects.values_list(
+            "follower_count", "following_count",
+        ).get(user=user)
+
+    def test_posts_follow_graph_bulk_follow_keeps_counters_and_feeds(self):
+        """Check if bulk follow adds rows once and fires signals."""
+        Post.objects.create(author=self.authors[0], text="Followed post")
+
+        created = follow_graph.follow_many(
+            self.reader.pk, self.author_ids + [self.reader.pk],
+        )
+
+        self.assertEqual(created, sorted(self.author_ids))
+        self.assertEqual(
+            list(follow_graph.following(self.reader.pk)),
+            sorted(self.author_ids),
+        )
+        self.assertEqual(
+            list(follow_graph.followers(self.authors[1].pk)),
+            [self.reader.pk],
+        )
+        self.assertTrue(
+            follow_graph.follows(self.reader.pk, self.authors[2].pk),
+        )
+        self.assertFalse(
+            follow_graph.follows(self.authors[2].pk, self.reader.pk),
+        )
+        self.assertEqual(self.stats(self.reader), (0, 3))
+        self.assertEqual(self.stats(self.authors[0]), (1, 0))
+        self.assertEqual(FeedEntry.objects.filter(user=self.reader).count(), 1)
+
+        self.assertEqual(
+            follow_graph.follow_many(self.reader.pk, self.author_ids), [],
+        )
+        self.assertEqual(Follow.objects.count(), 3)
+        self.assertEqual(self.stats(self.reader), (0, 3))
+
+    def test_posts_follow_graph_bulk_follow_with_stale_set(self):
+        """Check if rows missing from a stale set are not counted again."""
+        with mock.patch.object(follow_graph, "cacheable", return_value=True):
+            follow_graph.following(self.reader.pk)
+            # Added by another process, the cached set does not know it.
+            Follow.objects.bulk_create(
+                [Follow(user=self.reader, author=self.authors[0])],
+            )
+            UserStats.objects.filter(user=self.reader).update(
+                following_count=1,
+            )
+
+            created = follow_graph.follow_many(
+                self.reader.pk, self.author_ids[:2],
+            )
+
+        self.assertEqual(created, [self.authors[1].pk])
+        self.assertEqual(Follow.objects.count(), 2)
+        self.assertEqual(self.stats(self.reader), (0, 2))
+        self.assertEqual(self.stats(self.authors[0]), (0, 0))
+
+    def test_posts_follow_graph_bulk_unfollow(self):
+        """Check if bulk unfollow removes only follows of the user."""
+        follow_graph.follow_many(self.reader.pk, self.author_ids)
+        other = User.objects.create_user(username="auth_other")
+        follow_graph.follow_many(other.pk, self.author_ids[:1])
+
+        removed = follow_graph.unfollow_many(
+            self.reader.pk, self.author_ids[:2],
+        )
+
+        self.assertEqual(removed, 2)
+        self.assertEqual(
+            list(follow_graph.following(self.reader.pk)),
+            [self.author_ids[2]],
+        )
+        self.assertEqual(
+            list(follow_graph.followers(self.authors[0].pk)), [other.pk],
+        )
+        self.assertEqual(self.stats(self.reader), (0, 1))
+        self.assertEqual(self.stats(self.authors[0]), (1, 0))
+
+    def test_posts_follow_graph_bulk_unfollow_with_stale_set(self):
+        """Check if rows missing from a stale set are deleted as well."""
+        with mock.patch.object(follow_graph, "cacheable", return_value=True):
+            follow_graph.following(self.reader.pk)
+            # Added by another process, the cached set does not know it.
+            Follow.objects.bulk_create(
+                [Follow(user=self.reader, author=self.authors[0])],
+            )
+            UserStats.objects.filter(user=self.reader).update(
+                following_count=1,
+            )
+            UserStats.objects.filter(user=self.authors[0]).update(
+                follower_count=1,
+            )
+
+            removed = follow_graph.unfollow_many(
+                self.reader.pk, self.author_ids[:2],
+            )
+
+        self.assertEqual(removed, 1)
+        self.assertFalse(Follow.objects.exists())
+        self.assertEqual(self.stats(self.reader), (0, 0))
+        self.assertEqual(self.stats(self.authors[0]), (0, 0))
+
+    def test_posts_follow_graph_caches_sets_until_follows_change(self):
+        """Check if committed sets are reused until a follow changes."""
+        Follow.objects.create(user=self.reader, author=self.authors[0])
+        with mock.patch.object(follow_graph, "cacheable", return_value=True):
+            follow_graph.following(self.reader.pk)
+            with self.assertNumQueries(0):
+                self.assertTrue(
+                    follow_graph.follows(self.reader.pk, self.authors[0].pk),
+                )
+            Follow.objects.create(user=self.reader, author=self.authors[1])
+            with self.assertNumQueries(1):
+                self.assertTrue(
+                    follow_graph.follows(self.reader.pk, self.authors[1].pk),
+                )
+
+    def test_posts_follow_graph_feed_of_reader_following_nobody(self):
+        """Check if empty follow set skips the query of posts."""
+        Post.objects.create(author=self.authors[0], text="Unfollowed post")
+        with mock.patch.object(follow_graph, "cacheable", return_value=True):
+            follow_graph.following(self.reader.pk)
+            with self.assertNumQueries(0):
+                self.assertEqual(list(follow_feed(self.reader)), [])
+
+    def test_posts_follow_graph_set_cache_evicts_by_size(self):
+        """Check if least recently used sets leave over the id limit."""
+        sets = follow_graph.SetCache(max_ids=5)
+        sets.set("a", "g", array("I", [1, 2, 3]))
+        sets.set("b", "g", array("I", [4, 5]))
+        sets.get("a", "g")
+        sets.set("c", "g", array("I", [6]))
+        sets.set("huge", "g", array("I", range(10)))
+
+        self.assertIsNone(sets.get("b", "g"))
+        self.assertIsNone(sets.get("huge", "g"))
+        self.assertIsNone(sets.get("a", "other generation"))
+        self.assertEqual(list(sets.get("a", "g")), [1, 2, 3])
+        self.assertEqual(sets.size, 4)
+
+    def test_posts_unfollow_view_keeps_other_followers(self):
+        """Check if unfollowing leaves follows of other readers."""
+        other = User.objects.create_user(username="auth_other")
+        author = self.authors[0]
+        Follow.objects.create(user=self.reader, author=author)
+        Follow.objects.create(user=other, author=author)
+        client = Client()
+        client.force_login(self.reader)
+
+        client.get(
+            reverse_lazy(
+                "posts:profile_unfollow",
+                kwargs={"username": author.username},
+            ),
+        )
+
+        self.assertEqual(
+            list(Follow.objects.values_list("user", flat=True)), [other.pk],
+        )
@@ -0,0 +1,108 @@
+"""Contain tests for followers and following pages of posts app."""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Follow
+from yatube.settings import MAX_USERS_PER_PAGE
+
+User = get_user_model()
+
+
+class FollowListTests(TestCase):
+    """Tests followers and following pages."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Define author with more followers than fit on a page."""
+        cls.FAN_QUANTITY = MAX_USERS_PER_PAGE + 3
+        cls.author = User.objects.create_user(username="auth_author")
+        cls.fans = [
+            User.objects.create_user(username=f"auth_fan_{number}")
+            for number in range(cls.FAN_QUANTITY)
+        ]
+        for fan in cls.fans:
+            Follow.objects.create(user=fan, author=cls.author)
+        Follow.objects.create(user=cls.author, author=cls.fans[0])
+
+    def setUp(self):
+        """Start every test with an empty cache."""
+        cache.clear()
+        self.client = Client()
+
+    def url(self, name, user):
+        """Return url of the follow list of the user."""
+        return reverse(f"posts:{name}", kwargs={"username": user.username})
+
+    def test_posts_followers_pages_follow_cursor(self):
+        """Check if every follower is listed once, newest id first."""
+        url = self.url("followers", self.author)
+        names = []
+        response = self.client.get(url)
+        self.assertEqual(
+            len(response.context["people"]), MAX_USERS_PER_PAGE,
+        )
+        while True:
+            names += [
+                person.username for person in response.context["people"]
+            ]
+            page_obj = response.context["page_obj"]
+            if not page_obj.has_next():
+                break
+            response = self.client.get(
+                url, {"cursor": page_obj.next_cursor},
+            )
+
+        self.assertEqual(
+            names, [fan.username for fan in reversed(self.fans)],
+        )
+        self.assertEqual(len(response.context["people"]), 3)
+
+    def test_posts_following_lists_followed_authors(self):
+        """Check if following page lists authors the user follows."""
+        response = self.client.get(self.url("following", self.fans[0]))
+
+        self.assertEqual(response.context["kind"], "following")
+        self.assertEqual(response.context["people"], [self.author])
+        self.assertFalse(response.context["page_obj"].has_other_pages())
+
+    def test_posts_followers_first_page_is_cached(self):
+        """Check if first page is reused until a follow changes."""
+        url = self.url("followers", self.fans[0])
+        self.assertEqual(
+            self.client.get(url).context["people"], [self.author],
+        )
+        newcomer = User.objects.create_user(username="auth_newcomer")
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.context["people"], [self.author])
+
+        Follow.objects.create(user=newcomer, author=self.fans[0])
+        response = self.client.get(url)
+        self.assertEqual(
+            response.context["people"], [newcomer, self.author],
+        )
+
+    def test_posts_followers_deep_page_costs_two_queries(self):
+        """Check if a page by cursor reads people in one joined query."""
+        url = self.url("followers", self.author)
+        page_obj = self.client.get(url).context["page_obj"]
+
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                url, {"cursor": page_obj.next_cursor},
+            )
+        self.assertEqual(response.status_code, 200)
+
+    def test_posts_follow_list_of_missing_user(self):
+        """Check if follow lists of an unknown user are not found."""
+        for name in ("followers", "following"):
+            with self.subTest(name=name):
+                response = self.client.get(
+                    reverse(
+                        f"posts:{name}", kwargs={"username": "auth_nobody"},
+                    ),
+                )
+                self.assertEqual(response.status_code, 404)
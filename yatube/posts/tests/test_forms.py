@@ -1,14 +1,18 @@
 """Contain tests for forms in posts app in yatube project."""
+import io
 import os
 import shutil
 import tempfile
+from unittest import mock
 
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.contrib.auth import get_user_model
 from django.conf import settings
 from django.test import TestCase, Client, override_settings
 from django.urls import reverse_lazy
+from PIL import Image
 
+from posts import uploads
 from posts.models import Group, Post
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -228,3 +232,139 @@ class PostsCommentTests(TestCase):
         self.assertEqual(comment.text, form_data["text"])
         self.assertEqual(comment.post, post)
         self.assertEqual(comment.author, user)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class PostsImageUploadTests(TestCase):
+    """Tests limits and normalization of uploaded post images."""
+
+    def setUp(self):
+        """Define authorized client before each test."""
+        self.user = User.objects.create_user(username="auth_user")
+        self.test_client = Client()
+        self.test_client.force_login(self.user)
+
+    @staticmethod
+    def make_jpeg(size, orientation=None):
+        """Return uploaded JPEG image with EXIF data."""
+        buffer = io.BytesIO()
+        exif = Image.Exif()
+        exif[0x010F] = "Camera maker"
+        if orientation is not None:
+            exif[0x0112] = orientation
+        Image.new("RGB", size, "red").save(buffer, "JPEG", exif=exif)
+        return SimpleUploadedFile(
+            name="photo.jpg",
+            content=buffer.getvalue(),
+            content_type="image/jpeg",
+        )
+
+    @staticmethod
+    def make_animated_png(size):
+        """Return uploaded animated PNG image with EXIF data."""
+        buffer = io.BytesIO()
+        exif = Image.Exif()
+        exif[0x010F] = "Camera maker"
+        Image.new("RGB", size, "red").save(
+            buffer,
+            "PNG",
+            save_all=True,
+            append_images=[Image.new("RGB", size, "blue")],
+            exif=exif,
+        )
+        return SimpleUploadedFile(
+            name="animation.png",
+            content=buffer.getvalue(),
+            content_type="image/png",
+        )
+
+    def create_post(self, image):
+        """Post the creation form with the image."""
+        return self.test_client.post(
+            reverse_lazy("posts:post_create"),
+            data={"text": "Post with photo", "image": image},
+        )
+
+    @override_settings(POST_IMAGE_MAX_SIDE=40)
+    def test_posts_image_is_shrunk_and_stripped(self):
+        """Check if big image is re-encoded to bounded size."""
+        self.create_post(self.make_jpeg((200, 100)))
+
+        post = Post.objects.get()
+        self.assertEqual((post.image_width, post.image_height), (40, 20))
+        with Image.open(post.image.path) as stored:
+            self.assertEqual(stored.size, (40, 20))
+            self.assertFalse(stored.getexif())
+
+    @override_settings(POST_IMAGE_MAX_SIDE=40)
+    def test_posts_image_is_turned_by_exif_orientation(self):
+        """Check if sideways photo is stored upright with its dimensions."""
+        # Orientation 6: the camera was turned, rotate 90 degrees back.
+        self.create_post(self.make_jpeg((200, 100), orientation=6))
+
+        post = Post.objects.get()
+        self.assertEqual((post.image_width, post.image_height), (20, 40))
+        with Image.open(post.image.path) as stored:
+            self.assertEqual(stored.size, (20, 40))
+            self.assertFalse(stored.getexif())
+
+    def test_posts_animated_image_is_stripped(self):
+        """Check if animated image keeps its frames but not metadata."""
+        self.create_post(self.make_animated_png((30, 20)))
+
+        post = Post.objects.get()
+        self.assertEqual((post.image_width, post.image_height), (30, 20))
+        with Image.open(post.image.path) as stored:
+            self.assertTrue(stored.is_animated)
+            self.assertEqual(stored.n_frames, 2)
+            self.assertFalse(stored.getexif())
+
+    def test_posts_image_in_read_only_format_is_converted(self):
+        """Check if image Pillow cannot save is stored in a saved format."""
+        xpm = (
+            b'/* XPM */\nstatic char *image[] = {\n"2 1 2 1",\n'
+            b'"a c #FF0000",\n"b c #0000FF",\n"ab"\n};\n'
+        )
+        self.create_post(
+            SimpleUploadedFile(
+                name="icon.xpm", content=xpm, content_type="image/x-xpixmap",
+            ),
+        )
+
+        post = Post.objects.get()
+        self.assertEqual((post.image_width, post.image_height), (2, 1))
+        with Image.open(post.image.path) as stored:
+            self.assertIn(stored.format, Image.SAVE)
+
+    def test_posts_image_format_fallback_is_logged(self):
+        """Check if missing WEBP and AVIF support is logged once."""
+        uploads.preferred_format.cache_clear()
+        self.addCleanup(uploads.preferred_format.cache_clear)
+        Image.init()
+        with mock.patch.dict(Image.SAVE):
+            for image_format in uploads.PREFERRED_FORMATS:
+                Image.SAVE.pop(image_format, None)
+            with self.assertLogs("posts.uploads", "WARNING") as logs:
+                self.assertEqual(uploads.target_format("JPEG"), "JPEG")
+                self.assertEqual(uploads.target_format("PNG"), "PNG")
+        self.assertEqual(len(logs.output), 1)
+
+    @override_settings(POST_IMAGE_MAX_UPLOAD_SIZE=100)
+    def test_posts_image_over_size_limit_is_rejected(self):
+        """Check if too large file is rejected before decoding."""
+        response = self.create_post(self.make_jpeg((200, 100)))
+
+        self.assertFalse(Post.objects.exists())
+        self.assertTrue(response.context["form"].has_error(
+            "image", code="file_too_large",
+        ))
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=1000)
+    def test_posts_image_over_pixel_limit_is_rejected(self):
+        """Check if image with too many pixels is rejected."""
+        response = self.create_post(self.make_jpeg((200, 100)))
+
+        self.assertFalse(Post.objects.exists())
+        self.assertTrue(response.context["form"].has_error(
+            "image", code="image_too_large",
+        ))
@@ -1,9 +1,14 @@
 """Contain tests for models in post app in yatube django project."""
+from io import StringIO
+from unittest import mock
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.test import TestCase, TransactionTestCase
 
-from posts.models import Group, Post, Comment, Follow
+from posts import counters
+from posts.models import Group, Post, Comment, Follow, UserStats
 
 User = get_user_model()
 
@@ -219,3 +224,89 @@ class FollowModelTests(TestCase):
                     follow._meta.get_field(field).help_text,
                     expected_value,
                 )
+
+
+class CountersTests(TestCase):
+    """Test denormalized counters of posts app."""
+
+    def setUp(self):
+        """Define author, reader and two groups before each test."""
+        self.author = User.objects.create_user(username="auth_author")
+        self.reader = User.objects.create_user(username="auth_reader")
+        self.groups = [
+            Group.objects.create(title=f"Group {i}", slug=f"group-{i}")
+            for i in range(2)
+        ]
+
+    def assertCounters(self, post, group_counts, author_posts, comments):
+        """Compare stored counters with expected values."""
+        for group, expected in zip(self.groups, group_counts):
+            group.refresh_from_db()
+            self.assertEqual(group.post_count, expected)
+        self.author.stats.refresh_from_db()
+        self.assertEqual(self.author.stats.post_count, author_posts)
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, comments)
+
+    def test_posts_counters_follow_changes(self):
+        """Check if signals keep counters in step with counted rows."""
+        post = Post.objects.create(
+            author=self.author, text="Post", group=self.groups[0],
+        )
+        Post.objects.create(author=self.author, text="Another post")
+        comment = Comment.objects.create(
+            post=post, author=self.reader, text="Comment",
+        )
+        self.assertCounters(post, (1, 0), 2, 1)
+
+        post.group = self.groups[1]
+        post.save()
+        comment.delete()
+        self.assertCounters(post, (0, 1), 2, 0)
+
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.author.stats.refresh_from_db()
+        self.reader.stats.refresh_from_db()
+        self.assertEqual(self.author.stats.follower_count, 1)
+        self.assertEqual(self.reader.stats.following_count, 1)
+
+    def test_posts_recount_repairs_drift(self):
+        """Check if recount_counters command restores true values."""
+        post = Post.objects.create(
+            author=self.author, text="Post", group=self.groups[0],
+        )
+        Comment.objects.create(post=post, author=self.reader, text="Text")
+        Post.objects.update(comment_count=10)
+        Group.objects.update(post_count=10)
+        UserStats.objects.filter(user=self.author).delete()
+
+        call_command("recount_counters", stdout=StringIO())
+        self.author = User.objects.get(pk=self.author.pk)
+        self.assertCounters(post, (1, 0), 1, 1)
+
+    def test_posts_recount_adds_missing_stats_in_batches(self):
+        """Check if every user lacking counters gets them batch by batch."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        UserStats.objects.all().delete()
+
+        counters.recount_all(batch_size=1)
+
+        self.assertEqual(
+            dict(UserStats.objects.values_list("user", "follower_count")),
+            {self.author.pk: 1, self.reader.pk: 0},
+        )
+
+
+class CountersTransactionTests(TransactionTestCase):
+    """Test counters change in the transaction of the counted row."""
+
+    def test_posts_failed_counter_update_undoes_save(self):
+        """Check if post is not kept when its counters fail to change."""
+        author = User.objects.create_user(username="auth_author")
+        with mock.patch.object(
+            counters, "change_counter", side_effect=DatabaseError,
+        ):
+            with self.assertRaises(DatabaseError):
+                Post.objects.create(author=author, text="Post")
+        self.assertFalse(Post.objects.exists())
+        self.assertEqual(UserStats.objects.get(user=author).post_count, 0)
@@ -0,0 +1,164 @@
+"""Contain tests for cursor and windowed pagination in posts app."""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse_lazy
+
+from posts.models import Post
+from posts.pagination import (
+    KeysetPaginator,
+    WindowedPaginator,
+    encode_cursor,
+    table_count,
+)
+from yatube.settings import MAX_POSTS_PER_PAGE
+
+User = get_user_model()
+
+
+class KeysetPaginatorTest(TestCase):
+    """Tests KeysetPaginator in posts app."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Define initial instances of models User, Post before testing."""
+        super().setUpClass()
+        cls.test_user = User.objects.create_user(username="auth_author")
+        cls.POST_SET_QUANTITY = MAX_POSTS_PER_PAGE * 2 + 3
+        for i in range(cls.POST_SET_QUANTITY):
+            Post.objects.create(
+                author=cls.test_user,
+                text=f"Тестовый пост #{str(i)}",
+            )
+
+    def setUp(self):
+        """Define initial instance of guest client before each test."""
+        self.test_client = Client()
+        cache.clear()
+
+    def test_posts_keyset_paginator_walks_forward_and_backward(self):
+        """Check if cursors visit every post once in both directions."""
+        expected = list(
+            Post.objects.order_by("-pub_date", "-pk")
+            .values_list("pk", flat=True),
+        )
+        paginator = KeysetPaginator(Post.objects.all(), MAX_POSTS_PER_PAGE)
+
+        page = paginator.get_page()
+        self.assertFalse(page.has_previous())
+        seen = [post.pk for post in page]
+        pages = [page]
+        while page.has_next():
+            page = paginator.get_page(page.next_cursor)
+            seen += [post.pk for post in page]
+            pages.append(page)
+        self.assertEqual(seen, expected)
+        self.assertEqual(
+            len(pages[-1]), self.POST_SET_QUANTITY % MAX_POSTS_PER_PAGE,
+        )
+
+        page = paginator.get_page(pages[-1].previous_cursor)
+        self.assertEqual(list(page), list(pages[-2]))
+        page = paginator.get_page(page.previous_cursor)
+        self.assertEqual(list(page), list(pages[0]))
+        self.assertFalse(page.has_previous())
+        self.assertTrue(page.has_next())
+
+    def test_posts_keyset_paginator_ignores_broken_cursor(self):
+        """Check if malformed cursors give the first page."""
+        paginator = KeysetPaginator(Post.objects.all(), MAX_POSTS_PER_PAGE)
+        first_page = list(paginator.get_page())
+
+        for token in ("garbage", encode_cursor(["not a date", 1])):
+            with self.subTest(token=token):
+                self.assertEqual(list(paginator.get_page(token)), first_page)
+
+    @override_settings(KEYSET_PAGINATION_VIEWS=("index", "profile"))
+    def test_posts_views_use_keyset_pagination_when_enabled(self):
+        """Check if feed views switch to cursor paging by setting."""
+        urls = (
+            reverse_lazy("posts:index"),
+            reverse_lazy(
+                "posts:profile",
+                kwargs={"username": self.test_user.username},
+            ),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                cache.clear()
+                response = self.test_client.get(url)
+                page_obj = response.context["page_obj"]
+                self.assertEqual(len(page_obj), MAX_POSTS_PER_PAGE)
+                self.assertContains(response, page_obj.next_cursor)
+
+                response = self.test_client.get(
+                    url, {"cursor": page_obj.next_cursor},
+                )
+                next_page = response.context["page_obj"]
+                self.assertEqual(len(next_page), MAX_POSTS_PER_PAGE)
+                self.assertTrue(next_page.has_previous())
+                self.assertFalse(set(page_obj) & set(next_page))
+
+
+@override_settings(PAGINATOR_WINDOW=2)
+class WindowedPaginatorTest(TestCase):
+    """Tests WindowedPaginator in posts app."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Define 30 posts, 15 pages of 2 posts."""
+        super().setUpClass()
+        author = User.objects.create_user(username="auth_author")
+        Post.objects.bulk_create(
+            Post(author=author, text=f"Тестовый пост #{i}")
+            for i in range(30)
+        )
+        cls.posts = Post.objects.order_by("pk")
+
+    def test_posts_windowed_paginator_links_pages_around_current(self):
+        """Check if only first, last and neighbour pages are linked."""
+        paginator = WindowedPaginator(self.posts, 2, count=30)
+        page = paginator.get_page(8)
+        self.assertEqual(page.page_window, [1, None, 6, 7, 8, 9, 10, None, 15])
+        self.assertEqual(page.last_page_number, 15)
+        self.assertEqual(
+            paginator.get_page(2).page_window, [1, 2, 3, 4, None, 15],
+        )
+        self.assertEqual(
+            paginator.get_page(15).page_window, [1, None, 13, 14, 15],
+        )
+        self.assertIsNone(paginator.get_page(15).last_page_number)
+
+    def test_posts_windowed_paginator_works_without_total(self):
+        """Check if unknown total links pages up to the next one."""
+        paginator = WindowedPaginator(self.posts, 2)
+        with self.assertNumQueries(1):
+            page = paginator.get_page(8)
+            self.assertEqual(page.page_window, [1, None, 6, 7, 8, 9])
+            self.assertIsNone(page.last_page_number)
+        self.assertEqual(list(page), list(self.posts[14:16]))
+        self.assertFalse(paginator.get_page(15).has_next())
+
+    def test_posts_windowed_paginator_tolerates_wrong_estimate(self):
+        """Check if pages past a low estimate stay reachable."""
+        paginator = WindowedPaginator(self.posts, 2, count=10)
+        page = paginator.get_page(5)
+        self.assertTrue(page.has_next())
+        self.assertEqual(page.page_window[-1], 6)
+        self.assertEqual(list(paginator.get_page(7)), list(self.posts[12:14]))
+
+        paginator = WindowedPaginator(self.posts, 2, count=40)
+        self.assertEqual(paginator.get_page(20).number, 1)
+        self.assertEqual(paginator.get_page(99).number, 1)
+        self.assertEqual(paginator.get_page("last").number, 1)
+        self.assertEqual(
+            WindowedPaginator(self.posts, 2, count=30).get_page(99).number,
+            15,
+        )
+
+    def test_posts_table_count_is_cached(self):
+        """Check if the index total is counted once per timeout."""
+        cache.clear()
+        self.assertEqual(table_count(Post), 30)
+        with self.assertNumQueries(0):
+            self.assertEqual(table_count(Post), 30)
@@ -0,0 +1,95 @@
+"""Contain tests for full-text search in posts app."""
+from django.contrib.auth import get_user_model
+from django.test import TestCase, Client
+from django.urls import reverse_lazy
+
+from posts.models import Comment, Post
+from posts.pagination import encode_cursor
+from posts.search import search
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    """Tests search index, ranking and search page."""
+
+    def setUp(self):
+        """Define author with posts and a comment before each test."""
+        self.author = User.objects.create_user(username="auth_author")
+        self.rare = Post.objects.create(
+            author=self.author, text="Sunset over the quiet harbour",
+        )
+        self.frequent = Post.objects.create(
+            author=self.author, text="Harbour, harbour and harbour again",
+        )
+        self.comment = Comment.objects.create(
+            author=self.author, post=self.rare, text="Lovely <b>harbour</b>",
+        )
+        self.guest_client = Client()
+
+    def test_posts_search_ranks_and_highlights_matches(self):
+        """Check if better matches go first with marked words."""
+        results = search("harbour", kind="post")
+        self.assertEqual(
+            [hit.object_id for hit in results],
+            [self.frequent.pk, self.rare.pk],
+        )
+        self.assertIn("<mark>harbour</mark>", results.hits[1].snippet)
+
+        comment_hit = search("lovely").hits[0]
+        self.assertEqual(comment_hit.kind, "comment")
+        self.assertEqual(comment_hit.post_id, self.rare.pk)
+        self.assertIn("&lt;b&gt;", comment_hit.snippet)
+
+    def test_posts_search_pages_with_cursor(self):
+        """Check if pages of results neither repeat nor skip hits."""
+        first = search("harbour", limit=2)
+        self.assertTrue(first.has_next())
+        second = search("harbour", cursor=first.next_cursor, limit=2)
+        self.assertFalse(second.has_next())
+        found = [(hit.kind, hit.object_id) for hit in [*first, *second]]
+        self.assertEqual(len(set(found)), 3)
+
+    def test_posts_search_ignores_malformed_cursor(self):
+        """Check if cursor with values of wrong types gives first page."""
+        first = [hit.object_id for hit in search("harbour", limit=2)]
+        for values in ([[1], {"a": 1}], ["1", 2], [1.5, 2.5], [True, 1]):
+            with self.subTest(values=values):
+                cursor = encode_cursor(values)
+                page = search("harbour", cursor=cursor, limit=2)
+                self.assertEqual([hit.object_id for hit in page], first)
+
+    def test_posts_search_index_follows_changes(self):
+        """Check if edited and deleted texts leave the index."""
+        self.rare.text = "Mountain lake"
+        self.rare.save(update_fields=("text",))
+        self.comment.delete()
+
+        self.assertEqual(
+            [hit.object_id for hit in search("harbour")], [self.frequent.pk],
+        )
+        self.assertEqual(
+            [hit.object_id for hit in search("mountain")], [self.rare.pk],
+        )
+
+    def test_posts_search_page_shows_results(self):
+        """Check if search page renders found posts."""
+        response = self.guest_client.get(
+            reverse_lazy("posts:search"), {"q": "sunset"},
+        )
+        self.assertEqual(response.context["query"], "sunset")
+        self.assertEqual(len(response.context["results"]), 1)
+        self.assertContains(response, "<mark>Sunset</mark>")
+
+    def test_posts_admin_search_uses_index(self):
+        """Check if admin changelist searches through the index."""
+        admin = User.objects.create_superuser(
+            username="admin", email="admin@example.com", password="pass",
+        )
+        self.guest_client.force_login(admin)
+        response = self.guest_client.get(
+            reverse_lazy("admin:posts_post_changelist"), {"q": "sunset"},
+        )
+        self.assertEqual(
+            list(response.context["cl"].result_list), [self.rare],
+        )
@@ -0,0 +1,97 @@
+"""Contain tests for pre-generated thumbnails in posts app."""
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse_lazy
+from sorl.thumbnail.kvstores import cached_db_kvstore
+
+from posts import thumbnails
+from posts.models import Post
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+User = get_user_model()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class ThumbnailTests(TestCase):
+    """Tests placeholders and background generation of thumbnails."""
+
+    @classmethod
+    def tearDownClass(cls):
+        """Delete test dirs."""
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        """Define post with an image before each test."""
+        cache.clear()
+        small_gif = (
+            b"\x47\x49\x46\x38\x39\x61\x02\x00"
+            b"\x01\x00\x80\x00\x00\x00\x00\x00"
+            b"\xFF\xFF\xFF\x21\xF9\x04\x00\x00"
+            b"\x00\x00\x00\x2C\x00\x00\x00\x00"
+            b"\x02\x00\x01\x00\x00\x02\x02\x0C"
+            b"\x0A\x00\x3B"
+        )
+        self.author = User.objects.create_user(username="auth_author")
+        self.post = Post.objects.create(
+            author=self.author,
+            text="Post with image",
+            image=SimpleUploadedFile(
+                name="thumb.gif", content=small_gif, content_type="image/gif",
+            ),
+        )
+        self.guest_client = Client()
+
+    def get_profile(self):
+        """Render profile page with the card of the post."""
+        return self.guest_client.get(
+            reverse_lazy(
+                "posts:profile", kwargs={"username": self.author.username},
+            ),
+        )
+
+    def test_posts_thumbnail_placeholder_until_generated(self):
+        """Check if cards show placeholder and pick thumbnail up later."""
+        self.assertIsNone(thumbnails.lookup(self.post.image))
+        self.assertContains(self.get_profile(), "Изображение обрабатывается")
+        self.assertTrue(
+            cache.get(thumbnails.pending_key(self.post.image.name)),
+        )
+
+        thumbnails.generate(self.post.image.name)
+
+        thumbnail = thumbnails.lookup(self.post.image)
+        self.assertIsNotNone(thumbnail)
+        response = self.get_profile()
+        self.assertNotContains(response, "Изображение обрабатывается")
+        self.assertContains(response, thumbnail.url)
+
+    def test_posts_thumbnail_made_by_other_process(self):
+        """Check if thumbnail stored by another process is found."""
+        self.assertIsNone(thumbnails.lookup(self.post.image))
+        # A worker process has a cache of its own.
+        with mock.patch.object(
+            cached_db_kvstore.KVStore, "cache",
+            new_callable=mock.PropertyMock,
+            return_value=LocMemCache("worker", {}),
+        ):
+            thumbnails.generate(self.post.image.name)
+
+        self.assertIsNotNone(thumbnails.lookup(self.post.image))
+
+    def test_posts_warm_thumbnails_command(self):
+        """Check if command makes thumbnails of stored images."""
+        out = StringIO()
+        call_command("warm_thumbnails", workers=0, stdout=out)
+        self.assertIn("1 images", out.getvalue())
+        self.assertIsNotNone(thumbnails.lookup(self.post.image))
@@ -6,11 +6,14 @@ from django.core.files.uploadedfile import SimpleUploadedFile
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.conf import settings
+from django.db import connection
 from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse_lazy
 from django import forms
 
-from posts.models import Group, Post, Comment, Follow
+from posts import feed_cache
+from posts.models import Group, Post, Comment, Follow, UserStats
 from yatube.settings import MAX_POSTS_PER_PAGE, MAX_COMMENTS_PER_PAGE
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -189,6 +192,45 @@ class PostsViewTests(TestCase):
             )
             self.check_post(response.context["page_obj"][0])
 
+    def test_posts_profile_view_counts_user_without_stats(self):
+        """Check if profile of a user inserted in bulk is counted anew."""
+        author = PostsViewTests.test_user["author"]
+        UserStats.objects.filter(user=author).delete()
+
+        response = self.test_client["guest"].get(
+            reverse_lazy(
+                "posts:profile", kwargs={"username": author.username},
+            ),
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["user_profile"].stats.post_count, 1)
+        self.assertEqual(UserStats.objects.get(user=author).post_count, 1)
+
+    def test_posts_pages_count_author_without_stats(self):
+        """Check if pages showing counters count a user inserted in bulk."""
+        author = PostsViewTests.test_user["author"]
+        urls = (
+            reverse_lazy(
+                "posts:post_detail",
+                kwargs={"post_id": PostsViewTests.test_post.pk},
+            ),
+            reverse_lazy(
+                "posts:followers", kwargs={"username": author.username},
+            ),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                UserStats.objects.filter(user=author).delete()
+                cache.clear()
+
+                response = self.test_client["guest"].get(url)
+
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(
+                    UserStats.objects.get(user=author).post_count, 1,
+                )
+
     def test_posts_group_posts_view_uses_correct_context(self):
         """Check if group_posts view in posts app use correct context."""
         group = PostsViewTests.test_group
@@ -263,46 +305,48 @@ class PostsViewTests(TestCase):
     def test_posts_index_view_cache_works_correctly(self):
         """Check if caching in index view in posts app works correctly."""
         user = PostsViewTests.test_user["author"]
+        index_url = reverse_lazy("posts:index")
+
+        content_before = self.test_client["guest"].get(index_url).content
+        Post.objects.filter(pk=self.test_post.pk).update(text="Hidden text")
+        content_after = self.test_client["guest"].get(index_url).content
+        self.assertEqual(content_before, content_after)
 
-        content_before = (
-            self.test_client["guest"]
-            .get(
-                reverse_lazy("posts:index"),
-            )
-            .content
-        )
         Post.objects.create(
             text="New post",
             author=user,
         )
+        content_after = self.test_client["guest"].get(index_url).content
+        self.assertNotEqual(content_before, content_after)
+        self.assertIn("New post".encode(), content_after)
 
-        content_after = (
-            self.test_client["guest"]
-            .get(
-                reverse_lazy("posts:index"),
-            )
-            .content
+        response = self.test_client_auth["auth_base"].get(index_url)
+        self.assertEqual(
+            list(response.context["page_obj"]),
+            list(
+                self.test_client_auth["auth_author"]
+                .get(index_url)
+                .context["page_obj"],
+            ),
         )
-        self.assertEqual(content_before, content_after)
 
         cache.clear()
-        content_before = (
-            self.test_client["guest"]
-            .get(
-                reverse_lazy("posts:index"),
-            )
-            .content
+        content_after = self.test_client["guest"].get(index_url).content
+        self.assertIn("Hidden text".encode(), content_after)
+
+    def test_posts_index_view_serves_stale_page_while_rebuilding(self):
+        """Check if stale index page is served while another rebuilds it."""
+        index_url = reverse_lazy("posts:index")
+        self.test_client["guest"].get(index_url)
+        feed_cache.bump_generation("posts")
+        cache.add(
+            feed_cache.make_page_key("posts", "anon", "1") + ":lock",
+            1,
         )
-        self.assertNotEqual(content_before, content_after)
+        Post.objects.filter(pk=self.test_post.pk).update(text="Fresh text")
 
-        content_after = (
-            self.test_client_auth["auth_base"]
-            .get(
-                reverse_lazy("posts:index"),
-            )
-            .content
-        )
-        self.assertNotEqual(content_before, content_after)
+        content = self.test_client["guest"].get(index_url).content
+        self.assertNotIn("Fresh text".encode(), content)
 
     def test_posts_follow_index_view_use_correct_context(self):
         """Check if follow_index view in posts app works correctly."""
@@ -473,27 +517,44 @@ class PaginatorTest(TestCase):
             self.assertEqual(len(response.context["page_obj"]), expected_len)
 
     def test_posts_post_detail_view_comments_paginator(self):
-        """Check if paginator for comments works correctly.
+        """Check if older comments are loaded by cursor.
 
         in "post detail view".
         """
         post = Post.objects.first()
+        url = reverse_lazy("posts:post_detail", kwargs={"post_id": post.pk})
         last_page_quantity = self.COMMENTS_SET_QUANTITY - MAX_COMMENTS_PER_PAGE
 
-        paginator_dict = {
-            reverse_lazy(
-                "posts:post_detail",
-                kwargs={"post_id": post.pk},
-            ): MAX_COMMENTS_PER_PAGE,
-            reverse_lazy(
-                "posts:post_detail",
-                kwargs={"post_id": post.pk},
-            )
-            + "?page=2": last_page_quantity,
-        }
-        for url, expected_len in paginator_dict.items():
-            response = self.test_client.get(url)
-            self.assertEqual(len(response.context["page_obj"]), expected_len)
+        response = self.test_client.get(url)
+        page_obj = response.context["page_obj"]
+        self.assertEqual(len(page_obj), MAX_COMMENTS_PER_PAGE)
+        self.assertEqual(page_obj[0].text, "Test comment text #20")
+
+        response = self.test_client.get(url, {"cursor": page_obj.next_cursor})
+        self.assertEqual(len(response.context["page_obj"]), last_page_quantity)
+        self.assertFalse(response.context["page_obj"].has_next())
+
+        fragment = self.test_client.get(
+            reverse_lazy("posts:post_comments", kwargs={"post_id": post.pk}),
+            {"cursor": page_obj.next_cursor},
+        ).json()
+        self.assertIn("Test comment text #0", fragment["html"])
+        self.assertIsNone(fragment["next_cursor"])
+
+    def test_posts_post_detail_comment_queries_do_not_grow(self):
+        """Check if a long thread costs as many queries as a short one."""
+        post = Post.objects.first()
+        url = reverse_lazy("posts:post_detail", kwargs={"post_id": post.pk})
+        self.test_client.get(url)
+        with CaptureQueriesContext(connection) as short_thread:
+            self.test_client.get(url)
+        Comment.objects.bulk_create(
+            Comment(text="More", post=post, author=self.test_user["base"])
+            for _ in range(50)
+        )
+        with CaptureQueriesContext(connection) as long_thread:
+            self.test_client.get(url)
+        self.assertEqual(len(long_thread), len(short_thread))
 
     def test_posts_follow_index_view_paginator(self):
         """Check if follow_index in index view shows works correctly."""
@@ -514,3 +575,171 @@ class PaginatorTest(TestCase):
             cache.clear()
             response = self.test_client.get(url)
             self.assertEqual(len(response.context["page_obj"]), expected_len)
+
+
+class FeedQueryCountTest(TestCase):
+    """Tests that feed pages cost a fixed number of queries."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Define initial instances of models before testing.
+
+        Models User, Post, Group, Comment, Follow.
+        """
+        super().setUpClass()
+        cls.test_user = {
+            "author": User.objects.create_user(
+                username="auth_author", first_name="Test", last_name="Author",
+            ),
+            "base": User.objects.create_user(username="auth_base"),
+        }
+        cls.test_group = Group.objects.create(
+            title="test group",
+            slug="group-slug",
+            description="group description",
+        )
+        Follow.objects.create(
+            user=cls.test_user["base"],
+            author=cls.test_user["author"],
+        )
+        for i in range(MAX_POSTS_PER_PAGE * 2):
+            post = Post.objects.create(
+                author=cls.test_user["author"],
+                text=f"Тестовый пост #{str(i)}",
+                group=cls.test_group,
+            )
+            Comment.objects.create(
+                text="Test comment",
+                post=post,
+                author=cls.test_user["base"],
+            )
+
+    def setUp(self):
+        """Define initial instances of clients before each test."""
+        self.guest_client = Client()
+        self.auth_client = Client()
+        self.auth_client.force_login(FeedQueryCountTest.test_user["base"])
+        cache.clear()
+
+    def test_posts_feed_pages_do_not_query_per_post(self):
+        """Check if feed views do not run queries for every post card.
+
+        Group and profile pages make one more query for their validator
+        of conditional GET, and take the total of pages from counters.
+        The follow feed looks up authors fanned out on read, then cached,
+        before reading its sources.
+        """
+        user = FeedQueryCountTest.test_user["author"]
+        group = FeedQueryCountTest.test_group
+        pages = (
+            (self.guest_client, reverse_lazy("posts:index"), 2),
+            (
+                self.guest_client,
+                reverse_lazy("posts:group_list", kwargs={"slug": group.slug}),
+                3,
+            ),
+            (
+                self.guest_client,
+                reverse_lazy(
+                    "posts:profile", kwargs={"username": user.username},
+                ),
+                3,
+            ),
+            (self.auth_client, reverse_lazy("posts:follow_index"), 4),
+        )
+        for client, url, queries in pages:
+            with self.subTest(url=url):
+                cache.clear()
+                with self.assertNumQueries(queries):
+                    response = client.get(url)
+                page_obj = response.context["page_obj"]
+                self.assertEqual(len(page_obj), MAX_POSTS_PER_PAGE)
+                self.assertEqual(page_obj[0].comment_count, 1)
+
+
+class ConditionalPageTest(TestCase):
+    """Tests conditional GET of post, profile and group pages."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Create author with a post in a group."""
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="auth_author")
+        cls.group = Group.objects.create(
+            title="Group", slug="group-slug", description="Description",
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text="Post text",
+        )
+
+    def setUp(self):
+        """Define guest and author clients."""
+        cache.clear()
+        self.guest_client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def test_posts_unchanged_pages_are_not_modified(self):
+        """Check if unchanged page is answered with 304 and no rendering."""
+        urls = (
+            reverse_lazy("posts:group_list", kwargs={"slug": "group-slug"}),
+            reverse_lazy("posts:profile", kwargs={"username": "auth_author"}),
+            reverse_lazy(
+                "posts:post_detail", kwargs={"post_id": self.post.pk},
+            ),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertIn("s-maxage=60", response["Cache-Control"])
+                with self.assertNumQueries(1):
+                    response = self.guest_client.get(
+                        url, HTTP_IF_NONE_MATCH=response["ETag"],
+                    )
+                self.assertEqual(response.status_code, 304)
+                self.assertFalse(response.templates)
+
+    def test_posts_pages_change_with_content_and_user(self):
+        """Check if new comment and login give another validator."""
+        url = reverse_lazy(
+            "posts:post_detail", kwargs={"post_id": self.post.pk},
+        )
+        etag = self.guest_client.get(url)["ETag"]
+
+        response = self.author_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("private", response["Cache-Control"])
+
+        comment = Comment.objects.create(
+            post=self.post, author=self.author, text="Comment",
+        )
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Comment")
+
+        comment.text = "Edited comment"
+        comment.save()
+        response = self.guest_client.get(
+            url, HTTP_IF_NONE_MATCH=response["ETag"],
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Edited comment")
+
+    def test_posts_pages_change_with_csrf_secret(self):
+        """Check if page with forms is built anew for another CSRF secret."""
+        url = reverse_lazy(
+            "posts:post_detail", kwargs={"post_id": self.post.pk},
+        )
+        # The first page sets the CSRF cookie.
+        self.author_client.get(url)
+        response = self.author_client.get(url)
+        self.assertNotIn("Last-Modified", response)
+        etag = response["ETag"]
+        response = self.author_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        # A new session gets a new secret, as login rotates it.
+        self.author_client.cookies[settings.CSRF_COOKIE_NAME] = "a" * 64
+        response = self.author_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "csrfmiddlewaretoken")
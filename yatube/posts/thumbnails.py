@@ -0,0 +1,137 @@
+"""Pre-generated thumbnails of post images.
+
+Templates only look thumbnails up in the sorl key-value store and show a
+placeholder while one is missing. Thumbnails are made after the post is
+committed, by a pool of worker processes since resizing is CPU-bound,
+so no web request decodes a full-size upload.
+"""
+import hashlib
+import logging
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.models import KVStore
+
+from core.tasks import task
+from core.workers import make_executor
+
+logger = logging.getLogger(__name__)
+
+# Geometries templates show post images in.
+GEOMETRIES = {
+    "card": ("960x339", {"crop": "center", "upscale": True}),
+}
+PENDING_KEY = "thumbnail_pending:{name}"
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def thumbnail_options(source, options):
+    """Complete options the way sorl does before naming a thumbnail."""
+    backend = default.backend
+    options = dict(options)
+    if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault("format", backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(sorl_defaults, attr):
+            options.setdefault(key, value)
+    return options
+
+
+def lookup(image, geometry="card"):
+    """Return ready thumbnail of the image or None, never generating it.
+
+    Unlike the sorl key-value store a miss is not cached: thumbnails are
+    stored by other processes, whose writes never reach a local cache.
+    """
+    if not image:
+        return None
+    geometry_string, options = GEOMETRIES[geometry]
+    source = ImageFile(image)
+    options = thumbnail_options(source, options)
+    name = default.backend._get_thumbnail_filename(
+        source, geometry_string, options,
+    )
+    key = add_prefix(ImageFile(name, default.storage).key)
+    kvstore_cache = default.kvstore.cache
+    value = kvstore_cache.get(key)
+    if not isinstance(value, str):
+        value = KVStore.objects.filter(key=key).values_list(
+            "value", flat=True,
+        ).first()
+        if value is None:
+            return None
+        kvstore_cache.set(key, value, sorl_settings.THUMBNAIL_CACHE_TIMEOUT)
+    return deserialize_image_file(value)
+
+
+@task()
+def generate(name):
+    """Make every thumbnail of the stored image."""
+    for geometry_string, options in GEOMETRIES.values():
+        get_thumbnail(name, geometry_string, **options)
+    cache.delete(pending_key(name))
+    return name
+
+
+def pending_key(name):
+    """Return cache key marking thumbnails of the image as scheduled."""
+    digest = hashlib.md5(name.encode()).hexdigest()
+    return PENDING_KEY.format(name=digest)
+
+
+def get_executor():
+    """Return shared pool of thumbnail workers, starting it if needed."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = make_executor(settings.THUMBNAIL_WORKERS)
+        return _executor
+
+
+def log_failure(future):
+    """Log error of a background thumbnail job."""
+    error = future.exception()
+    if error is not None:
+        logger.error("Thumbnail generation failed", exc_info=error)
+
+
+def submit(name):
+    """Generate thumbnails in the task queue, the pool or inline.
+
+    With a task worker running they are made there, otherwise in the
+    pool of this process or inline without workers. The pending mark
+    already keeps duplicates out, so the task needs no key.
+    """
+    if not settings.TASKS_ALWAYS_EAGER:
+        generate.delay(name)
+        return
+    if settings.THUMBNAIL_WORKERS <= 0:
+        try:
+            generate(name)
+        except Exception:
+            logger.exception("Thumbnail generation failed")
+        return
+    get_executor().submit(generate, name).add_done_callback(log_failure)
+
+
+def schedule(name):
+    """Generate thumbnails of the image once the transaction commits.
+
+    Repeated calls for an image already in work are ignored.
+    """
+    if not name:
+        return
+    if cache.add(pending_key(name), 1, settings.THUMBNAIL_PENDING_TIMEOUT):
+        transaction.on_commit(lambda: submit(name))
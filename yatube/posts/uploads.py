@@ -0,0 +1,144 @@
+"""Memory-bounded handling of uploaded post images.
+
+Uploads are streamed to a temporary file in chunks and only counted
+beyond the size limit. Image dimensions are read from the header before
+anything is decoded, and accepted images are decoded at a reduced scale
+where the format allows it, turned upright by their EXIF orientation,
+shrunk to a bounded resolution and saved again without metadata, as
+PNG or JPEG when Pillow cannot write their own format. Animated images
+keep their size and format, only their frames are saved again without
+metadata.
+"""
+import io
+import logging
+import os
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Formats of re-encoded images: the first one Pillow can save is used,
+# images keep their own format when none is available.
+PREFERRED_FORMATS = ("AVIF", "WEBP")
+# Modes stored as JPEG when Pillow cannot save the image format, images
+# with transparency or a palette are stored as PNG.
+OPAQUE_MODES = ("1", "L", "RGB", "CMYK", "YCbCr", "I", "F")
+EXTENSIONS = {
+    "AVIF": ".avif", "WEBP": ".webp", "JPEG": ".jpg", "PNG": ".png",
+}
+# Keys of Image.info holding metadata rather than pixels or timing.
+METADATA_KEYS = ("exif", "xmp", "XML:com.adobe.xmp", "comment")
+
+
+class BoundedFileUploadHandler(TemporaryFileUploadHandler):
+    """Stream every upload to disk, dropping data beyond the size limit.
+
+    The file keeps its full size, so forms can tell the upload was too
+    large without reading it.
+    """
+
+    def new_file(self, *args, **kwargs):
+        """Start counting bytes of the new file."""
+        super().new_file(*args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        """Write chunk to disk unless the limit is already exceeded."""
+        self.received += len(raw_data)
+        if self.received <= settings.POST_IMAGE_MAX_UPLOAD_SIZE:
+            self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        """Return the stored file reporting the received size."""
+        self.file.seek(0)
+        self.file.size = self.received
+        return self.file
+
+
+def is_too_large(upload):
+    """Check if uploaded file is over the size limit."""
+    return upload.size > settings.POST_IMAGE_MAX_UPLOAD_SIZE
+
+
+@lru_cache(maxsize=None)
+def preferred_format():
+    """Return the first preferred format Pillow can save, None if none.
+
+    Pillow built without them is logged once, since images then keep
+    their formats, JPEG for most photos.
+    """
+    Image.init()
+    for image_format in PREFERRED_FORMATS:
+        if image_format in Image.SAVE:
+            return image_format
+    logger.warning(
+        "Pillow cannot save %s, images keep their own formats",
+        " or ".join(PREFERRED_FORMATS),
+    )
+    return None
+
+
+def target_format(source_format, mode="RGB"):
+    """Return format to save a re-encoded image in.
+
+    Formats Pillow only reads are replaced with JPEG or PNG by the mode.
+    """
+    image_format = preferred_format() or source_format
+    if image_format in Image.SAVE:
+        return image_format
+    return "JPEG" if mode in OPAQUE_MODES else "PNG"
+
+
+def strip_animated(upload):
+    """Return animated upload with its frames saved again without metadata."""
+    upload.seek(0)
+    with Image.open(upload) as source:
+        image_format = source.format
+        for key in METADATA_KEYS:
+            source.info.pop(key, None)
+        buffer = io.BytesIO()
+        source.save(buffer, image_format, save_all=True)
+        size = source.size
+    stripped = SimpleUploadedFile(
+        upload.name, buffer.getvalue(), Image.MIME.get(image_format),
+    )
+    stripped.width, stripped.height = size
+    return stripped
+
+
+def normalize(upload, image):
+    """Return upload re-encoded to bounded size and stripped of metadata.
+
+    Image is the header-only object form validation opened. Animated
+    images Pillow can save again are only stripped of metadata.
+    """
+    animated = getattr(image, "is_animated", False)
+    if animated and image.format in Image.SAVE_ALL:
+        return strip_animated(upload)
+    max_side = settings.POST_IMAGE_MAX_SIDE
+    upload.seek(0)
+    with Image.open(upload) as source:
+        source_format = source.format
+        # A square draft box fits the image either way it is turned.
+        source.draft("RGB", (max_side, max_side))
+        source = ImageOps.exif_transpose(source)
+        source.thumbnail((max_side, max_side))
+        image_format = target_format(source_format, source.mode)
+        if image_format == "JPEG" and source.mode not in ("RGB", "L"):
+            source = source.convert("RGB")
+        buffer = io.BytesIO()
+        source.save(buffer, image_format)
+        size = source.size
+
+    name = upload.name
+    if image_format != source_format:
+        name = os.path.splitext(name)[0] + EXTENSIONS[image_format]
+    normalized = SimpleUploadedFile(
+        name, buffer.getvalue(), Image.MIME.get(image_format),
+    )
+    normalized.width, normalized.height = size
+    return normalized
@@ -18,8 +18,14 @@ urlpatterns = [
     ),
     path("create/", views.post_create, name="post_create"),
     path("posts/<int:post_id>/", views.post_detail, name="post_detail"),
+    path(
+        "posts/<int:post_id>/comments/",
+        views.post_comments,
+        name="post_comments",
+    ),
     path("posts/<int:post_id>/edit/", views.post_edit, name="post_edit"),
     path("follow/", views.follow_index, name="follow_index"),
+    path("search/", views.post_search, name="search"),
     path(
         "profile/<str:username>/follow/",
         views.profile_follow,
@@ -30,6 +36,16 @@ urlpatterns = [
         views.profile_unfollow,
         name="profile_unfollow",
     ),
+    path(
+        "profile/<str:username>/followers/",
+        views.followers,
+        name="followers",
+    ),
+    path(
+        "profile/<str:username>/following/",
+        views.following,
+        name="following",
+    ),
 ]
 
 if settings.DEBUG:
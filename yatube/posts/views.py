@@ -1,38 +1,136 @@
 """Contain page renders for posts app."""
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.views.decorators.cache import cache_page
-from django.views.decorators.vary import vary_on_cookie
-from django.core.paginator import Paginator
 from django.contrib.auth import get_user_model
+from django.core.paginator import InvalidPage
+from django.db.models import Subquery
+from django.http import JsonResponse
+from django.template.loader import render_to_string
 from django.urls import reverse_lazy
 from django.shortcuts import render, get_object_or_404, redirect
 
-from posts.models import Post, Group, Follow
+from core.concurrent import gather
+from posts import follow_graph
+from posts.cards import prefetch_cards
+from posts.conditional import (
+    conditional_page,
+    group_validator,
+    post_validator,
+    profile_validator,
+)
+from posts.counters import ensure_stats
+from posts.feed import follow_feed
+from posts.feed_cache import cached_page
+from posts.models import Comment, Follow, Post, Group
 from posts.forms import PostForm, CommentForm
+from posts.pagination import (
+    KeysetPaginator,
+    WindowedPaginator,
+    freeze_page,
+    table_count,
+)
+from posts.search import search as search_posts
 from yatube.settings import (
     MAX_POSTS_PER_PAGE,
     MAX_COMMENTS_PER_PAGE,
-    INDEX_CACHING_TIME_SEC,
+    MAX_USERS_PER_PAGE,
 )
 
 User = get_user_model()
 
-
-def make_pagination_obj(request, obj_list, obj_per_page):
-    """Paginator creation function."""
-    paginator = Paginator(obj_list, obj_per_page)
+# Side of Follow the listed user owns, side shown, cache scope, title.
+FOLLOW_LISTS = {
+    "followers": ("author", "user", "followers:{pk}", "Подписчики"),
+    "following": ("user", "author", "follow:{pk}", "Подписки"),
+}
+
+
+def make_pagination_obj(
+    request, obj_list, obj_per_page, view_name=None, count=None,
+):
+    """Paginator creation function.
+
+    Views listed in KEYSET_PAGINATION_VIEWS are paged by cursor
+    instead of page number. Others are numbered pages whose total is the
+    given count, known, estimated or None when counting costs too much.
+    """
+    if view_name in settings.KEYSET_PAGINATION_VIEWS:
+        paginator = KeysetPaginator(obj_list, obj_per_page)
+        return paginator.get_page(request.GET.get(paginator.cursor_param))
+    paginator = WindowedPaginator(obj_list, obj_per_page, count)
     page_number = request.GET.get("page")
     return paginator.get_page(page_number)
 
 
-@cache_page(INDEX_CACHING_TIME_SEC, key_prefix="index_page")
-@vary_on_cookie
+def fetch_with_page(request, posts_list, view_name, lookup, count):
+    """Return result of lookup and a page of posts fetched concurrently.
+
+    The total of posts comes from count applied to the result of lookup,
+    e.g. a counter of the group the lookup finds, and is given to the
+    page once both are fetched.
+    """
+    if view_name in settings.KEYSET_PAGINATION_VIEWS:
+        return gather(
+            lookup,
+            lambda: make_pagination_obj(
+                request, posts_list, MAX_POSTS_PER_PAGE, view_name,
+            ),
+        )
+    paginator = WindowedPaginator(posts_list, MAX_POSTS_PER_PAGE)
+    page_number = request.GET.get("page") or 1
+
+    def fetch_page():
+        """Return page with the number, None if it has to fall back."""
+        try:
+            return paginator.page(page_number)
+        except InvalidPage:
+            return None
+
+    found, page_obj = gather(lookup, fetch_page)
+    paginator.count = count(found)
+    if page_obj is None:
+        page_obj = paginator.get_page(page_number)
+    else:
+        paginator.add_window(page_obj)
+    return found, page_obj
+
+
+def make_comment_page(request, post_id):
+    """Return a page of post comments, newest first.
+
+    Comments are paged by (created, id) cursor, so a page costs one
+    query of at most MAX_COMMENTS_PER_PAGE + 1 rows however long the
+    thread is.
+    """
+    comments = (
+        Comment.objects.filter(post_id=post_id)
+        .select_related("author")
+        .only("text", "created", "post", "author__username")
+    )
+    paginator = KeysetPaginator(
+        comments, MAX_COMMENTS_PER_PAGE, keys=("created", "pk"),
+    )
+    return paginator.get_page(request.GET.get(paginator.cursor_param))
+
+
 def index(request):
     """Render index page of posts app."""
     title = "Последние обновления на сайте"
     template = "posts/index.html"
-    posts_list = Post.objects.all()
-    page_obj = make_pagination_obj(request, posts_list, MAX_POSTS_PER_PAGE)
+
+    def build_page():
+        """Paginate posts of the index page, counting them meanwhile."""
+        _, page_obj = fetch_with_page(
+            request,
+            Post.objects.for_feed(),
+            "index",
+            lambda: table_count(Post),
+            lambda total: total,
+        )
+        return freeze_page(page_obj)
+
+    page_obj = cached_page(request, "posts", build_page)
+    prefetch_cards(page_obj)
 
     context = {
         "page_obj": page_obj,
@@ -42,14 +140,21 @@ def index(request):
     return render(request, template, context)
 
 
+@conditional_page(group_validator)
 def group_posts(request, slug):
     """Render group page of group app."""
     title = f"Записи сообщества {slug}"
     template = "posts/group_list.html"
 
-    group = get_object_or_404(Group, slug=slug)
-    posts_list = group.posts.all()
-    page_obj = make_pagination_obj(request, posts_list, MAX_POSTS_PER_PAGE)
+    group_id = Group.objects.filter(slug=slug).values("pk")[:1]
+    group, page_obj = fetch_with_page(
+        request,
+        Post.objects.filter(group=Subquery(group_id)).for_feed(),
+        "group_posts",
+        lambda: get_object_or_404(Group, slug=slug),
+        lambda group: group.post_count,
+    )
+    prefetch_cards(page_obj)
 
     context = {
         "title": title,
@@ -60,44 +165,56 @@ def group_posts(request, slug):
     return render(request, template, context)
 
 
+@conditional_page(profile_validator)
 def profile(request, username):
     """Render profile page."""
     title = f"Профайл пользователя {username}"
     template = "posts/profile.html"
 
-    user_profile = get_object_or_404(User, username=username)
-    posts_list = user_profile.posts.all()
-    page_obj = make_pagination_obj(request, posts_list, MAX_POSTS_PER_PAGE)
-    if request.user.is_authenticated and request.user != user_profile:
-        is_following = (
-            Follow.objects.filter(author=user_profile)
-            .filter(user=request.user)
-            .exists()
+    def find_profile():
+        """Return the user and whether the visitor follows them."""
+        user_profile = get_object_or_404(
+            User.objects.select_related("stats"), username=username,
         )
-        is_not_self = True
-    else:
-        is_following = False
-        is_not_self = False
+        if request.user.is_authenticated and request.user != user_profile:
+            return user_profile, follow_graph.follows(
+                request.user.pk, user_profile.pk,
+            )
+        return user_profile, None
+
+    author_id = User.objects.filter(username=username).values("pk")[:1]
+    (user_profile, is_following), page_obj = fetch_with_page(
+        request,
+        Post.objects.filter(author=Subquery(author_id)).for_feed(),
+        "profile",
+        find_profile,
+        lambda found: ensure_stats(found[0]).post_count,
+    )
+    prefetch_cards(page_obj)
+    is_not_self = is_following is not None
 
     context = {
         "title": title,
         "page_obj": page_obj,
         "user_profile": user_profile,
         "is_group_link": True,
-        "following": is_following,
+        "following": bool(is_following),
         "is_not_self": is_not_self,
     }
     return render(request, template, context)
 
 
+@conditional_page(post_validator)
 def post_detail(request, post_id):
     """Render post detail page."""
     template = "posts/post_detail.html"
 
-    post = get_object_or_404(Post, pk=post_id)
-    comment_list = post.comments.all()
-    page_obj = make_pagination_obj(
-        request, comment_list, MAX_COMMENTS_PER_PAGE,
+    post, page_obj = gather(
+        lambda: get_object_or_404(
+            Post.objects.select_related("author__stats", "group"),
+            pk=post_id,
+        ),
+        lambda: make_comment_page(request, post_id),
     )
 
     is_author = post.author == request.user
@@ -108,11 +225,21 @@ def post_detail(request, post_id):
         "is_author": is_author,
         "form": form,
         "page_obj": page_obj,
-        "comments": comment_list,
     }
     return render(request, template, context)
 
 
+def post_comments(request, post_id):
+    """Return rendered page of older comments for incremental loading."""
+    page_obj = make_comment_page(request, post_id)
+    return JsonResponse({
+        "html": render_to_string(
+            "includes/comment_items.html", {"page_obj": page_obj}, request,
+        ),
+        "next_cursor": page_obj.next_cursor,
+    })
+
+
 @login_required
 def post_create(request):
     """Process posts creation."""
@@ -188,8 +315,11 @@ def follow_index(request):
     title = "Последние обновления в подписках"
     template = "posts/follow.html"
 
-    posts_list = Post.objects.filter(author__following__user=request.user)
-    page_obj = make_pagination_obj(request, posts_list, MAX_POSTS_PER_PAGE)
+    posts_list = follow_feed(request.user).for_feed()
+    page_obj = make_pagination_obj(
+        request, posts_list, MAX_POSTS_PER_PAGE, "follow_index",
+    )
+    prefetch_cards(page_obj)
 
     context = {
         "page_obj": page_obj,
@@ -207,10 +337,7 @@ def profile_follow(request, username):
         return redirect(
             reverse_lazy("posts:profile", kwargs={"username": username}),
         )
-    Follow.objects.get_or_create(
-        user=request.user,
-        author=following_profile,
-    )
+    follow_graph.follow_many(request.user.pk, [following_profile.pk])
 
     return redirect(
         reverse_lazy("posts:profile", kwargs={"username": username}),
@@ -225,10 +352,93 @@ def profile_unfollow(request, username):
         return redirect(
             reverse_lazy("posts:profile", kwargs={"username": username}),
         )
-    follower = Follow.objects.filter(author=following_profile)
-    if follower.exists():
-        follower.delete()
+    follow_graph.unfollow_many(request.user.pk, [following_profile.pk])
 
     return redirect(
         reverse_lazy("posts:profile", kwargs={"username": username}),
     )
+
+
+def make_follow_page(request, user_profile, kind):
+    """Return a page of follows of the user, first page through cache.
+
+    Follows are paged by id of the shown user through the (author, user)
+    and (user, author) indexes, so a deep page of a million followers
+    costs as much as the first one.
+    """
+    owner, shown, scope, _ = FOLLOW_LISTS[kind]
+    follows = (
+        Follow.objects.filter(**{owner: user_profile})
+        .select_related(shown)
+        .only(
+            shown,
+            f"{shown}__username",
+            f"{shown}__first_name",
+            f"{shown}__last_name",
+        )
+    )
+    paginator = KeysetPaginator(
+        follows, MAX_USERS_PER_PAGE, keys=(f"{shown}_id",),
+    )
+    cursor = request.GET.get(paginator.cursor_param)
+    if cursor:
+        return paginator.get_page(cursor)
+    return cached_page(
+        request,
+        scope.format(pk=user_profile.pk),
+        lambda: freeze_page(paginator.get_page()),
+    )
+
+
+def follow_list(request, username, kind):
+    """Render followers or followed authors of the user."""
+    template = "posts/follow_list.html"
+    user_profile = get_object_or_404(
+        User.objects.select_related("stats"), username=username,
+    )
+    page_obj = make_follow_page(request, user_profile, kind)
+    _, shown, _, title = FOLLOW_LISTS[kind]
+
+    context = {
+        "title": f"{title}: {user_profile.username}",
+        "user_profile": user_profile,
+        "people": [getattr(follow, shown) for follow in page_obj],
+        "page_obj": page_obj,
+        "kind": kind,
+    }
+    return render(request, template, context)
+
+
+def followers(request, username):
+    """Render users following the user."""
+    return follow_list(request, username, "followers")
+
+
+def following(request, username):
+    """Render authors the user follows."""
+    return follow_list(request, username, "following")
+
+
+def post_search(request):
+    """Render full-text search results over posts and comments."""
+    template = "posts/search.html"
+    query = request.GET.get("q", "").strip()
+    results = None
+    if query:
+        results = search_posts(
+            query,
+            cursor=request.GET.get("cursor"),
+            limit=MAX_POSTS_PER_PAGE,
+        )
+        posts = Post.objects.for_feed().in_bulk(
+            {hit.post_id for hit in results},
+        )
+        for hit in results:
+            hit.post = posts.get(hit.post_id)
+
+    context = {
+        "title": f"Поиск: {query}" if query else "Поиск",
+        "query": query,
+        "results": results,
+    }
+    return render(request, template, context)
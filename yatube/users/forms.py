@@ -1,6 +1,9 @@
 """Users description for posts app."""
-from django.contrib.auth.forms import UserCreationForm
+from django.contrib.auth.forms import PasswordResetForm, UserCreationForm
 from django.contrib.auth import get_user_model
+from django.template import loader
+
+from users.tasks import send_email
 
 User = get_user_model()
 
@@ -13,3 +16,27 @@ class CreationForm(UserCreationForm):
 
         model = User
         fields = ("first_name", "last_name", "username", "email")
+
+
+class QueuedPasswordResetForm(PasswordResetForm):
+    """Password reset form sending its email from the task queue."""
+
+    def send_mail(
+        self,
+        subject_template_name,
+        email_template_name,
+        context,
+        from_email,
+        to_email,
+        html_email_template_name=None,
+    ):
+        """Render the email and queue it instead of sending."""
+        subject = loader.render_to_string(subject_template_name, context)
+        subject = "".join(subject.splitlines())
+        body = loader.render_to_string(email_template_name, context)
+        html_body = None
+        if html_email_template_name is not None:
+            html_body = loader.render_to_string(
+                html_email_template_name, context,
+            )
+        send_email.delay(subject, body, from_email, [to_email], html_body)
@@ -0,0 +1,13 @@
+"""Background tasks of users app."""
+from django.core.mail import EmailMultiAlternatives
+
+from core.tasks import task
+
+
+@task(max_attempts=5)
+def send_email(subject, body, from_email, to, html_body=None):
+    """Send rendered email."""
+    message = EmailMultiAlternatives(subject, body, from_email, to)
+    if html_body is not None:
+        message.attach_alternative(html_body, "text/html")
+    message.send()
@@ -34,6 +34,7 @@ INSTALLED_APPS = [
     "core.apps.CoreConfig",
     "users.apps.UsersConfig",
     "posts.apps.PostsConfig",
+    "api.apps.ApiConfig",
     "django.contrib.admin",
     "django.contrib.auth",
     "django.contrib.contenttypes",
@@ -44,6 +45,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.middleware.RequestMetricsMiddleware",
+    "core.middleware.ReplicaMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -56,12 +59,26 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = "yatube.urls"
 
+# "production" keeps compiled templates in memory, "development" reads
+# them from disk on every render so edits show up without a restart.
+TEMPLATE_PROFILE = os.environ.get(
+    "TEMPLATE_PROFILE", "development" if DEBUG else "production",
+)
+TEMPLATE_LOADERS = [
+    "django.template.loaders.filesystem.Loader",
+    "django.template.loaders.app_directories.Loader",
+]
+if TEMPLATE_PROFILE == "production":
+    TEMPLATE_LOADERS = [
+        ("django.template.loaders.cached.Loader", TEMPLATE_LOADERS),
+    ]
+
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        "BACKEND": "core.template_backends.InstrumentedDjangoTemplates",
         "DIRS": [TEMPLATES_DIR],
-        "APP_DIRS": True,
         "OPTIONS": {
+            "loaders": TEMPLATE_LOADERS,
             "context_processors": [
                 "django.template.context_processors.debug",
                 "django.template.context_processors.request",
@@ -73,21 +90,126 @@ TEMPLATES = [
     },
 ]
 
-CACHES = {
-    "default": {
-        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
-    },
+# CACHE_BACKEND=locmem keeps a cache per worker process. Any other
+# backend becomes the shared tier behind an in-process LRU whose copies
+# live CACHE_LOCAL_TIMEOUT seconds.
+SHARED_CACHE_BACKENDS = {
+    "memcached": "django.core.cache.backends.memcached.MemcachedCache",
+    "pylibmc": "django.core.cache.backends.memcached.PyLibMCCache",
+    "redis": "django_redis.cache.RedisCache",
+    "fake": "core.cache_backends.FakeSharedCache",
 }
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "locmem")
+
+if CACHE_BACKEND == "locmem":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        },
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "core.cache_backends.TwoTierCache",
+            "OPTIONS": {
+                "SHARED_ALIAS": "shared",
+                "LOCAL_TIMEOUT": float(
+                    os.environ.get("CACHE_LOCAL_TIMEOUT", 2),
+                ),
+                "LOCAL_MAX_ENTRIES": int(
+                    os.environ.get("CACHE_LOCAL_MAX_ENTRIES", 1000),
+                ),
+            },
+        },
+        "shared": {
+            "BACKEND": SHARED_CACHE_BACKENDS[CACHE_BACKEND],
+            "LOCATION": os.environ.get("CACHE_LOCATION", "yatube"),
+            "KEY_PREFIX": "yatube",
+        },
+    }
 
 WSGI_APPLICATION = "yatube.wsgi.application"
+# ASGI servers run requests on ASGI_THREADS threads of every process.
+ASGI_APPLICATION = "yatube.asgi.application"
+ASGI_THREADS = int(os.environ.get("ASGI_THREADS", 20))
+# Threads of every process running independent parts of feed and detail
+# views concurrently, 0 runs the parts one by one.
+CONCURRENT_FETCH_THREADS = int(os.environ.get("CONCURRENT_FETCH_THREADS", 8))
 
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": os.path.join(BASE_DIR, "db.sqlite3"),
-    },
+# DB_ENGINE=sqlite keeps the database in a file next to the project.
+# DB_ENGINE=postgresql keeps connections open for DB_CONN_MAX_AGE
+# seconds, checks them before each request and, with DB_REPLICAS set to
+# comma-separated hosts, reads READ_REPLICA_VIEWS from the replicas.
+DB_ENGINE = os.environ.get("DB_ENGINE", "sqlite")
+
+if DB_ENGINE == "sqlite":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": os.environ.get(
+                "DB_NAME", os.path.join(BASE_DIR, "db.sqlite3"),
+            ),
+        },
+    }
+else:
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": os.environ.get("DB_NAME", "yatube"),
+            "USER": os.environ.get("DB_USER", "yatube"),
+            "PASSWORD": os.environ.get("DB_PASSWORD", ""),
+            "HOST": os.environ.get("DB_HOST", "localhost"),
+            "PORT": os.environ.get("DB_PORT", "5432"),
+            "CONN_MAX_AGE": int(os.environ.get("DB_CONN_MAX_AGE", 60)),
+            # Server-side cursors stream .iterator() results, but do not
+            # survive transaction pooling of PgBouncer.
+            "DISABLE_SERVER_SIDE_CURSORS": (
+                os.environ.get("DB_POOLER") == "pgbouncer"
+            ),
+            "OPTIONS": {
+                "connect_timeout": int(
+                    os.environ.get("DB_CONNECT_TIMEOUT", 5),
+                ),
+            },
+        },
+    }
+    replica_hosts = [
+        host for host in os.environ.get("DB_REPLICAS", "").split(",") if host
+    ]
+    for number, host in enumerate(replica_hosts):
+        DATABASES[f"replica_{number}"] = dict(
+            DATABASES["default"],
+            HOST=host,
+            TEST={"MIRROR": "default"},
+        )
+
+# Pragmas set on every SQLite connection when SQLITE_TUNING is on.
+SQLITE_TUNING = os.environ.get("SQLITE_TUNING", "1") == "1"
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": 256 * 1024 * 1024,
+    # Negative size is in KiB.
+    "cache_size": -64 * 1024,
+    "busy_timeout": 5000,
+    "temp_store": "MEMORY",
 }
 
+DATABASE_ROUTERS = ["core.db.ReplicaRouter"]
+DATABASE_HEALTH_CHECKS = (
+    os.environ.get("DB_HEALTH_CHECKS", "1") == "1"
+)
+# Views whose GET requests may read from replicas, and views after
+# which the client reads from the primary for REPLICA_PIN_SECONDS.
+READ_REPLICA_VIEWS = (
+    "posts:index",
+    "posts:group_list",
+    "posts:profile",
+    "posts:post_detail",
+)
+REPLICA_PIN_VIEWS = ("posts:post_create", "posts:add_comment")
+REPLICA_PIN_SECONDS = 10
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
@@ -121,6 +243,69 @@ STATIC_URL = "/static/"
 
 MAX_POSTS_PER_PAGE = 10
 MAX_COMMENTS_PER_PAGE = 20
-INDEX_CACHING_TIME_SEC = 20
+MAX_USERS_PER_PAGE = 50
+# Pages linked on both sides of the current one.
+PAGINATOR_WINDOW = 2
+# Seconds a table row count stands in for the total of numbered pages.
+PAGINATOR_COUNT_TIMEOUT = 60
+# Seconds shared caches may serve anonymous post, profile and group
+# pages without asking the site.
+PAGE_CACHE_MAX_AGE = 60
+# Largest ?limit= of api pages and number of requests in one api batch.
+API_MAX_PAGE_SIZE = 100
+API_BATCH_MAX_REQUESTS = 20
+# Requests making more SQL queries are logged with the stack of the
+# slowest one, None turns the check off.
+REQUEST_QUERY_BUDGET = 50
+# /metrics/ answers scrapes from these addresses and staff users only;
+# behind a proxy REMOTE_ADDR is the address of the proxy.
+METRICS_ALLOWED_IPS = os.environ.get(
+    "METRICS_ALLOWED_IPS", "127.0.0.1,::1",
+).split(",")
+# Feed pages stay cached until posts change, stale pages are served
+# while one request rebuilds them.
+FEED_CACHE_TIMEOUT = 60 * 5
+FEED_CACHE_LOCK_TIMEOUT = 10
+# Text search configuration of PostgreSQL search index.
+SEARCH_POSTGRES_CONFIG = "simple"
+# Admin changelists search only among that many best matches.
+SEARCH_ADMIN_LIMIT = 1000
+# Feed views paged by (pub_date, id) cursor instead of OFFSET:
+# "index", "group_posts", "profile", "follow_index".
+KEYSET_PAGINATION_VIEWS = ()
+# Materialized follow feed: entries kept per reader, authors with more
+# followers than the limit are merged into feeds on read.
+FOLLOW_FEED_DEPTH = 1000
+FOLLOW_FEED_FANOUT_MAX_FOLLOWERS = 10000
+FOLLOW_FEED_BATCH_SIZE = 1000
+POST_CARD_CACHE_TIMEOUT = 60 * 60 * 24
+# Ids of followed and following users every process keeps in memory,
+# 4 bytes each.
+FOLLOW_GRAPH_CACHE_IDS = 5 * 10 ** 6
+# Worker processes making thumbnails of uploaded images, 0 makes them
+# right after the upload is saved.
+THUMBNAIL_WORKERS = int(os.environ.get("THUMBNAIL_WORKERS", 2))
+THUMBNAIL_PENDING_TIMEOUT = 60
+# Feed fan-out, thumbnails and emails go to the task queue kept in the
+# database, run by "manage.py run_tasks". Eager tasks run in the request
+# instead, so no worker is needed.
+TASKS_ALWAYS_EAGER = os.environ.get("TASKS_ALWAYS_EAGER", "1") == "1"
+TASK_WORKERS = int(os.environ.get("TASK_WORKERS", 2))
+TASK_POLL_INTERVAL = 1
+# Seconds before the second attempt, doubled for every next one.
+TASK_RETRY_BACKOFF = 10
+# Running tasks older than this are taken to have lost their worker.
+TASK_VISIBILITY_TIMEOUT = 60 * 5
+TASK_KEEP_DONE_DAYS = 7
+# Uploads are streamed to disk; larger files and images are rejected,
+# accepted images are shrunk to fit the side limit.
+FILE_UPLOAD_HANDLERS = ["posts.uploads.BoundedFileUploadHandler"]
+POST_IMAGE_MAX_UPLOAD_SIZE = 10 * 1024 * 1024
+POST_IMAGE_MAX_PIXELS = 40 * 10 ** 6
+POST_IMAGE_MAX_SIDE = 1920
+
+# Views taking one argument whose links templates build from a prefix
+# reversed once, instead of reversing every link.
+URL_PREFIX_VIEWS = ("posts:post_detail", "posts:profile", "posts:group_list")
 
 CSRF_FAILURE_VIEW = "core.views.csrf_failure"